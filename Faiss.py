@@ -2,37 +2,179 @@ from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import TextLoader
-from langchain_community.utilities import SQLDatabase
 from langchain.schema import Document
+from langchain.schema import BaseRetriever
 from langchain_openai import ChatOpenAI
+import openai
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
-import ast
+import json
 import pickle
 from datetime import datetime
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-import math
+from sqlalchemy import create_engine, text as sql_text
+from sqlalchemy.engine import URL
+import faiss
+import random
+import re
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import nullcontext
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from experience_parser import parse_years_of_experience, experience_mask
+from query_suggest import SuggestionIndex
+from sharded_index import ShardedIndex, shard_for
+from projection import PCAProjection, ProjectedEmbeddings, PROJECTION_FILE
+from binary_codes import BinaryCodes
+from llm_client import LLMClient, LLMUnavailable
+from query_expansion import ExpansionTable, distinct_terms, EXPANSION_FILE
+from similar_experts import SimilarityGraph, SIMILARITY_GRAPH_FILE
+from profile_clusters import ProfileClusters, CLUSTERS_FILE
+from profiling import Profile, stage
+from embedding_matrix import (
+    write_embedding_matrix, write_row_map, open_embedding_matrix, EMBEDDINGS_FILE, ROW_MAP_FILE
+)
+from index_snapshots import (
+    IndexHandle, write_snapshot, current_version, read_manifest, verify_snapshot, snapshot_path
+)
 
 # Load environment variables
 load_dotenv()
 
-# Database configuration
+def env_flag(name, default=False):
+    """Read a boolean setting from the environment"""
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
+
+# Database configuration (override via environment / .env)
 DB_CONFIG = {
-    "host": "localhost",
-    "port": 3306,
-    "database": "grandu_db",
-    "user": "root",
-    "password": "root"
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "database": os.getenv("DB_NAME", "grandu_db"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", "root")
 }
+# DB_URI takes precedence, e.g. sqlite:///grandu_test.db as a local stand-in
+DB_URI = os.getenv("DB_URI") or URL.create(
+    "mysql+pymysql",
+    username=DB_CONFIG["user"],
+    password=DB_CONFIG["password"],
+    host=DB_CONFIG["host"],
+    port=DB_CONFIG["port"],
+    database=DB_CONFIG["database"]
+).render_as_string(hide_password=False)
+
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)
 
 # FAISS index configuration
 FAISS_INDEX_DIR = "faiss_index"
 EMBEDDINGS_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Encoder backend: "torch" (fp32 PyTorch), "onnx" (ONNX Runtime) or "onnx-int8" (dynamic-quantized ONNX)
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "torch")
+# Quantized weights shipped with the model repo; pick the variant matching the CPU (avx2, avx512, avx512_vnni, arm64)
+EMBEDDINGS_ONNX_INT8_FILE = os.getenv("EMBEDDINGS_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+EMBEDDINGS_BACKENDS = ("torch", "onnx", "onnx-int8")
+# Optional PCA projection fitted when the index is built; 0 keeps the model's full dimensionality
+EMBEDDINGS_PCA_DIMS = int(os.getenv("EMBEDDINGS_PCA_DIMS", "0"))
+SNAPSHOT_KEEP = 3  # Snapshots kept on disk for rollback
+SNAPSHOT_VERIFY = env_flag("SNAPSHOT_VERIFY", True)  # Check manifest checksums before loading
+SNAPSHOT_POLL_SECONDS = float(os.getenv("SNAPSHOT_POLL_SECONDS", "5"))
+# Also write the raw vectors as a memory-mappable .npy for analytics (clustering, coverage, drift)
+EMBEDDING_MATRIX_ENABLED = env_flag("EMBEDDING_MATRIX_ENABLED", True)
+
+# Optional sharded serving layout: partition vectors across shards searched in parallel
+FAISS_SHARDS = int(os.getenv("FAISS_SHARDS", "1"))  # 1 keeps the single flat index
+FAISS_SHARD_KEY = os.getenv("FAISS_SHARD_KEY", "user_id")  # "user_id" or "organization_detail"
+
+# Changeset written by the differential import in exl_to_Postgres.py
+CHANGESET_PATH = "profiles_changeset.json"
+
+# Search planning: push hard filters down to SQL when they keep few enough profiles
+SQL_FIRST_MAX_SELECTIVITY = 0.2  # Largest share of profiles for which SQL-first is used
+PLANNER_BACKOFF_SECONDS = 30  # Vector-first only after a failed lookup; doubles per failure
+PLANNER_BACKOFF_MAX_SECONDS = 600
+SQL_YEARS_EXPR = "CAST(years_of_experience AS UNSIGNED)"  # Leading number of e.g. "6+ yr"
+
+# Optional cross-encoder re-ranking of the dense candidates
+RERANK_ENABLED = env_flag("RERANK_ENABLED")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "20"))  # Cap on candidates scored per query
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "200"))  # Fall back to dense order past this
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))  # Budget is checked after each batch
+RERANK_CACHE_SIZE = 4096
+
+# Correct likely typos against profile metadata before the LLM and the embedding see the query
+SPELL_CORRECTION_ENABLED = env_flag("SPELL_CORRECTION_ENABLED", True)
+
+# Query expansion: fold a query's expertise/field terms and their nearest neighbour terms into its vector.
+# It shifts nearly every ranking, so it stays off until a comparison on labeled queries shows a gain:
+#   python evaluation.py labeled.jsonl --grid QUERY_EXPANSION_ENABLED=false,true
+QUERY_EXPANSION_ENABLED = env_flag("QUERY_EXPANSION_ENABLED", False)
+EXPANSION_NEIGHBORS = 5  # Neighbour terms kept per term
+EXPANSION_MIN_SIMILARITY = 0.5  # Cosine similarity a neighbour term needs
+EXPANSION_MATCH_SIMILARITY = 0.5  # Nearest-term fallback when no term is named in the query
+EXPANSION_WEIGHT = 0.5  # Weight of the term centroid relative to the query vector
+
+# "Similar experts" on each tile, served from a neighbour graph precomputed with the snapshot
+SIMILAR_EXPERTS_ENABLED = env_flag("SIMILAR_EXPERTS_ENABLED", True)
+SIMILAR_EXPERTS_K = 10  # Neighbours stored per profile
+SIMILAR_EXPERTS_SHOWN = 3  # Neighbours shown per tile
+
+# k-means clusters of profiles, for browsing and for facets on broad queries
+CLUSTERS_ENABLED = env_flag("CLUSTERS_ENABLED", True)
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", "0"))  # 0 picks a count from the number of profiles
+CLUSTER_FACETS = 3  # Clusters suggested for a broad query
+
+# Retrieval mode used by setup_retriever: "similarity" (plain top-k), "diverse" (MMR + organization cap)
+# or "binary" (Hamming first pass over bit codes, float re-scoring of the survivors)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "similarity")
+DIVERSITY_FETCH_K = 50  # Candidate pool re-selected for diversity
+DIVERSITY_LAMBDA = 0.5  # 1.0 ranks by relevance only, 0.0 by novelty only
+MAX_PER_ORGANIZATION = 2  # At most this many experts from one organization
+BINARY_RESCORE_K = int(os.getenv("BINARY_RESCORE_K", "200"))  # Hamming candidates re-scored with floats
+
+# Share of the extracted criteria a hit must meet to count as an exact / recommended match
+EXACT_MATCH_THRESHOLD = 1.0
+RECOMMENDED_MATCH_THRESHOLD = 0.5
+
+# LLM used for criteria extraction (any OpenAI-compatible endpoint, e.g. a local fake server for testing)
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+LLM_API_BASE = os.getenv("LLM_API_BASE", "https://api.groq.com/openai/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY")  # Unset: criteria are always rule-based
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "5"))  # Seconds per request attempt
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "8"))  # Seconds for the whole stage, queueing and retries included
+
+# Backpressure for the LLM stage; queries that cannot be admitted fall back to rule-based criteria
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RATE_PER_SEC = float(os.getenv("LLM_RATE_PER_SEC", "0.5"))  # Sustained requests per second
+LLM_BURST = int(os.getenv("LLM_BURST", "5"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2"))  # Longest wait for a slot or token
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # Timeouts are never retried
+LLM_FAILURE_THRESHOLD = 3  # Consecutive failures that open the circuit
+LLM_RESET_TIMEOUT = 30  # Seconds the circuit stays open before a trial call
+
+# Pagination: rank a larger candidate pool once per query, then page through it
+PAGE_SIZE = 5
+PAGINATION_CANDIDATES = int(os.getenv("PAGINATION_CANDIDATES", "50"))
+RESULT_CACHE_SIZE = 64  # Ranked lists kept server-side for cursors
+
+# Sampling profiler for searches: forced per request (header / session flag) or for a share of them
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # 0.01 profiles 1% of searches
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = 50  # Newest profiles kept in PROFILE_DIR
+PROFILE_INTERVAL_MS = 5.0
 
 class SearchCriteria(BaseModel):
     """Search criteria extracted from user query"""
@@ -42,143 +184,1054 @@ class SearchCriteria(BaseModel):
     field_of_interest: Optional[List[str]] = Field(default_factory=list, description="Fields of interest to search for")
     requirements: Optional[List[str]] = Field(default_factory=list, description="Specific requirements to search for")
 
-def extract_search_criteria(query: str) -> SearchCriteria:
-    """Use LLM to extract structured search criteria from natural language query"""
-    llm = ChatOpenAI(
-    model="llama3-8b-8192",
-    temperature=0.5,
-    openai_api_key="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",
-    openai_api_base="https://api.groq.com/openai/v1"
-)
-    
-    parser = PydanticOutputParser(pydantic_object=SearchCriteria)
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an expert at extracting search criteria from natural language queries.
-        Extract the following information:
-        - Areas of expertise
-        - Years of experience
-        - Organizations
-        - Fields of interest
-        - Specific requirements
+_criteria_chain = None
+_llm_client = None
+
+def get_criteria_chain():
+    """Prompt | LLM | parser chain, built once so every query reuses the same HTTP connection pool"""
+    global _criteria_chain
+    if _criteria_chain is None:
+        llm = ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=0.5,
+            openai_api_key=LLM_API_KEY,
+            openai_api_base=LLM_API_BASE,
+            timeout=LLM_TIMEOUT,
+            max_retries=0  # Retries are handled by the shared LLMClient
+        )
         
-        {format_instructions}
+        parser = PydanticOutputParser(pydantic_object=SearchCriteria)
         
-        If a field is not mentioned in the query, leave it as None or empty list."""),
-        ("user", "{query}")
-    ])
-    
-    chain = prompt | llm | parser
-    
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert at extracting search criteria from natural language queries.
+            Extract the following information:
+            - Areas of expertise
+            - Years of experience
+            - Organizations
+            - Fields of interest
+            - Specific requirements
+            
+            {format_instructions}
+            
+            If a field is not mentioned in the query, leave it as None or empty list."""),
+            ("user", "{query}")
+        ]).partial(format_instructions=parser.get_format_instructions())
+        
+        _criteria_chain = prompt | llm | parser
+    return _criteria_chain
+
+def get_llm_client():
+    """Process-wide gate shared by every criteria extraction"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient(
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            rate_per_sec=LLM_RATE_PER_SEC,
+            burst=LLM_BURST,
+            queue_timeout=LLM_QUEUE_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES,
+            failure_threshold=LLM_FAILURE_THRESHOLD,
+            reset_timeout=LLM_RESET_TIMEOUT,
+            retryable=(openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError),
+            # A timed-out attempt already used LLM_TIMEOUT; another one would not fit the deadline
+            no_retry=(openai.APITimeoutError,),
+            deadline=LLM_DEADLINE,
+            attempt_timeout=LLM_TIMEOUT
+        )
+    return _llm_client
+
+YEARS_PATTERN = re.compile(r"(\d+)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+
+def rule_based_criteria(query):
+    """Criteria the query states explicitly, used when the LLM is skipped or fails.
+
+    Only the experience requirement is extracted; everything else is left to the vector
+    search over the full query text.
+    """
+    match = YEARS_PATTERN.search(query)
+    return SearchCriteria(years_of_experience=int(match.group(1)) if match else None)
+
+def extract_search_criteria(query: str) -> SearchCriteria:
+    """Use LLM to extract structured search criteria from natural language query"""
+    # Identical queries in flight at the same time share one LLM call
+    key = " ".join(query.lower().split())
+    if not LLM_API_KEY:
+        print("Skipping LLM criteria extraction (LLM_API_KEY is not set); using rule-based criteria")
+        return rule_based_criteria(query)
     try:
-        criteria = chain.invoke({
-            "query": query,
-            "format_instructions": parser.get_format_instructions()
-        })
-        return criteria
+        criteria = get_llm_client().call(key, lambda: get_criteria_chain().invoke({"query": query}))
+        return criteria.model_copy(deep=True)
+    except LLMUnavailable as e:
+        print(f"Skipping LLM criteria extraction ({e}); using rule-based criteria")
     except Exception as e:
         print(f"Error extracting search criteria: {e}")
-        return SearchCriteria()
+    return rule_based_criteria(query)
 
 def calculate_perplexity(scores):
     """Calculate perplexity score from similarity scores"""
     if not scores:
         return 0.0
-    # Convert scores to probabilities
-    probs = np.array(scores) / sum(scores)
-    # Calculate perplexity
-    perplexity = math.exp(-np.sum(probs * np.log(probs + 1e-10)))
-    return perplexity
-
-def calculate_cosine_similarity(query_embedding, doc_embedding):
-    """Calculate cosine similarity between query and document embeddings"""
-    return cosine_similarity([query_embedding], [doc_embedding])[0][0]
+    return float(calculate_perplexity_batch(np.array([scores], dtype=np.float64), np.array([len(scores)]))[0])
 
-def get_postgres_data():
-    """Extract data from MySQL and convert to documents"""
-    try:
-        # Connect to MySQL
-        db = SQLDatabase.from_uri(
-            f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        )
+def load_profile_documents():
+    """Profile documents for every row of grandu_user; raises if the database cannot be read"""
+    # Query to fetch expert profiles
+    query = """
+    SELECT 
+        user_id,
+        first_name,
+        last_name,
+        expertise,
+        years_of_experience,
+        organization_detail,
+        field_of_interest,
+        requirements
+    FROM grandu_user
+    """
+    # Borrow a pooled connection; no schema reflection is needed for a plain SELECT
+    with get_engine().connect() as conn:
+        results_list = conn.execute(sql_text(query)).fetchall()
+    
+    # Convert results to documents with structured format
+    documents = []
+    for row in results_list:
+        # Numeric experience bounds parsed once here instead of per query
+        years_min, years_max = parse_years_of_experience(row[4])
         
-        # Query to fetch expert profiles
-        query = """
-        SELECT 
-            user_id,
-            first_name,
-            last_name,
-            expertise,
-            years_of_experience,
-            organization_detail,
-            field_of_interest,
-            requirements
-        FROM grandu_user
+        # Create a structured text representation
+        text = f"""
+        Expertise: {row[3]}
+        Years of Experience: {row[4]}
+        Organization: {row[5]}
+        Field of Interest: {row[6]}
+        Requirements: {row[7]}
         """
-        results = db.run(query)
         
-        # Convert results to documents with structured format
-        documents = []
+        # Create metadata for the document
+        metadata = {
+            'user_id': row[0],
+            'first_name': row[1],
+            'last_name': row[2],
+            'expertise': row[3],
+            'years_of_experience': row[4],
+            'years_min': years_min,
+            'years_max': years_max,
+            'organization_detail': row[5],
+            'field_of_interest': row[6],
+            'requirements': row[7]
+        }
         
-        # Parse the results string into a list of tuples
+        # Create a Document object with text and metadata
+        documents.append(Document(page_content=text, metadata=metadata))
+    
+    print(f"Successfully processed {len(documents)} expert profiles")
+    return documents
+
+def get_postgres_data():
+    """Extract data from MySQL and convert to documents; [] when the database cannot be read.
+
+    Callers that must tell a failed read from an empty table use load_profile_documents.
+    """
+    try:
+        return load_profile_documents()
+    except Exception as e:
+        print(f"Error loading expert profiles from the database: {e}")
+        return []
+
+_engine = None
+_profile_count = None
+
+def get_engine():
+    """Module-level pooled engine shared by index builds and per-query SQL lookups"""
+    global _engine
+    if _engine is None:
+        pool_kwargs = {
+            'pool_pre_ping': DB_POOL_PRE_PING,
+            'pool_recycle': DB_POOL_RECYCLE
+        }
+        # SQLite stand-ins use SQLAlchemy's default SQLite pool, which takes no size limits
+        if not str(DB_URI).startswith('sqlite'):
+            pool_kwargs.update(
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT
+            )
+        _engine = create_engine(DB_URI, **pool_kwargs)
+    return _engine
+
+def reset_engine():
+    """Close all pooled connections, e.g. after changing DB_URI in tests"""
+    global _engine, _profile_count, _profile_store
+    if _engine is not None:
+        _engine.dispose()
+    _engine = None
+    _profile_count = None
+    record_planner_result(True)
+    # Async connections belong to the event loop that opened them; close with get_profile_store().close()
+    _profile_store = None
+
+def get_pool_stats():
+    """Current connection pool usage"""
+    pool = get_engine().pool
+    stats = {'pool_class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    stats['status'] = pool.status()
+    return stats
+
+def get_profile_count():
+    """Total number of profiles, cached for selectivity estimates"""
+    global _profile_count
+    if _profile_count is None:
+        with get_engine().connect() as conn:
+            _profile_count = conn.execute(sql_text("SELECT COUNT(*) FROM grandu_user")).scalar()
+    return _profile_count
+
+def build_sql_predicate(criteria: SearchCriteria):
+    """Turn the hard constraints of the search criteria into a parameterized WHERE clause"""
+    clauses = []
+    params = {}
+    
+    if criteria.organization:
+        org_clauses = []
+        for i, org in enumerate(criteria.organization):
+            params[f"org{i}"] = f"%{org.lower()}%"
+            org_clauses.append(f"LOWER(organization_detail) LIKE :org{i}")
+        clauses.append("(" + " OR ".join(org_clauses) + ")")
+    
+    if criteria.years_of_experience:
+        params["min_years"] = criteria.years_of_experience
+        clauses.append(f"{SQL_YEARS_EXPR} >= :min_years")
+    
+    if not clauses:
+        return None, {}
+    return " AND ".join(clauses), params
+
+def new_plan():
+    """Vector-first plan, the default until the SQL lookup says otherwise"""
+    return {
+        'strategy': 'vector_first',
+        'reason': '',
+        'predicate': None,
+        'candidates': None,
+        'selectivity': None,
+        'user_ids': [],
+        'elapsed_ms': 0.0
+    }
+
+_planner_lock = threading.Lock()
+_planner_failures = 0
+_planner_retry_at = 0.0
+
+def planner_backoff_remaining():
+    """Seconds until the planner tries the database again after a failure, 0 when healthy"""
+    with _planner_lock:
+        return max(0.0, _planner_retry_at - time.monotonic())
+
+def record_planner_result(ok):
+    """Back off exponentially after failed lookups; a successful one resets the backoff"""
+    global _planner_failures, _planner_retry_at
+    with _planner_lock:
+        if ok:
+            _planner_failures = 0
+            _planner_retry_at = 0.0
+            return
+        delay = min(PLANNER_BACKOFF_SECONDS * 2 ** _planner_failures, PLANNER_BACKOFF_MAX_SECONDS)
+        _planner_failures += 1
+        _planner_retry_at = time.monotonic() + delay
+    print(f"Search planner falls back to vector search for the next {delay:.0f}s")
+
+def plan_search(criteria: SearchCriteria, max_selectivity=None):
+    """Choose between SQL-first and vector-first retrieval for the given criteria.
+
+    While the database is backing off after a failure, queries go vector-first without
+    waiting on a connect timeout.
+    """
+    max_selectivity = SQL_FIRST_MAX_SELECTIVITY if max_selectivity is None else max_selectivity
+    start = time.perf_counter()
+    plan = new_plan()
+    
+    predicate, params = build_sql_predicate(criteria)
+    if predicate is None:
+        plan['reason'] = 'no hard filters'
+        return plan
+    plan['predicate'] = predicate
+    
+    backoff = planner_backoff_remaining()
+    if backoff:
+        plan['reason'] = f'database unavailable, retrying in {backoff:.0f}s'
+        return plan
+    
+    try:
+        total = get_profile_count()
+        # Fetching one row past the cap tells us the predicate is not selective enough
+        cap = max(1, int(total * max_selectivity))
+        with get_engine().connect() as conn:
+            rows = conn.execute(
+                sql_text(f"SELECT user_id FROM grandu_user WHERE {predicate} LIMIT :limit"),
+                {**params, 'limit': cap + 1}
+            ).fetchall()
+        decide_plan(plan, [row[0] for row in rows], total, cap, max_selectivity)
+        record_planner_result(True)
+    except Exception as e:
+        print(f"Error planning search, falling back to vector search: {e}")
+        plan['reason'] = f'planner error: {e}'
+        record_planner_result(False)
+    
+    plan['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    return plan
+
+def decide_plan(plan, user_ids, total, cap, max_selectivity):
+    """Pick SQL-first when the matching user_ids (fetched up to cap + 1) are few enough"""
+    plan['candidates'] = len(user_ids)
+    plan['selectivity'] = len(user_ids) / total if total else None
+    if not user_ids:
+        plan['reason'] = 'no profiles match the hard filters'
+    elif len(user_ids) > cap:
+        plan['reason'] = f'predicate keeps more than {max_selectivity:.0%} of profiles'
+    else:
+        plan['strategy'] = 'sql_first'
+        plan['reason'] = f'predicate keeps {len(user_ids)} of {total} profiles'
+        plan['user_ids'] = user_ids
+
+_profile_store = None
+
+def get_profile_store():
+    """Async profile store on the same database and pool settings as get_engine().
+
+    Needs an async driver: aiomysql for MySQL, aiosqlite for a SQLite stand-in.
+    """
+    global _profile_store
+    if _profile_store is None:
+        from profile_store import ProfileStore
+        _profile_store = ProfileStore(
+            DB_URI,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING
+        )
+    return _profile_store
+
+async def get_profiles(user_ids):
+    """Full profiles of the given users, e.g. every tile of a page, in one round trip"""
+    return await get_profile_store().get_profiles(user_ids)
+
+def index_cache(vector_store):
+    """Per-index cache of derived structures, reset whenever the index changes size.
+
+    Changes that keep the size (a changeset deleting and re-adding as many vectors) must
+    clear vector_store._expert_cache themselves, as apply_changeset does.
+    """
+    cache = getattr(vector_store, '_expert_cache', None)
+    if cache is None or cache.get('ntotal') != vector_store.index.ntotal:
+        cache = {'ntotal': vector_store.index.ntotal}
+        vector_store._expert_cache = cache
+    return cache
+
+def user_positions(vector_store):
+    """Map each user_id to the FAISS positions of its chunks"""
+    cache = index_cache(vector_store)
+    if 'user_positions' not in cache:
+        positions = {}
+        for position, doc_id in vector_store.index_to_docstore_id.items():
+            doc = vector_store.docstore.search(doc_id)
+            positions.setdefault(doc.metadata['user_id'], []).append(position)
+        cache['user_positions'] = positions
+    return cache['user_positions']
+
+def user_ids_to_positions(vector_store, user_ids):
+    """FAISS positions of every chunk of the given users, in user order"""
+    positions_by_user = user_positions(vector_store)
+    return [p for user_id in user_ids for p in positions_by_user.get(user_id, [])]
+
+def position_user_ids(vector_store):
+    """user_id of the chunk at every FAISS position"""
+    user_ids = np.zeros(vector_store.index.ntotal, dtype=np.int64)
+    for position, doc_id in vector_store.index_to_docstore_id.items():
+        user_ids[position] = vector_store.docstore.search(doc_id).metadata['user_id']
+    return user_ids
+
+def docstore_positions(vector_store):
+    """Map each docstore id to its FAISS position"""
+    cache = index_cache(vector_store)
+    if 'docstore_positions' not in cache:
+        cache['docstore_positions'] = {doc_id: position for position, doc_id in vector_store.index_to_docstore_id.items()}
+    return cache['docstore_positions']
+
+def document_vectors(vector_store, docs):
+    """Stored index vectors of the given documents, embedding only those the index lacks"""
+    positions = docstore_positions(vector_store)
+    vectors = np.zeros((len(docs), vector_store.index.d), dtype=np.float32)
+    found = [(i, positions[doc.id]) for i, doc in enumerate(docs) if getattr(doc, 'id', None) in positions]
+    if found:
+        rows, keys = zip(*found)
+        vectors[list(rows)] = vector_store.index.reconstruct_batch(np.array(keys, dtype=np.int64))
+    for i in sorted(set(range(len(docs))) - {row for row, _ in found}):
+        vectors[i] = vector_store.embeddings.embed_query(docs[i].page_content)
+    return vectors
+
+def get_suggestion_index(vector_store):
+    """Suggestion index over the organization, expertise and field values in the docstore"""
+    cache = index_cache(vector_store)
+    if 'suggestions' not in cache:
+        cache['suggestions'] = SuggestionIndex.from_metadata(
+            doc.metadata for doc in vector_store.docstore._dict.values()
+        )
+    return cache['suggestions']
+
+def suggest(retriever, prefix, limit=10):
+    """Autocomplete a partially typed query term from profile metadata"""
+    if retriever is None:
+        return []
+    return get_suggestion_index(retriever.vectorstore).suggest(prefix, limit)
+
+def correct_query(retriever, query, correct=None):
+    """(query to search, corrections) with likely typos fixed from the profile metadata.
+
+    correct=False searches the query as typed, so callers can offer to undo a correction.
+    """
+    correct = SPELL_CORRECTION_ENABLED if correct is None else correct
+    if not correct:
+        return query, []
+    corrected, corrections = get_suggestion_index(retriever.vectorstore).correct_query(query)
+    if corrections:
+        print("Corrected query: " + ", ".join(f"{old} -> {new}" for old, new in corrections))
+    return corrected, corrections
+
+def build_expansion_table(vector_store):
+    """Expansion table over the distinct expertise and field values in the docstore"""
+    terms = distinct_terms(doc.metadata for doc in vector_store.docstore._dict.values())
+    start = time.perf_counter()
+    table = ExpansionTable.build(
+        terms, vector_store.embeddings.embed_documents,
+        neighbors=EXPANSION_NEIGHBORS, min_similarity=EXPANSION_MIN_SIMILARITY
+    )
+    print(f"Built query expansion table: {len(terms)} terms in {time.perf_counter() - start:.1f}s")
+    return table
+
+def get_expansion_table(vector_store):
+    """Expansion table saved with the snapshot, or built once for indexes saved without one"""
+    table = getattr(vector_store, '_expansion_table', None)
+    if table is None:
+        table = vector_store._expansion_table = build_expansion_table(vector_store)
+    return table
+
+def embed_query_vectors(vector_store, query, expand=None):
+    """(search vector, query vector) from a single embedding of the query.
+
+    With query expansion on, the search vector is moved towards the terms the query mentions
+    and their neighbour terms; the query vector is the query alone, for reporting similarity.
+    """
+    vector = np.array([vector_store.embeddings.embed_query(query)], dtype=np.float32)
+    search_vector = vector.copy()
+    if QUERY_EXPANSION_ENABLED if expand is None else expand:
+        search_vector, expanded = get_expansion_table(vector_store).expand(
+            query, search_vector, weight=EXPANSION_WEIGHT, min_similarity=EXPANSION_MATCH_SIMILARITY
+        )
+        if expanded:
+            print(f"Expanded query with: {', '.join(expanded[:10])}")
+    if getattr(vector_store, '_normalize_L2', False):
+        faiss.normalize_L2(search_vector)
+        faiss.normalize_L2(vector)
+    return search_vector, vector
+
+def embed_query_for_index(vector_store, query, expand=None):
+    """Embed a query the same way the vector store does for its own searches"""
+    return embed_query_vectors(vector_store, query, expand)[0]
+
+def profile_vectors(vector_store):
+    """(user_ids, vectors) with one vector per profile: the mean of its chunk vectors"""
+    positions_by_user = user_positions(vector_store)
+    user_ids = sorted(positions_by_user)
+    vectors = np.zeros((len(user_ids), vector_store.index.d), dtype=np.float32)
+    for row, user_id in enumerate(user_ids):
+        positions = np.array(positions_by_user[user_id], dtype=np.int64)
+        vectors[row] = vector_store.index.reconstruct_batch(positions).mean(axis=0)
+    return user_ids, vectors
+
+def profile_document(vector_store, user_id):
+    """First chunk of a profile, which carries the profile's metadata; None if it is not indexed"""
+    positions = user_positions(vector_store).get(user_id)
+    if not positions:
+        return None
+    return vector_store.docstore.search(vector_store.index_to_docstore_id[positions[0]])
+
+def build_similarity_graph(vector_store):
+    """Similar-experts graph for the index, updated in place of a rebuild when only some profiles changed"""
+    start = time.perf_counter()
+    user_ids, vectors = profile_vectors(vector_store)
+    previous = getattr(vector_store, '_similarity_graph', None)
+    changed = getattr(vector_store, '_changed_user_ids', None)
+    if previous is not None and changed is not None and previous.k == SIMILAR_EXPERTS_K:
+        graph = previous.update(user_ids, vectors, changed)
+        detail = f"recomputed {graph.recomputed} of {len(user_ids)} profiles"
+    else:
+        graph = SimilarityGraph.build(user_ids, vectors, k=SIMILAR_EXPERTS_K)
+        detail = f"{len(user_ids)} profiles"
+    vector_store._changed_user_ids = None
+    print(f"Built similar-experts graph: {detail} in {time.perf_counter() - start:.1f}s")
+    return graph
+
+def get_similarity_graph(vector_store):
+    """Similar-experts graph saved with the snapshot, or built once for indexes saved without one"""
+    graph = getattr(vector_store, '_similarity_graph', None)
+    if graph is None:
+        graph = vector_store._similarity_graph = build_similarity_graph(vector_store)
+    return graph
+
+def similar_experts(retriever, user_id, limit=SIMILAR_EXPERTS_SHOWN):
+    """Profiles most similar to a given one, from the precomputed graph (no FAISS search)"""
+    if retriever is None or not SIMILAR_EXPERTS_ENABLED:
+        return []
+    vector_store = retriever.vectorstore
+    similar = []
+    for neighbor_id, score in get_similarity_graph(vector_store).similar(user_id, limit):
+        doc = profile_document(vector_store, neighbor_id)
+        if doc is None:
+            continue
+        metadata = doc.metadata
+        similar.append({
+            'user_id': neighbor_id,
+            'expert': f"{metadata['first_name']} {metadata['last_name']}",
+            'organization': metadata['organization_detail'],
+            'score': score
+        })
+    return similar
+
+def build_profile_clusters(vector_store):
+    """k-means clusters over the profile vectors, with a summary per cluster"""
+    start = time.perf_counter()
+    user_ids, vectors = profile_vectors(vector_store)
+    metadatas = [profile_document(vector_store, user_id).metadata for user_id in user_ids]
+    clusters = ProfileClusters.build(user_ids, vectors, metadatas, n_clusters=CLUSTER_COUNT or None)
+    print(f"Built {len(clusters.summaries)} profile clusters in {time.perf_counter() - start:.1f}s")
+    return clusters
+
+def get_profile_clusters(vector_store):
+    """Profile clusters saved with the snapshot, or built once for indexes saved without them"""
+    clusters = getattr(vector_store, '_profile_clusters', None)
+    if clusters is None:
+        clusters = vector_store._profile_clusters = build_profile_clusters(vector_store)
+    return clusters
+
+def list_clusters(retriever):
+    """Summaries of every profile cluster, largest first"""
+    if retriever is None or not CLUSTERS_ENABLED:
+        return []
+    summaries = get_profile_clusters(retriever.vectorstore).summaries
+    return sorted((summary for summary in summaries if summary['size']), key=lambda summary: -summary['size'])
+
+def cluster_members(retriever, cluster, limit=PAGE_SIZE, offset=0):
+    """Hits for a cluster's profiles, closest to its centroid first; no vector search involved"""
+    if retriever is None or not CLUSTERS_ENABLED:
+        return []
+    vector_store = retriever.vectorstore
+    hits = []
+    for user_id, score in get_profile_clusters(vector_store).members(cluster, limit, offset):
+        doc = profile_document(vector_store, user_id)
+        if doc is not None:
+            hits.append(ExpertHit(doc, 0.8, score))
+    return hits
+
+def is_broad_query(criteria: SearchCriteria):
+    """True when a query names a topic at most, with no hard filter that narrows it down"""
+    return (
+        not criteria.years_of_experience and not criteria.organization and not criteria.requirements
+        and len(criteria.expertise) + len(criteria.field_of_interest) <= 1
+    )
+
+def cluster_facets(retriever, query, criteria: SearchCriteria, n=None, query_vector=None):
+    """Summaries of the clusters closest to a broad query, so it can be narrowed by browsing"""
+    if not CLUSTERS_ENABLED or not is_broad_query(criteria):
+        return []
+    n = CLUSTER_FACETS if n is None else n
+    vector_store = retriever.vectorstore
+    clusters = get_profile_clusters(vector_store)
+    if query_vector is None:
+        query_vector = embed_query_for_index(vector_store, query)
+    return [{**clusters.summaries[cluster], 'score': score} for cluster, score in clusters.route(query_vector, n)]
+
+def search_by_user_ids(vector_store, query, user_ids, k=5, query_vector=None):
+    """Run the FAISS search restricted to the chunks of the given users"""
+    positions = user_ids_to_positions(vector_store, user_ids)
+    if not positions:
+        return []
+    
+    if query_vector is None:
+        query_vector = embed_query_for_index(vector_store, query)
+    selector = faiss.IDSelectorBatch(np.array(positions, dtype=np.int64))
+    _, indices = vector_store.index.search(
+        query_vector,
+        min(k, len(positions)),
+        params=faiss.SearchParameters(sel=selector)
+    )
+    return [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+        for i in indices[0] if i != -1
+    ]
+
+_cross_encoder = None
+_rerank_cache = OrderedDict()
+_rerank_cache_lock = threading.Lock()  # Searches re-rank from several threads
+
+def get_cross_encoder():
+    """Load the CPU cross-encoder once per process"""
+    global _cross_encoder
+    if _cross_encoder is None:
+        from sentence_transformers import CrossEncoder
+        _cross_encoder = CrossEncoder(RERANK_MODEL, device='cpu')
+    return _cross_encoder
+
+def rerank_documents(query, docs, k=5, top_n=None, budget_ms=None):
+    """Re-rank the top-N dense candidates with a cross-encoder, within a latency budget"""
+    top_n = RERANK_TOP_N if top_n is None else top_n
+    budget_ms = RERANK_BUDGET_MS if budget_ms is None else budget_ms
+    start = time.perf_counter()
+    candidates = docs[:top_n]
+    info = {'applied': False, 'candidates': len(candidates), 'scored': 0, 'cached': 0, 'elapsed_ms': 0.0, 'reason': ''}
+    
+    # Reuse scores from earlier identical (query, user) pairs
+    scores = [None] * len(candidates)
+    with _rerank_cache_lock:
+        for i, doc in enumerate(candidates):
+            key = (query, doc.metadata['user_id'])
+            if key in _rerank_cache:
+                _rerank_cache.move_to_end(key)
+                scores[i] = _rerank_cache[key]
+                info['cached'] += 1
+    missing = [i for i, score in enumerate(scores) if score is None]
+    
+    try:
+        model = get_cross_encoder() if missing else None
+        for batch_start in range(0, len(missing), RERANK_BATCH_SIZE):
+            batch = missing[batch_start:batch_start + RERANK_BATCH_SIZE]
+            batch_scores = model.predict(
+                [(query, candidates[i].page_content) for i in batch],
+                batch_size=len(batch)
+            )
+            # Scores are cached even when over budget, so a repeated query can still be re-ranked
+            with _rerank_cache_lock:
+                for i, score in zip(batch, batch_scores):
+                    scores[i] = float(score)
+                    _rerank_cache[(query, candidates[i].metadata['user_id'])] = scores[i]
+                    info['scored'] += 1
+                while len(_rerank_cache) > RERANK_CACHE_SIZE:
+                    _rerank_cache.popitem(last=False)
+            if (time.perf_counter() - start) * 1000 > budget_ms:
+                info['reason'] = f'latency budget of {budget_ms:.0f} ms exceeded'
+                break
+    except Exception as e:
+        print(f"Error re-ranking results: {e}")
+        info['reason'] = f'cross-encoder error: {e}'
+    
+    info['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    if info['reason'] or any(score is None for score in scores):
+        return docs[:k], info
+    
+    order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    info['applied'] = True
+    return ([candidates[i] for i in order] + docs[top_n:])[:k], info
+
+def select_diverse(query_vector, candidate_vectors, organizations, k,
+                   lambda_mult=DIVERSITY_LAMBDA, max_per_org=MAX_PER_ORGANIZATION):
+    """Greedy maximal marginal relevance with a per-organization cap.
+
+    Works on the stored candidate vectors, so nothing is re-embedded. Returns the
+    positions of the selected candidates in selection order.
+    """
+    n = len(candidate_vectors)
+    if n == 0:
+        return []
+    vectors = candidate_vectors / np.maximum(np.linalg.norm(candidate_vectors, axis=1, keepdims=True), 1e-12)
+    query = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+    relevance = vectors @ query
+    pairwise = vectors @ vectors.T
+    _, org_ids = np.unique(np.asarray(organizations, dtype=object).astype(str), return_inverse=True)
+    
+    selected = []
+    redundancy = np.zeros(n, dtype=np.float32)  # Max similarity to anything already selected
+    blocked = np.zeros(n, dtype=bool)
+    org_counts = np.zeros(org_ids.max() + 1, dtype=np.int32)
+    for _ in range(min(k, n)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[blocked] = -np.inf
+        best = int(np.argmax(scores))
+        if not np.isfinite(scores[best]):
+            break
+        selected.append(best)
+        blocked[best] = True
+        redundancy = np.maximum(redundancy, pairwise[best])
+        org_counts[org_ids[best]] += 1
+        if max_per_org and org_counts[org_ids[best]] >= max_per_org:
+            blocked |= org_ids == org_ids[best]
+    return selected
+
+def diverse_search_by_vector(vector_store, query_vector, k=5, fetch_k=DIVERSITY_FETCH_K, lambda_mult=DIVERSITY_LAMBDA,
+                             max_per_org=MAX_PER_ORGANIZATION, user_ids=None):
+    """Top-k for an embedded (1, d) query vector that trades relevance for variety over a larger FAISS candidate pool"""
+    params = None
+    if user_ids is not None:
+        positions = user_ids_to_positions(vector_store, user_ids)
+        if not positions:
+            return []
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.array(positions, dtype=np.int64)))
+    
+    _, indices = vector_store.index.search(query_vector, max(k, fetch_k), params=params)
+    positions = indices[0][indices[0] != -1]
+    if len(positions) == 0:
+        return []
+    
+    candidates = [vector_store.docstore.search(vector_store.index_to_docstore_id[int(i)]) for i in positions]
+    vectors = vector_store.index.reconstruct_batch(positions.astype(np.int64))
+    order = select_diverse(
+        query_vector[0], vectors, [doc.metadata.get('organization_detail') for doc in candidates],
+        k, lambda_mult=lambda_mult, max_per_org=max_per_org
+    )
+    return [candidates[i] for i in order]
+
+class ExpertRetriever(BaseRetriever):
+    """Base for retrieval modes that need more than the stock FAISS retriever.
+
+    query_retriever calls search_documents directly so it can widen k, restrict the
+    search to SQL candidates or reuse its query vector; invoke() uses search_kwargs like
+    VectorStoreRetriever.
+    """
+    vectorstore: FAISS
+    search_kwargs: dict = Field(default_factory=lambda: {"k": 5})
+    
+    def search_documents(self, query, k, user_ids=None, query_vector=None):
+        """Plain top-k similarity, optionally restricted to the given users; subclasses override it"""
+        if query_vector is None:
+            query_vector = embed_query_for_index(self.vectorstore, query)
+        if user_ids is not None:
+            return search_by_user_ids(self.vectorstore, query, user_ids, k=k, query_vector=query_vector)
+        return self.vectorstore.similarity_search_by_vector(query_vector[0].tolist(), k=k)
+    
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.search_documents(query, k=self.search_kwargs.get("k", 5))
+
+class DiverseRetriever(ExpertRetriever):
+    """MMR re-selection with a per-organization cap over the FAISS candidates"""
+    fetch_k: int = DIVERSITY_FETCH_K
+    lambda_mult: float = DIVERSITY_LAMBDA
+    max_per_org: int = MAX_PER_ORGANIZATION
+    
+    def search_documents(self, query, k, user_ids=None, query_vector=None):
+        if query_vector is None:
+            query_vector = embed_query_for_index(self.vectorstore, query)
+        return diverse_search_by_vector(
+            self.vectorstore, query_vector, k=k, fetch_k=max(self.fetch_k, k),
+            lambda_mult=self.lambda_mult, max_per_org=self.max_per_org, user_ids=user_ids
+        )
+
+def get_binary_codes(vector_store):
+    """Binary codes of every indexed vector, built once per index"""
+    cache = index_cache(vector_store)
+    if 'binary_codes' not in cache:
+        positions = np.arange(vector_store.index.ntotal, dtype=np.int64)
+        cache['binary_codes'] = BinaryCodes(vector_store.index.reconstruct_batch(positions))
+    return cache['binary_codes']
+
+def binary_search_positions(vector_store, query_vector, k=5, rescore_k=BINARY_RESCORE_K, positions=None):
+    """FAISS positions of the top-k: Hamming candidates re-ranked by exact float distance"""
+    candidates = get_binary_codes(vector_store).search(query_vector, max(k, rescore_k), positions)
+    if len(candidates) == 0:
+        return candidates
+    vectors = vector_store.index.reconstruct_batch(candidates.astype(np.int64))
+    if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        order = np.argsort(-(vectors @ query_vector[0]), kind='stable')
+    else:
+        order = np.argsort(((vectors - query_vector[0]) ** 2).sum(axis=1), kind='stable')
+    return candidates[order[:k]]
+
+def binary_search_by_vector(vector_store, query_vector, k=5, rescore_k=BINARY_RESCORE_K, user_ids=None):
+    """Two-stage search for an embedded (1, d) query vector: Hamming scan over bit codes, then float re-scoring"""
+    positions = None
+    if user_ids is not None:
+        positions = user_ids_to_positions(vector_store, user_ids)
+        if not positions:
+            return []
+    found = binary_search_positions(vector_store, query_vector, k=k, rescore_k=rescore_k, positions=positions)
+    return [vector_store.docstore.search(vector_store.index_to_docstore_id[int(i)]) for i in found]
+
+class BinaryRetriever(ExpertRetriever):
+    """Binary-code candidate generation with float re-scoring, for very large indexes"""
+    rescore_k: int = BINARY_RESCORE_K
+    
+    def search_documents(self, query, k, user_ids=None, query_vector=None):
+        if query_vector is None:
+            query_vector = embed_query_for_index(self.vectorstore, query)
+        return binary_search_by_vector(self.vectorstore, query_vector, k=k, rescore_k=self.rescore_k, user_ids=user_ids)
+
+def split_documents(documents):
+    """Split profile documents into the chunks that get embedded"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        length_function=len
+    )
+    return text_splitter.split_documents(documents)
+
+def document_full_name(doc):
+    """Full name of the profile a document belongs to, as used in changesets"""
+    return f"{doc.metadata['first_name']} {doc.metadata['last_name']}".strip()
+
+def changeset_matcher(changeset):
+    """Predicate telling whether a document belongs to a profile named in a changeset.
+
+    Entries are matched on user_id when they carry one, else on (full_name, linkedin_profile),
+    the key exl_to_Postgres upserts on. Indexed profiles without a linkedin_profile in their
+    metadata can only be matched on full_name.
+    """
+    entries = [entry for section in ('inserted', 'updated', 'deleted') for entry in changeset.get(section, [])]
+    user_ids = {int(entry['user_id']) for entry in entries if entry.get('user_id') is not None}
+    profiles = {
+        (entry['full_name'], entry.get('linkedin_profile') or '')
+        for entry in entries if entry.get('user_id') is None
+    }
+    full_names = {full_name for full_name, _ in profiles}
+
+    def matches(doc):
+        if doc.metadata.get('user_id') in user_ids:
+            return True
+        if 'linkedin_profile' in doc.metadata:
+            return (document_full_name(doc), doc.metadata['linkedin_profile'] or '') in profiles
+        return document_full_name(doc) in full_names
+    return matches
+
+def apply_changeset(vector_store, changeset):
+    """Re-embed only the profiles touched by a changeset instead of rebuilding the index
+
+    Every matched profile is dropped and then re-added from its current row, if it still has
+    one; deleted profiles simply have none. A loose (full_name only) match therefore re-embeds
+    a namesake rather than removing it.
+
+    The current rows are read and embedded before anything is deleted, so a database or
+    encoder failure raises with the index unchanged.
+    """
+    global _profile_count
+    if isinstance(vector_store.index, ShardedIndex):
+        raise TypeError("Sharded indexes are read-only; apply the changeset to the unsharded index and reshard")
+    if not any(changeset.get(section) for section in ('inserted', 'updated', 'deleted')):
+        return 0
+    matches = changeset_matcher(changeset)
+
+    # Embed the current version of the affected profiles that still exist
+    documents = [doc for doc in load_profile_documents() if matches(doc)]
+    chunks = split_documents(documents)
+    vectors = vector_store.embeddings.embed_documents([chunk.page_content for chunk in chunks]) if chunks else []
+
+    # Drop every chunk that belongs to an affected profile, then add the new ones
+    stale_ids = [doc_id for doc_id, doc in vector_store.docstore._dict.items() if matches(doc)]
+    changed_user_ids = {vector_store.docstore._dict[doc_id].metadata['user_id'] for doc_id in stale_ids}
+    if stale_ids:
+        vector_store.delete(stale_ids)
+    if chunks:
+        vector_store.add_embeddings(
+            zip([chunk.page_content for chunk in chunks], vectors), metadatas=[chunk.metadata for chunk in chunks]
+        )
+    changed_user_ids |= {doc.metadata['user_id'] for doc in documents}
+
+    # Positions moved even if the index size did not
+    vector_store._expert_cache = None
+    # Inserts and deletes change the denominator of the planner's selectivity estimates
+    _profile_count = None
+
+    # Profiles whose neighbour lists the next snapshot has to revisit
+    vector_store._changed_user_ids = (getattr(vector_store, '_changed_user_ids', None) or set()) | changed_user_ids
+
+    print(f"Applied changeset: removed {len(stale_ids)} chunks, re-embedded {len(documents)} profiles")
+    return len(documents)
+
+def refresh_from_changeset(vector_store, changeset_path=CHANGESET_PATH):
+    """Apply a pending changeset to a loaded index and publish the result as a new snapshot"""
+    if not os.path.exists(changeset_path):
+        return vector_store
+    try:
+        with open(changeset_path, encoding='utf-8') as f:
+            changeset = json.load(f)
+        apply_changeset(vector_store, changeset)
+        save_index_snapshot(vector_store)
+        # Keep the consumed changeset for auditing, but never apply it twice
+        os.replace(changeset_path, f"{changeset_path}.applied")
+    except Exception as e:
+        # Nothing was published and the changeset stays pending, so the next load retries it
+        print(f"Error applying changeset {changeset_path}, left in place: {e}")
+    return vector_store
+
+def compute_index_version(index_path):
+    """Identifier that changes whenever a legacy (unversioned) index is rewritten"""
+    stat = os.stat(os.path.join(index_path, "index.faiss"))
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def get_index_version(retriever):
+    """Version of the index a retriever serves, used to key caches of search results"""
+    if retriever is None:
+        return None
+    return getattr(retriever.vectorstore, '_index_version', None)
+
+def embedding_model_kwargs(backend):
+    """SentenceTransformer arguments for an encoder backend (ONNX needs sentence-transformers[onnx] >= 3.2)"""
+    if backend == "torch":
+        return {'device': 'cpu'}
+    if backend == "onnx":
+        return {'device': 'cpu', 'backend': 'onnx'}
+    if backend == "onnx-int8":
+        return {'device': 'cpu', 'backend': 'onnx', 'model_kwargs': {'file_name': EMBEDDINGS_ONNX_INT8_FILE}}
+    raise ValueError(f"Unknown embeddings backend {backend!r}, expected one of {EMBEDDINGS_BACKENDS}")
+
+def load_embeddings(backend=EMBEDDINGS_BACKEND):
+    """Embedding model on the given backend; all backends produce vectors for the same index"""
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDINGS_MODEL,
+        model_kwargs=embedding_model_kwargs(backend)
+    )
+
+_embeddings = None
+_embeddings_backend = None
+
+def get_embeddings():
+    """Embedding model, loaded once per process and shared by every index load"""
+    global _embeddings, _embeddings_backend
+    if _embeddings is None:
         try:
-            # Remove any leading/trailing whitespace and convert to list of tuples
-            results_list = ast.literal_eval(results.strip())
-            
-            for row in results_list:
-                # Create a structured text representation
-                text = f"""
-                Expertise: {row[3]}
-                Years of Experience: {row[4]}
-                Organization: {row[5]}
-                Field of Interest: {row[6]}
-                Requirements: {row[7]}
-                """
-                
-                # Create metadata for the document
-                metadata = {
-                    'user_id': row[0],
-                    'first_name': row[1],
-                    'last_name': row[2],
-                    'expertise': row[3],
-                    'years_of_experience': row[4],
-                    'organization_detail': row[5],
-                    'field_of_interest': row[6],
-                    'requirements': row[7]
-                }
-                
-                # Create a Document object with text and metadata
-                doc = Document(
-                    page_content=text,
-                    metadata=metadata
-                )
-                documents.append(doc)
-                
-            print(f"Successfully processed {len(documents)} expert profiles")
-            return documents
-            
+            _embeddings, _embeddings_backend = load_embeddings(EMBEDDINGS_BACKEND), EMBEDDINGS_BACKEND
         except Exception as e:
-            print(f"Error parsing results: {e}")
-            print(f"Raw results: {results}")
-            return []
-            
+            if EMBEDDINGS_BACKEND == "torch":
+                raise
+            print(f"Error loading {EMBEDDINGS_BACKEND} embeddings backend, falling back to torch: {e}")
+            _embeddings, _embeddings_backend = load_embeddings("torch"), "torch"
+    return _embeddings
+
+def save_index_snapshot(vector_store):
+    """Write the index as a new versioned snapshot and make it the current one"""
+    extra_manifest = {'embeddings_backend': _embeddings_backend or EMBEDDINGS_BACKEND}
+    extra_files = {}
+    if isinstance(vector_store.embeddings, ProjectedEmbeddings):
+        projection = vector_store.embeddings.projection
+        extra_manifest['projection'] = {
+            'type': 'pca',
+            'dims': projection.dims,
+            'input_dims': projection.input_dims,
+            'explained_variance': float(projection.explained_variance_ratio.sum())
+        }
+        extra_files[PROJECTION_FILE] = projection.save
+    if QUERY_EXPANSION_ENABLED:
+        # The corpus may have changed since the table was built, so build it for this snapshot
+        table = vector_store._expansion_table = build_expansion_table(vector_store)
+        extra_manifest['expansion'] = {'terms': len(table.terms), 'neighbors': EXPANSION_NEIGHBORS}
+        extra_files[EXPANSION_FILE] = table.save
+    if EMBEDDING_MATRIX_ENABLED:
+        extra_manifest['embedding_matrix'] = {'file': EMBEDDINGS_FILE, 'row_map': ROW_MAP_FILE, 'dtype': 'float32'}
+        extra_files[EMBEDDINGS_FILE] = lambda path: write_embedding_matrix(vector_store.index, path)
+        extra_files[ROW_MAP_FILE] = lambda path: write_row_map(position_user_ids(vector_store), path)
+    if CLUSTERS_ENABLED:
+        clusters = vector_store._profile_clusters = build_profile_clusters(vector_store)
+        extra_manifest['clusters'] = {'clusters': len(clusters.summaries), 'profiles': len(clusters.user_ids)}
+        extra_files[CLUSTERS_FILE] = clusters.save
+    if SIMILAR_EXPERTS_ENABLED:
+        graph = vector_store._similarity_graph = build_similarity_graph(vector_store)
+        extra_manifest['similar_experts'] = {'profiles': len(graph.user_ids), 'k': graph.k}
+        extra_files[SIMILARITY_GRAPH_FILE] = graph.save
+    version = write_snapshot(
+        vector_store, FAISS_INDEX_DIR, EMBEDDINGS_MODEL,
+        extra_manifest=extra_manifest, extra_files=extra_files, keep=SNAPSHOT_KEEP
+    )
+    vector_store._index_version = version
+    print(f"Saved FAISS index snapshot {version}")
+    return version
+
+def load_embedding_matrix(version=None):
+    """(matrix, user_ids) of a snapshot (default: the current one), memory-mapped rather than read.
+
+    Row i is the vector at FAISS position i, so analytics can run on the indexed vectors
+    without loading the index or re-embedding anything.
+    """
+    version = version or current_version(FAISS_INDEX_DIR)
+    if not version:
+        raise FileNotFoundError(f"No index snapshot in {FAISS_INDEX_DIR}")
+    return open_embedding_matrix(snapshot_path(FAISS_INDEX_DIR, version))
+
+def load_index_snapshot(version, embeddings):
+    """Load one snapshot after checking it against its manifest; None if it is unusable"""
+    try:
+        manifest = read_manifest(FAISS_INDEX_DIR, version)
+        if manifest['model'] != EMBEDDINGS_MODEL:
+            print(f"Snapshot {version} was built with {manifest['model']}, not {EMBEDDINGS_MODEL}")
+            return None
+        if SNAPSHOT_VERIFY:
+            ok, reason = verify_snapshot(FAISS_INDEX_DIR, version)
+            if not ok:
+                print(f"Snapshot {version} failed verification: {reason}")
+                return None
+        if manifest.get('projection'):
+            # Queries must go through the same projection the documents were indexed with
+            projection = PCAProjection.load(os.path.join(snapshot_path(FAISS_INDEX_DIR, version), PROJECTION_FILE))
+            embeddings = ProjectedEmbeddings(embeddings, projection)
+        vector_store = FAISS.load_local(
+            snapshot_path(FAISS_INDEX_DIR, version),
+            embeddings,
+            allow_dangerous_deserialization=True  # Safe since we created the index
+        )
+        if vector_store.index.ntotal != manifest['doc_count'] or vector_store.index.d != manifest['dimension']:
+            print(f"Snapshot {version} does not match its manifest")
+            return None
+        expansion_path = os.path.join(snapshot_path(FAISS_INDEX_DIR, version), EXPANSION_FILE)
+        if os.path.exists(expansion_path):
+            vector_store._expansion_table = ExpansionTable.load(expansion_path)
+        graph_path = os.path.join(snapshot_path(FAISS_INDEX_DIR, version), SIMILARITY_GRAPH_FILE)
+        if os.path.exists(graph_path):
+            vector_store._similarity_graph = SimilarityGraph.load(graph_path)
+        clusters_path = os.path.join(snapshot_path(FAISS_INDEX_DIR, version), CLUSTERS_FILE)
+        if os.path.exists(clusters_path):
+            vector_store._profile_clusters = ProfileClusters.load(clusters_path)
     except Exception as e:
-        print(f"Error connecting to database: {e}")
-        return []
+        print(f"Error loading snapshot {version}: {e}")
+        return None
+    vector_store._index_version = version
+    return vector_store
+
+def build_projected_store(texts, embeddings, dims):
+    """Build the index from PCA-projected vectors; the projection then applies to every query"""
+    vectors = embeddings.embed_documents([doc.page_content for doc in texts])
+    projection = PCAProjection.fit(vectors, dims)
+    print(f"PCA projection {projection.input_dims} -> {projection.dims} dims keeps "
+          f"{projection.explained_variance_ratio.sum():.1%} of the variance")
+    return FAISS.from_embeddings(
+        zip([doc.page_content for doc in texts], projection.transform(vectors).tolist()),
+        ProjectedEmbeddings(embeddings, projection),
+        metadatas=[doc.metadata for doc in texts]
+    )
+
+def create_or_load_vector_store(version=None):
+    """Create new vector store or load existing one
 
-def create_or_load_vector_store():
-    """Create new vector store or load existing one"""
+    Loads the given snapshot, or the current one; an explicitly requested snapshot that
+    cannot be loaded returns None instead of triggering a rebuild.
+    """
     # Create directory if it doesn't exist
     if not os.path.exists(FAISS_INDEX_DIR):
         os.makedirs(FAISS_INDEX_DIR)
     
     # Initialize embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name=EMBEDDINGS_MODEL,
-        model_kwargs={'device': 'cpu'}
-    )
+    embeddings = get_embeddings()
+    
+    requested = version
+    version = version or current_version(FAISS_INDEX_DIR)
+    if version:
+        print(f"Loading FAISS index snapshot {version}...")
+        vector_store = load_index_snapshot(version, embeddings)
+        if vector_store is not None:
+            print("Successfully loaded existing index")
+            return refresh_from_changeset(vector_store)
+        if requested:
+            return None
     
-    # Check if we have a saved index
+    # Indexes saved before snapshots existed; the next change writes them as a snapshot
     index_path = os.path.join(FAISS_INDEX_DIR, "faiss_index")
     if os.path.exists(index_path):
         print("Loading existing FAISS index...")
@@ -190,7 +1243,8 @@ def create_or_load_vector_store():
                 allow_dangerous_deserialization=True  # Safe since we created the index
             )
             print("Successfully loaded existing index")
-            return vector_store
+            vector_store._index_version = compute_index_version(index_path)
+            return refresh_from_changeset(vector_store)
         except Exception as e:
             print(f"Error loading index: {e}")
             print("Creating new index...")
@@ -203,100 +1257,227 @@ def create_or_load_vector_store():
         print("No documents to create index")
         return None
     
-    # Initialize text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len
-    )
-    
     # Split documents into chunks
-    texts = text_splitter.split_documents(documents)
+    texts = split_documents(documents)
     
     # Create FAISS vector store
-    vector_store = FAISS.from_documents(texts, embeddings)
+    if EMBEDDINGS_PCA_DIMS:
+        vector_store = build_projected_store(texts, embeddings, EMBEDDINGS_PCA_DIMS)
+    else:
+        vector_store = FAISS.from_documents(texts, embeddings)
     
     # Save the index
-    vector_store.save_local(index_path)
-    print(f"Saved FAISS index to {index_path}")
+    save_index_snapshot(vector_store)
+    
+    # A full rebuild already reflects any pending changeset
+    if os.path.exists(CHANGESET_PATH):
+        os.replace(CHANGESET_PATH, f"{CHANGESET_PATH}.applied")
     
     return vector_store
 
-def setup_retriever():
+def shard_vector_store(vector_store, n_shards=None, key=None):
+    """Swap a loaded store's flat index for a ShardedIndex partitioned by a metadata field.
+
+    Positions are kept, so the docstore mapping and everything built on it still apply.
+    Call this only after all changes have been saved; the sharded index is read-only.
+    """
+    n_shards = FAISS_SHARDS if n_shards is None else n_shards
+    key = FAISS_SHARD_KEY if key is None else key
+    assignments = np.zeros(vector_store.index.ntotal, dtype=np.int64)
+    for position, doc_id in vector_store.index_to_docstore_id.items():
+        doc = vector_store.docstore.search(doc_id)
+        assignments[position] = shard_for(doc.metadata.get(key), n_shards)
+    vector_store.index = ShardedIndex(vector_store.index, assignments, n_shards)
+    print(f"Sharded FAISS index by {key}: {vector_store.index.shard_sizes()} vectors per shard")
+    return vector_store
+
+def setup_retriever(mode=None, version=None):
     """Setup the retrieval system"""
     # Create or load vector store
-    vector_store = create_or_load_vector_store()
+    vector_store = create_or_load_vector_store(version)
     
     if not vector_store:
         print("Failed to create or load vector store")
         return None
     
-    # Create retriever with similarity scores
-    retriever = vector_store.as_retriever(
-        search_type="similarity",
-        search_kwargs={
-            "k": 5  # Return top 5 most similar documents
-        }
-    )
+    if FAISS_SHARDS > 1:
+        vector_store = shard_vector_store(vector_store)
+    
+    mode = mode or RETRIEVAL_MODE
+    if mode == "diverse":
+        # Re-select a larger candidate pool for variety across organizations
+        retriever = DiverseRetriever(
+            vectorstore=vector_store, search_kwargs={"k": 5}, fetch_k=DIVERSITY_FETCH_K,
+            lambda_mult=DIVERSITY_LAMBDA, max_per_org=MAX_PER_ORGANIZATION
+        )
+    elif mode == "binary":
+        # Scan compact bit codes first and only touch float vectors for the survivors
+        retriever = BinaryRetriever(vectorstore=vector_store, search_kwargs={"k": 5}, rescore_k=BINARY_RESCORE_K)
+        codes = get_binary_codes(vector_store)
+        print(f"Binary codes: {codes.nbytes / 1024 / 1024:.2f} MiB for {vector_store.index.ntotal} vectors")
+    else:
+        # Create retriever with similarity scores
+        retriever = vector_store.as_retriever(
+            search_type="similarity",
+            search_kwargs={
+                "k": 5  # Return top 5 most similar documents
+            }
+        )
+    
+    # Build the suggestion index now rather than on the first query
+    if SPELL_CORRECTION_ENABLED:
+        get_suggestion_index(vector_store)
+    if QUERY_EXPANSION_ENABLED:
+        get_expansion_table(vector_store)
+    if SIMILAR_EXPERTS_ENABLED:
+        get_similarity_graph(vector_store)
+    if CLUSTERS_ENABLED:
+        get_profile_clusters(vector_store)
+    
+    # Load the cross-encoder up front so model loading does not eat the first query's budget
+    if RERANK_ENABLED:
+        try:
+            get_cross_encoder()
+        except Exception as e:
+            print(f"Error loading re-rank model: {e}")
     
     return retriever
 
-def calculate_metrics(results):
-    """Calculate various metrics for the retrieval results"""
-    if not results:
-        return {
-            'total_results': 0,
-            'average_score': 0.0,
-            'max_score': 0.0,
-            'min_score': 0.0,
-            'score_std': 0.0,
-            'perplexity': 0.0,
-            'average_cosine_similarity': 0.0,
+def open_index_handle(mode=None, watch=True):
+    """Retriever handle that follows the current snapshot and hot-swaps to new ones.
+
+    Call handle.get() per query; handle.reload() is the admin hook for an immediate swap.
+    """
+    handle = IndexHandle(
+        FAISS_INDEX_DIR,
+        loader=lambda version: setup_retriever(mode=mode, version=version),
+        poll_interval=SNAPSHOT_POLL_SECONDS,
+        version_of=get_index_version
+    )
+    handle.get()
+    if watch:
+        handle.start_watching()
+    return handle
+
+def pack_scores(groups):
+    """Pack the scores of several result groups into padded matrices plus group lengths"""
+    lengths = np.array([len(results) for results in groups], dtype=np.int64)
+    width = max(int(lengths.max()) if len(lengths) else 0, 1)
+    scores = np.zeros((len(groups), width), dtype=np.float64)
+    cosine_scores = np.zeros((len(groups), width), dtype=np.float64)
+    for row, results in enumerate(groups):
+        scores[row, :len(results)] = [result.get('similarity_score', 0) for result in results]
+        cosine_scores[row, :len(results)] = [result.get('cosine_similarity', 0) for result in results]
+    return scores, cosine_scores, lengths
+
+def calculate_perplexity_batch(scores, lengths):
+    """Perplexity of each row of a padded score matrix (0.0 for empty rows)"""
+    mask = np.arange(scores.shape[1]) < lengths[:, None]
+    masked = np.where(mask, scores, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        probs = masked / masked.sum(axis=1, keepdims=True)
+        entropy = -np.sum(np.where(mask, probs * np.log(probs + 1e-10), 0.0), axis=1)
+    return np.where(lengths > 0, np.exp(entropy), 0.0)
+
+def calculate_metrics_batch(scores, cosine_scores, lengths):
+    """Metrics for many result groups in one pass over a packed score matrix.
+
+    Row i holds the first lengths[i] scores of group i (the rest is padding).
+    Returns one dict per group, shaped like calculate_metrics.
+    """
+    mask = np.arange(scores.shape[1]) < lengths[:, None]
+    counts = np.maximum(lengths, 1)
+    masked = np.where(mask, scores, 0.0)
+    
+    mean = masked.sum(axis=1) / counts
+    variance = np.maximum((masked * masked).sum(axis=1) / counts - mean * mean, 0.0)
+    max_score = np.where(mask, scores, -np.inf).max(axis=1)
+    min_score = np.where(mask, scores, np.inf).min(axis=1)
+    mean_cosine = np.where(mask, cosine_scores, 0.0).sum(axis=1) / counts
+    perplexity = calculate_perplexity_batch(scores, lengths)
+    high = (mask & (scores >= 0.8)).sum(axis=1)
+    medium = (mask & (scores >= 0.5) & (scores < 0.8)).sum(axis=1)
+    low = (mask & (scores < 0.5)).sum(axis=1)
+    
+    # Empty groups report zeros, like calculate_metrics always has
+    empty = lengths == 0
+    columns = zip(
+        lengths.tolist(),
+        np.where(empty, 0.0, mean).tolist(),
+        np.where(empty, 0.0, max_score).tolist(),
+        np.where(empty, 0.0, min_score).tolist(),
+        np.where(empty, 0.0, np.sqrt(variance)).tolist(),
+        perplexity.tolist(),
+        np.where(empty, 0.0, mean_cosine).tolist(),
+        high.tolist(), medium.tolist(), low.tolist()
+    )
+    return [
+        {
+            'total_results': total,
+            'average_score': average,
+            'max_score': maximum,
+            'min_score': minimum,
+            'score_std': std,
+            'perplexity': group_perplexity,
+            'average_cosine_similarity': cosine,
             'score_distribution': {
-                'high': 0,
-                'medium': 0,
-                'low': 0
+                'high': n_high,
+                'medium': n_medium,
+                'low': n_low
             }
         }
-        
-    # Extract similarity scores
-    scores = [result.get('similarity_score', 0) for result in results]
-    cosine_scores = [result.get('cosine_similarity', 0) for result in results]
-    
-    metrics = {
-        'total_results': len(results),
-        'average_score': np.mean(scores),
-        'max_score': max(scores),
-        'min_score': min(scores),
-        'score_std': np.std(scores),
-        'perplexity': calculate_perplexity(scores),
-        'average_cosine_similarity': np.mean(cosine_scores),
-        'score_distribution': {
-            'high': len([s for s in scores if s >= 0.8]),
-            'medium': len([s for s in scores if 0.5 <= s < 0.8]),
-            'low': len([s for s in scores if s < 0.5])
-        }
-    }
-    
-    return metrics
+        for total, average, maximum, minimum, std, group_perplexity, cosine, n_high, n_medium, n_low in columns
+    ]
+
+def calculate_metrics_for_groups(groups):
+    """Calculate metrics for several result lists with a single vectorized call"""
+    if not groups:
+        return []
+    return calculate_metrics_batch(*pack_scores(groups))
+
+def calculate_metrics(results):
+    """Calculate various metrics for the retrieval results"""
+    return calculate_metrics_for_groups([results])[0]
+
+def criteria_given(criteria: SearchCriteria):
+    """True when any criterion was extracted from the query"""
+    return bool(
+        criteria.years_of_experience or criteria.expertise or criteria.organization
+        or criteria.field_of_interest or criteria.requirements
+    )
 
 def filter_results_by_criteria(results, criteria: SearchCriteria):
-    """Filter results based on extracted search criteria and separate into exact and recommended matches"""
+    """Filter results based on extracted search criteria and separate into exact and recommended matches
+
+    With no criteria at all (e.g. rule-based fallback on a query without a years figure)
+    there is nothing to match against, so the dense hits are kept in ranked order as
+    recommended matches instead of all scoring 0 and being dropped.
+    """
+    if not criteria_given(criteria):
+        for result in results:
+            result['match_percentage'] = 0.0
+        return [], list(results)
+    
     exact_matches = []
     recommended_matches = []
     
-    for result in results:
+    # Evaluate the experience range predicate for all results at once
+    if criteria.years_of_experience:
+        years_min = np.array([
+            np.nan if result['years_min'] is None else result['years_min']
+            for result in results
+        ], dtype=np.float32)
+        meets_experience = experience_mask(years_min, min_years=criteria.years_of_experience)
+    
+    for i, result in enumerate(results):
         match_score = 0
         total_criteria = 0
         
         # Check years of experience
         if criteria.years_of_experience and result['years_of_experience']:
             total_criteria += 1
-            try:
-                if int(result['years_of_experience']) >= criteria.years_of_experience:
-                    match_score += 1
-            except ValueError:
-                pass
+            if meets_experience[i]:
+                match_score += 1
         
         # Check expertise
         if criteria.expertise and result['expertise']:
@@ -327,9 +1508,9 @@ def filter_results_by_criteria(results, criteria: SearchCriteria):
         result['match_percentage'] = match_percentage
         
         # Categorize as exact or recommended match
-        if match_percentage == 1.0:  # Perfect match
+        if match_percentage >= EXACT_MATCH_THRESHOLD:  # Perfect match
             exact_matches.append(result)
-        elif match_percentage >= 0.5:  # Partial match
+        elif match_percentage >= RECOMMENDED_MATCH_THRESHOLD:  # Partial match
             recommended_matches.append(result)
     
     # Sort recommended matches by match percentage
@@ -337,68 +1518,375 @@ def filter_results_by_criteria(results, criteria: SearchCriteria):
     
     return exact_matches, recommended_matches
 
-def query_retriever(retriever, query):
+def retrieve_documents(retriever, query, plan, rerank=None, k=None, query_vector=None):
+    """Fetch the candidate documents for a query according to the search plan.
+
+    query_vector is the query as embedded by embed_query_for_index; it is computed here
+    when the caller has not done so already.
+    """
+    # Widen the candidate pool when re-ranking
+    rerank = RERANK_ENABLED if rerank is None else rerank
+    k = k or retriever.search_kwargs.get('k', 5)
+    fetch_k = max(k, RERANK_TOP_N) if rerank else k
+    if query_vector is None:
+        query_vector = embed_query_for_index(retriever.vectorstore, query)
+    if isinstance(retriever, ExpertRetriever):
+        user_ids = plan['user_ids'] if plan['strategy'] == 'sql_first' else None
+        docs = retriever.search_documents(query, k=fetch_k, user_ids=user_ids, query_vector=query_vector)
+    elif plan['strategy'] == 'sql_first':
+        docs = search_by_user_ids(retriever.vectorstore, query, plan['user_ids'], k=fetch_k, query_vector=query_vector)
+    else:
+        # With query expansion on, the expanded vector replaces the plain embedding the stock retriever would use
+        docs = retriever.vectorstore.similarity_search_by_vector(query_vector[0].tolist(), k=fetch_k)
+    
+    rerank_info = None
+    if rerank:
+        docs, rerank_info = rerank_documents(query, docs, k=k)
+    return docs, rerank_info
+
+class ExpertHit(MutableMapping):
+    """Search hit that references its docstore document instead of copying its metadata.
+
+    Strings are looked up in the document only when read, and the hit behaves like the
+    result dict query_retriever used to build, so existing consumers keep working.
+    """
+    __slots__ = ('doc', 'similarity_score', 'cosine_similarity', 'match_percentage', 'match_type', '_years', '_extra')
+    
+    # Result keys served straight from document metadata
+    METADATA_KEYS = {
+        'expertise': 'expertise',
+        'years_of_experience': 'years_of_experience',
+        'organization': 'organization_detail',
+        'field_of_interest': 'field_of_interest',
+        'requirements': 'requirements',
+        'user_id': 'user_id'
+    }
+    KEYS = ('user_id', 'expert', 'expertise', 'years_of_experience', 'years_min', 'years_max', 'organization',
+            'field_of_interest', 'requirements', 'similarity_score', 'cosine_similarity')
+    OPTIONAL_KEYS = ('match_percentage', 'match_type')
+    
+    def __init__(self, doc, similarity_score, cosine_similarity):
+        self.doc = doc
+        self.similarity_score = similarity_score
+        self.cosine_similarity = cosine_similarity
+        self.match_percentage = None
+        self.match_type = None
+        self._years = None
+        self._extra = None
+    
+    def years_range(self):
+        """(min, max) years, parsed lazily for indexes built before experience normalization"""
+        if self._years is None:
+            metadata = self.doc.metadata
+            if 'years_min' in metadata:
+                self._years = (metadata['years_min'], metadata['years_max'])
+            else:
+                self._years = parse_years_of_experience(metadata['years_of_experience'])
+        return self._years
+    
+    def __getitem__(self, key):
+        metadata = self.doc.metadata
+        if key in self.METADATA_KEYS:
+            return metadata[self.METADATA_KEYS[key]]
+        if key == 'expert':
+            return f"{metadata['first_name']} {metadata['last_name']}"
+        if key == 'years_min':
+            return self.years_range()[0]
+        if key == 'years_max':
+            return self.years_range()[1]
+        if key in ('similarity_score', 'cosine_similarity'):
+            return getattr(self, key)
+        if key in self.OPTIONAL_KEYS and getattr(self, key) is not None:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key in self.OPTIONAL_KEYS or key in ('similarity_score', 'cosine_similarity'):
+            setattr(self, key, value)
+        elif key in self.KEYS:
+            raise TypeError(f"'{key}' comes from the docstore and cannot be assigned")
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        if key in self.OPTIONAL_KEYS and getattr(self, key) is not None:
+            setattr(self, key, None)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+    
+    def __iter__(self):
+        yield from self.KEYS
+        for key in self.OPTIONAL_KEYS:
+            if getattr(self, key) is not None:
+                yield key
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return f"ExpertHit({dict(self)!r})"
+    
+    def to_dict(self):
+        """Materialize every field as a plain dict"""
+        return dict(self)
+
+def build_results(vector_store, query, docs, query_vector=None):
+    """Turn retrieved documents into result hits with similarity scores"""
+    # Cosine similarity against the vectors already stored in the index, so
+    # a larger candidate pool does not mean re-embedding every document; query_vector
+    # is the unexpanded query, so the scores compare profiles to what was asked
+    if query_vector is None:
+        query_vector = embed_query_for_index(vector_store, query, expand=False)
+    cosine_sims = (
+        cosine_similarity(query_vector, document_vectors(vector_store, docs))[0].tolist()
+        if docs else []
+    )
+    
+    # Calculate similarity scores
+    similarity_score = 0.8  # Default score
+    return [ExpertHit(doc, similarity_score, cosine_sim) for doc, cosine_sim in zip(docs, cosine_sims)]
+
+def public_plan(plan):
+    """Search plan as reported to callers, without the candidate id list"""
+    return {key: value for key, value in plan.items() if key != 'user_ids'}
+
+def assemble_response(exact_matches, recommended_matches, criteria, plan, rerank_info, query=None, corrections=None,
+                      facets=None, original_query=None):
+    """Attach metrics to both match groups and build the query_retriever response"""
+    # Calculate metrics for both exact and recommended matches in one call
+    exact_metrics, recommended_metrics = calculate_metrics_for_groups([exact_matches, recommended_matches])
+    
+    return {
+        'exact_matches': {
+            'results': exact_matches,
+            'metrics': exact_metrics
+        },
+        'recommended_matches': {
+            'results': recommended_matches,
+            'metrics': recommended_metrics
+        },
+        'search_criteria': criteria,
+        'search_plan': public_plan(plan),
+        'rerank': rerank_info,
+        'query': query,
+        'original_query': original_query,
+        'corrections': corrections or [],
+        'facets': facets or []
+    }
+
+def profile_request(name, force=None):
+    """Profiler for one search: always when forced, never when force is False, else sampled"""
+    if force or (force is None and PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+        return Profile(name, PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_KEEP)
+    return nullcontext()
+
+def query_retriever(retriever, query, rerank=None, k=None, profile=None, correct=None):
     """Query the retriever system"""
     if retriever is None:
         return "Retriever system not properly initialized"
     
     try:
-        # Extract search criteria using LLM
-        print("\nExtracting search criteria...")
-        criteria = extract_search_criteria(query)
-        print(f"Extracted criteria: {criteria}")
-        
-        # Get relevant documents
-        docs = retriever.invoke(query)
-        
-        # Get query embedding for cosine similarity
-        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDINGS_MODEL, model_kwargs={'device': 'cpu'})
-        query_embedding = embeddings.embed_query(query)
-        
-        # Format the results
-        results = []
-        for doc in docs:
-            # Get document embedding
-            doc_embedding = embeddings.embed_query(doc.page_content)
+        with profile_request("query_retriever", profile):
+            # Fix likely typos first so the LLM and the embedding see the corrected query
+            with stage("spelling"):
+                original_query = query
+                query, corrections = correct_query(retriever, query, correct)
             
-            # Calculate similarity scores
-            similarity_score = 0.8  # Default score
-            cosine_sim = calculate_cosine_similarity(query_embedding, doc_embedding)
+            # Extract search criteria using LLM
+            print("\nExtracting search criteria...")
+            with stage("criteria"):
+                criteria = extract_search_criteria(query)
+            print(f"Extracted criteria: {criteria}")
             
-            result = {
-                'expert': f"{doc.metadata['first_name']} {doc.metadata['last_name']}",
-                'expertise': doc.metadata['expertise'],
-                'years_of_experience': doc.metadata['years_of_experience'],
-                'organization': doc.metadata['organization_detail'],
-                'field_of_interest': doc.metadata['field_of_interest'],
-                'requirements': doc.metadata['requirements'],
-                'similarity_score': similarity_score,
-                'cosine_similarity': cosine_sim
-            }
-            results.append(result)
-        
-        # Filter results based on extracted criteria
-        exact_matches, recommended_matches = filter_results_by_criteria(results, criteria)
-        
-        # Calculate metrics for both exact and recommended matches
-        exact_metrics = calculate_metrics(exact_matches)
-        recommended_metrics = calculate_metrics(recommended_matches)
-        
-        return {
-            'exact_matches': {
-                'results': exact_matches,
-                'metrics': exact_metrics
-            },
-            'recommended_matches': {
-                'results': recommended_matches,
-                'metrics': recommended_metrics
-            },
-            'search_criteria': criteria
-        }
+            # Let the database narrow the candidates when the hard filters are selective
+            with stage("plan"):
+                plan = plan_search(criteria)
+            print(f"Search plan: {plan['strategy']} ({plan['reason']})")
+            
+            # Embed once: the (expanded) search vector drives the search and the facets, the
+            # plain query vector the reported cosine scores
+            with stage("embed"):
+                search_vector, query_vector = embed_query_vectors(retriever.vectorstore, query)
+            
+            # Get relevant documents
+            with stage("search"):
+                docs, rerank_info = retrieve_documents(
+                    retriever, query, plan, rerank=rerank, k=k, query_vector=search_vector
+                )
+            with stage("results"):
+                results = build_results(retriever.vectorstore, query, docs, query_vector)
+            
+            # Filter results based on extracted criteria
+            with stage("filter"):
+                exact_matches, recommended_matches = filter_results_by_criteria(results, criteria)
+            
+            # Broad queries also get the clusters they fall into, to browse instead of paging
+            with stage("facets"):
+                facets = cluster_facets(retriever, query, criteria, query_vector=search_vector)
+            
+            return assemble_response(
+                exact_matches, recommended_matches, criteria, plan, rerank_info, query, corrections, facets,
+                original_query if corrections else None
+            )
     except Exception as e:
         print(f"Error details: {str(e)}")
         return f"Error querying retriever system: {e}"
 
+_llm_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="criteria")
+
+def iter_query_retriever(retriever, query, rerank=None, k=None, profile=None, correct=None):
+    """Streaming variant of query_retriever that yields each stage as soon as it completes.
+
+    Events are dicts with a 'stage' key, in this order:
+    'corrected_query' (only when typos were fixed), 'hits' (vector results, before any LLM output), 'criteria', optionally a revised
+    'hits' when the planner switches to SQL-first, 'matches' (exact/recommended split),
+    'metrics' and finally 'done' carrying the same response query_retriever returns.
+    Failures are reported as a single 'error' event.
+    """
+    if retriever is None:
+        yield {'stage': 'error', 'message': "Retriever system not properly initialized"}
+        return
+    
+    try:
+        with profile_request("iter_query_retriever", profile):
+            with stage("spelling"):
+                original_query = query
+                query, corrections = correct_query(retriever, query, correct)
+            if corrections:
+                yield {
+                    'stage': 'corrected_query', 'query': query, 'original_query': original_query,
+                    'corrections': corrections
+                }
+            
+            # The LLM runs in the background while the vector search answers first
+            criteria_future = _llm_executor.submit(extract_search_criteria, query)
+            
+            with stage("embed"):
+                search_vector, query_vector = embed_query_vectors(retriever.vectorstore, query)
+            vector_plan = plan_search(SearchCriteria())
+            with stage("search"):
+                docs, rerank_info = retrieve_documents(
+                    retriever, query, vector_plan, rerank=rerank, k=k, query_vector=search_vector
+                )
+            with stage("results"):
+                results = build_results(retriever.vectorstore, query, docs, query_vector)
+            yield {'stage': 'hits', 'results': results, 'revised': False}
+            
+            with stage("criteria"):
+                criteria = criteria_future.result()
+            yield {'stage': 'criteria', 'search_criteria': criteria}
+            
+            # Re-run over the SQL candidates only when the hard filters are selective
+            with stage("plan"):
+                plan = plan_search(criteria)
+            if plan['strategy'] == 'sql_first':
+                with stage("search_sql_first"):
+                    docs, rerank_info = retrieve_documents(
+                        retriever, query, plan, rerank=rerank, k=k, query_vector=search_vector
+                    )
+                    results = build_results(retriever.vectorstore, query, docs, query_vector)
+                yield {'stage': 'hits', 'results': results, 'revised': True, 'search_plan': public_plan(plan)}
+            
+            with stage("filter"):
+                exact_matches, recommended_matches = filter_results_by_criteria(results, criteria)
+            yield {'stage': 'matches', 'exact_matches': exact_matches, 'recommended_matches': recommended_matches}
+            
+            with stage("facets"):
+                facets = cluster_facets(retriever, query, criteria, query_vector=search_vector)
+            response = assemble_response(
+                exact_matches, recommended_matches, criteria, plan, rerank_info, query, corrections, facets,
+                original_query if corrections else None
+            )
+            yield {
+                'stage': 'metrics',
+                'exact_metrics': response['exact_matches']['metrics'],
+                'recommended_metrics': response['recommended_matches']['metrics']
+            }
+            yield {'stage': 'done', 'response': response}
+    except Exception as e:
+        print(f"Error details: {str(e)}")
+        yield {'stage': 'error', 'message': f"Error querying retriever system: {e}"}
+
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()  # Pages are stored and fetched from several threads
+
+def query_retriever_paginated(retriever, query, page_size=PAGE_SIZE, candidates=PAGINATION_CANDIDATES, profile=None,
+                              correct=None):
+    """Search once over a larger candidate pool, cache the ranked list and return its first page"""
+    response = query_retriever(retriever, query, k=candidates, profile=profile, correct=correct)
+    if isinstance(response, str):
+        return response
+    return paginate_response(query, response, page_size)
+
+def paginate_response(query, response, page_size=PAGE_SIZE):
+    """Cache the ranked results of a finished search and return its first page"""
+    # Exact matches rank ahead of recommended ones; each hit remembers which group it came from
+    ranked = []
+    for group, match_type in (('exact_matches', 'exact'), ('recommended_matches', 'recommended')):
+        for hit in response[group]['results']:
+            hit['match_type'] = match_type
+            ranked.append(hit)
+    
+    token = uuid4().hex
+    entry = {
+        'query': response.get('query') or query,
+        'original_query': response.get('original_query'),
+        'ranked': ranked,
+        'exact_metrics': response['exact_matches']['metrics'],
+        'recommended_metrics': response['recommended_matches']['metrics'],
+        'search_criteria': response['search_criteria'],
+        'search_plan': response.get('search_plan'),
+        'rerank': response.get('rerank'),
+        'corrections': response.get('corrections', []),
+        'facets': response.get('facets', [])
+    }
+    with _result_cache_lock:
+        _result_cache[token] = entry
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+    
+    return fetch_page(f"{token}:0", page_size)
+
+def fetch_page(cursor, page_size=PAGE_SIZE):
+    """Return the page at a cursor from a cached ranked list, without searching again"""
+    try:
+        token, offset = cursor.split(':')
+        offset = int(offset)
+    except (AttributeError, ValueError):
+        return f"Invalid cursor: {cursor}"
+    
+    with _result_cache_lock:
+        entry = _result_cache.get(token)
+        if entry is None:
+            return "Search results expired, please search again"
+        _result_cache.move_to_end(token)
+    
+    page = entry['ranked'][offset:offset + page_size]
+    next_offset = offset + len(page)
+    return {
+        'query': entry['query'],
+        'results': page,
+        'cursor': cursor,
+        'next_cursor': f"{token}:{next_offset}" if next_offset < len(entry['ranked']) else None,
+        'total_results': len(entry['ranked']),
+        'exact_matches': {'metrics': entry['exact_metrics']},
+        'recommended_matches': {'metrics': entry['recommended_metrics']},
+        'search_criteria': entry['search_criteria'],
+        'search_plan': entry['search_plan'],
+        'rerank': entry['rerank'],
+        'original_query': entry['original_query'],
+        'corrections': entry['corrections'],
+        'facets': entry['facets']
+    }
+
 def print_retrieval_results(query, response):
     """Print formatted retrieval results with metrics"""
     print(f"\nQuery: {query}")
@@ -407,6 +1895,9 @@ def print_retrieval_results(query, response):
         print(f"Error: {response}")
         return
     
+    if response.get('original_query'):
+        print(f"Showing results for: {response['query']} (searched instead of: {response['original_query']})")
+    
     # Print search criteria
     print("\nExtracted Search Criteria:")
     criteria = response['search_criteria']
@@ -421,6 +1912,17 @@ def print_retrieval_results(query, response):
     if criteria.requirements:
         print(f"Requirements: {', '.join(criteria.requirements)}")
     
+    # Print search plan
+    plan = response.get('search_plan')
+    if plan:
+        print(f"\nSearch Plan: {plan['strategy']} ({plan['reason']})")
+        if plan['predicate']:
+            print(f"SQL Predicate: {plan['predicate']}")
+    rerank_info = response.get('rerank')
+    if rerank_info:
+        status = 'applied' if rerank_info['applied'] else f"skipped ({rerank_info['reason']})"
+        print(f"Re-rank: {status}, {rerank_info['candidates']} candidates in {rerank_info['elapsed_ms']:.1f} ms")
+    
     # Print exact matches
     exact_matches = response['exact_matches']
     exact_metrics = exact_matches['metrics']
@@ -471,6 +1973,13 @@ def print_retrieval_results(query, response):
             print(f"   Requirements: {result['requirements']}")
     else:
         print("No recommended matches found.")
+    
+    # Print cluster facets of broad queries
+    if response.get('facets'):
+        print("\n=== Related Expert Clusters ===")
+        for facet in response['facets']:
+            organizations = ', '.join(name for name, _ in facet['organizations'][:3])
+            print(f"- {facet['label']} ({facet['size']} experts; {organizations})")
 
 if __name__ == "__main__":
     # Initialize retriever system
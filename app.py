@@ -1,6 +1,11 @@
 import streamlit as st
 import pandas as pd
-from Faiss import setup_retriever, query_retriever, print_retrieval_results
+from Faiss import iter_query_retriever, get_index_version, list_clusters, print_retrieval_results, PAGE_SIZE, PAGINATION_CANDIDATES
+from search_ui import (
+    EXAMPLE_QUERIES, page_style, compact_html, render_similar_experts, display_expert_grid, select_cluster,
+    display_cluster_facets, display_cluster_browser, format_criteria, display_correction, display_term_suggestions,
+    profile_requested, load_next_page, get_index_handle, precompute_example_results, show_search_response
+)
 from datetime import datetime
 
 # Set page configuration
@@ -12,7 +17,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
     <style>
     .main {
         padding: 2rem;
@@ -92,6 +97,10 @@ st.markdown("""
         color: #555;
         margin-bottom: 10px;
     }
+    .profile-similar {
+        font-size: 0.8em;
+        color: #777;
+    }
     /* Hide elements from previous designs that are no longer needed */
     .profile-image-section,
     .profile-image,
@@ -148,19 +157,12 @@ st.markdown("""
         padding: 10px 20px;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
-# Example queries
-EXAMPLE_QUERIES = [
-    "Find experts in Cloud Computing with more than 5 years of experience",
-    "Show me people who worked at Google and have AI expertise",
-    "Find experts in Machine Learning with experience in healthcare",
-    "Show me experts who worked at Microsoft and have cloud expertise",
-    "Find people with more than 10 years of experience in software development"
-]
+st.markdown(page_style(CUSTOM_CSS), unsafe_allow_html=True)
 
-def display_expert_tile(expert, is_exact_match=True):
-    """Display an expert profile tile with a circular image and descriptive text."""
+def render_expert_tile(expert, is_exact_match=True, similar=None):
+    """Render an expert profile tile with a circular image and descriptive text."""
     match_class = "exact-match" if is_exact_match else "recommended-match"
     
     # Generate a concise description of what the expert helps with
@@ -180,7 +182,7 @@ def display_expert_tile(expert, is_exact_match=True):
     # Use a generic image placeholder for the profile picture
     image_url = "https://cdn-icons-png.flaticon.com/512/149/149071.png" # Generic user icon
 
-    st.markdown(f"""
+    return compact_html(f"""
         <div class="profile-tile {match_class}">
             <div class="profile-avatar-container">
                 <div class="profile-avatar" style="background-image: url('{image_url}');"></div>
@@ -188,9 +190,10 @@ def display_expert_tile(expert, is_exact_match=True):
             <div class="profile-text-content">
                 <div class="profile-name">{expert['expert']}</div>
                 <div class="profile-description-line">{help_description}</div>
+                {render_similar_experts(similar)}
             </div>
         </div>
-    """, unsafe_allow_html=True)
+    """)
 
 def display_metrics_section(exact_metrics, recommended_metrics):
     """Display metrics as values in a collapsible section"""
@@ -251,38 +254,107 @@ def display_chat_message(message, is_user=True):
         </div>
     """, unsafe_allow_html=True)
 
+def run_search(query_text, correct=None):
+    """Run a search, rendering each stage as it arrives, and keep its first page;
+    later pages come from the server-side cursor"""
+    st.session_state.last_query = query_text
+    st.session_state.last_response = None # Clear previous response
+    st.session_state.loaded_results = []
+    st.session_state.next_cursor = None
+
+    status = st.empty()
+    preview = st.empty()
+    status.info("Searching for experts...")
+    events = iter_query_retriever(
+        st.session_state.retriever, query_text, k=PAGINATION_CANDIDATES, profile=profile_requested(),
+        correct=correct
+    )
+    for event in events:
+        if event['stage'] == 'corrected_query':
+            status.info(f"Searching for experts... (showing results for: {event['query']})")
+        elif event['stage'] == 'hits':
+            # Vector hits show up before the LLM has finished
+            with preview.container():
+                st.markdown("### Top Matches" + (" (refined)" if event['revised'] else ""))
+                display_expert_grid(event['results'][:PAGE_SIZE], render_expert_tile, is_exact_match=False)
+            status.info("Understanding your query...")
+        elif event['stage'] == 'criteria':
+            status.info("**Search Criteria:** " + (format_criteria(event['search_criteria']) or "none"))
+        elif event['stage'] == 'matches':
+            status.info(
+                f"Found {len(event['exact_matches'])} exact and "
+                f"{len(event['recommended_matches'])} recommended matches"
+            )
+        elif event['stage'] == 'error':
+            status.error(event['message'])
+        elif event['stage'] == 'done':
+            show_search_response(query_text, event['response'])
+
 def main():
     st.title("🔍 Expert Search System")
     
-    # Initialize session state
-    if 'retriever' not in st.session_state:
-        with st.spinner("Initializing search system..."):
-            st.session_state.retriever = setup_retriever()
+    # Pick up the latest index snapshot on every run; searches already running keep theirs
+    with st.spinner("Initializing search system..."):
+        st.session_state.retriever = get_index_handle().get()
     
     # Store the last query and its response
     if 'last_query' not in st.session_state:
         st.session_state.last_query = ""
     if 'last_response' not in st.session_state:
         st.session_state.last_response = None
+    if 'loaded_results' not in st.session_state:
+        st.session_state.loaded_results = []
+    if 'next_cursor' not in st.session_state:
+        st.session_state.next_cursor = None
+    if 'browse_cluster' not in st.session_state:
+        st.session_state.browse_cluster = None
+        st.session_state.browse_limit = PAGE_SIZE
+
+    # Example queries are answered ahead of time and refreshed when the index changes
+    with st.spinner("Preparing example queries..."):
+        example_results = precompute_example_results(
+            get_index_version(st.session_state.retriever), st.session_state.retriever
+        )
 
     # Sidebar with example queries
+    clicked_example = None
     with st.sidebar:
         st.markdown("### Example Queries")
         for query_text in EXAMPLE_QUERIES:
             if st.button(query_text, key=f"example_{query_text}"):
-                st.session_state.last_query = query_text
-                st.session_state.last_response = None # Clear previous response
-                with st.spinner(f"Searching for experts for: {query_text}"):
-                    response = query_retriever(st.session_state.retriever, query_text)
-                    if not isinstance(response, str):
-                        st.session_state.last_response = response
-                    else:
-                        st.error(response)
-                st.rerun() # Rerun to display the new response
+                clicked_example = query_text
+
+        st.markdown("### Search by Term")
+        clicked_example = display_term_suggestions() or clicked_example
+
+        # Profile clusters, browsable without a search
+        clusters = list_clusters(st.session_state.retriever)
+        if clusters:
+            st.markdown("### Browse Experts")
+            labels = {summary['cluster']: f"{summary['label']} ({summary['size']})" for summary in clusters}
+            st.selectbox(
+                "Expert clusters", [None] + list(labels), key="browse_select",
+                format_func=lambda cluster: "Choose an area..." if cluster is None else labels[cluster],
+                on_change=lambda: select_cluster(st.session_state.browse_select)
+            )
 
     # Main content area - display current query and response
     st.markdown("---") # Separator for visual clarity
 
+    if st.session_state.browse_cluster is not None:
+        display_cluster_browser(render_expert_tile)
+        st.markdown("---")
+
+    # New searches stream their stages into the main area, above the previous results
+    stream_area = st.container()
+    if clicked_example in example_results:
+        show_search_response(clicked_example, example_results[clicked_example])
+    elif clicked_example:
+        with stream_area:
+            display_chat_message(clicked_example, is_user=True)
+            run_search(clicked_example)
+        st.rerun() # Rerun to display the new response
+
     if st.session_state.last_query:
         display_chat_message(st.session_state.last_query, is_user=True)
         if st.session_state.last_response:
@@ -290,41 +362,41 @@ def main():
 
             response_content = st.session_state.last_response
 
+            # Typos were fixed before searching; offer the query as typed instead
+            display_correction(response_content, run_search)
+
             # Display search criteria
-            criteria = response_content['search_criteria']
-            criteria_text = []
-            if criteria.expertise:
-                criteria_text.append(f"Expertise: {', '.join(criteria.expertise)}")
-            if criteria.years_of_experience:
-                criteria_text.append(f"Experience: {criteria.years_of_experience}+ years")
-            if criteria.organization:
-                criteria_text.append(f"Organizations: {', '.join(criteria.organization)}")
-            if criteria.field_of_interest:
-                criteria_text.append(f"Fields: {', '.join(criteria.field_of_interest)}")
-            if criteria.requirements:
-                criteria_text.append(f"Requirements: {', '.join(criteria.requirements)}")
+            st.markdown("**Search Criteria:** " + format_criteria(response_content['search_criteria']))
+            display_cluster_facets(response_content.get('facets'))
 
-            st.markdown("**Search Criteria:** " + " | ".join(criteria_text))
+            # Results loaded so far, split back into their match groups
+            loaded_results = st.session_state.loaded_results
+            exact_loaded = [expert for expert in loaded_results if expert['match_type'] == 'exact']
+            recommended_loaded = [expert for expert in loaded_results if expert['match_type'] == 'recommended']
 
             # Display exact matches in grid
             st.markdown("### Exact Matches")
-            if response_content['exact_matches']['metrics']['total_results'] > 0:
-                st.markdown('<div class="profile-grid">', unsafe_allow_html=True)
-                for expert in response_content['exact_matches']['results']:
-                    display_expert_tile(expert, is_exact_match=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+            exact_total = response_content['exact_matches']['metrics']['total_results']
+            if exact_total > 0:
+                display_expert_grid(exact_loaded, render_expert_tile, is_exact_match=True)
+                st.caption(f"Showing {len(exact_loaded)} of {exact_total}")
             else:
                 st.info("No exact matches found.")
 
             # Display recommended matches in grid
             st.markdown("### Recommended Matches")
-            if response_content['recommended_matches']['metrics']['total_results'] > 0:
-                st.markdown('<div class="profile-grid">', unsafe_allow_html=True)
-                for expert in response_content['recommended_matches']['results']:
-                    display_expert_tile(expert, is_exact_match=False)
-                st.markdown('</div>', unsafe_allow_html=True)
+            recommended_total = response_content['recommended_matches']['metrics']['total_results']
+            if recommended_total > 0:
+                display_expert_grid(recommended_loaded, render_expert_tile, is_exact_match=False)
+                st.caption(f"Showing {len(recommended_loaded)} of {recommended_total}")
             else:
                 st.info("No recommended matches found.")
+
+            # Next page comes from the cached ranking: no LLM, embedding or FAISS call
+            if st.session_state.next_cursor:
+                if st.button("Load more experts", key="load_more"):
+                    load_next_page()
+                    st.rerun()
             
             # Display metrics in collapsible section
             display_metrics_section(
@@ -342,14 +414,9 @@ def main():
         submit_button = st.form_submit_button("Search")
 
         if submit_button and query_input:
-            st.session_state.last_query = query_input
-            st.session_state.last_response = None # Clear previous response
-            with st.spinner("Searching for experts..."):
-                response = query_retriever(st.session_state.retriever, query_input)
-                if not isinstance(response, str):
-                    st.session_state.last_response = response
-                else:
-                    st.error(response)
+            with stream_area:
+                display_chat_message(query_input, is_user=True)
+                run_search(query_input)
             st.rerun()
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+import math
+import sys
+import time
+import tracemalloc
+import faiss
+import numpy as np
+from langchain.schema import Document
+from sharded_index import ShardedIndex, shard_for
+from projection import PCAProjection
+from query_expansion import unit_rows
+from Faiss import (
+    create_or_load_vector_store, embed_query_for_index, diverse_search_by_vector,
+    calculate_metrics, calculate_metrics_batch, pack_scores, ExpertHit,
+    load_embeddings, EMBEDDINGS_BACKENDS, get_binary_codes, binary_search_positions
+)
+
+# Queries used by the micro-benchmarks
+BENCHMARK_QUERIES = [
+    "Find experts in Cloud Computing with more than 5 years of experience",
+    "Show me people who worked at Google and have AI expertise",
+    "Find experts in Machine Learning with experience in healthcare",
+    "Show me experts who worked at Microsoft and have cloud expertise",
+    "Find people with more than 10 years of experience in software development"
+]
+
+def time_call(func, repeats=20):
+    """Median and p95 wall time of func in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), float(np.percentile(timings, 95))
+
+def print_table(headers, rows):
+    """Print rows as an aligned plain-text table"""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(value).ljust(w) for value, w in zip(row, widths)))
+
+def benchmark_diversity(vector_store, queries=BENCHMARK_QUERIES, k=5, fetch_k=50, repeats=20):
+    """Compare plain top-k with MMR + organization cap on the same embedded queries"""
+    # Embed once so only search and selection are timed
+    query_vectors = [embed_query_for_index(vector_store, query) for query in queries]
+
+    def plain(query_vector):
+        _, indices = vector_store.index.search(query_vector, k)
+        return [vector_store.docstore.search(vector_store.index_to_docstore_id[i]) for i in indices[0] if i != -1]
+
+    def diverse(query_vector):
+        return diverse_search_by_vector(vector_store, query_vector, k=k, fetch_k=fetch_k)
+
+    rows = []
+    for name, search in (("top-k", plain), (f"mmr+cap (fetch_k={fetch_k})", diverse)):
+        medians, p95s, distinct_orgs = [], [], []
+        for query_vector in query_vectors:
+            median, p95 = time_call(lambda: search(query_vector), repeats)
+            medians.append(median)
+            p95s.append(p95)
+            docs = search(query_vector)
+            distinct_orgs.append(len({doc.metadata.get('organization_detail') for doc in docs}))
+        rows.append((name, f"{np.mean(medians):.3f}", f"{np.mean(p95s):.3f}", f"{np.mean(distinct_orgs):.1f} / {k}"))
+
+    print(f"\nDiversity benchmark over {vector_store.index.ntotal} vectors, {len(queries)} queries")
+    print_table(("mode", "median ms", "p95 ms", "distinct orgs"), rows)
+
+def legacy_metrics(results):
+    """Per-group pure-Python metrics, as computed before vectorization (reference only)"""
+    scores = [result.get('similarity_score', 0) for result in results]
+    cosine_scores = [result.get('cosine_similarity', 0) for result in results]
+    probs = np.array(scores) / sum(scores)
+    return {
+        'total_results': len(results),
+        'average_score': np.mean(scores),
+        'max_score': max(scores),
+        'min_score': min(scores),
+        'score_std': np.std(scores),
+        'perplexity': math.exp(-np.sum(probs * np.log(probs + 1e-10))),
+        'average_cosine_similarity': np.mean(cosine_scores),
+        'score_distribution': {
+            'high': len([s for s in scores if s >= 0.8]),
+            'medium': len([s for s in scores if 0.5 <= s < 0.8]),
+            'low': len([s for s in scores if s < 0.5])
+        }
+    }
+
+def benchmark_metrics(vector_store=None, group_counts=(2, 100, 1000), group_size=50, repeats=10):
+    """Compare per-group metrics with the packed single-call implementation"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for group_count in group_counts:
+        groups = [
+            [{'similarity_score': s, 'cosine_similarity': c} for s, c in rng.random((group_size, 2))]
+            for _ in range(group_count)
+        ]
+        # Both implementations must agree before their speed is worth comparing
+        for expected, actual in zip(map(legacy_metrics, groups), calculate_metrics_batch(*pack_scores(groups))):
+            for key in ('average_score', 'max_score', 'min_score', 'score_std', 'perplexity', 'average_cosine_similarity'):
+                assert math.isclose(expected[key], actual[key], rel_tol=1e-6, abs_tol=1e-9), key
+            assert expected['score_distribution'] == actual['score_distribution']
+
+        loop_ms, _ = time_call(lambda: [calculate_metrics(group) for group in groups], repeats)
+        legacy_ms, _ = time_call(lambda: [legacy_metrics(group) for group in groups], repeats)
+        packed = pack_scores(groups)
+        batch_ms, _ = time_call(lambda: calculate_metrics_batch(*packed), repeats)
+        total_ms, _ = time_call(lambda: calculate_metrics_batch(*pack_scores(groups)), repeats)
+        rows.append((
+            group_count, f"{legacy_ms:.3f}", f"{loop_ms:.3f}", f"{total_ms:.3f}", f"{batch_ms:.3f}",
+            f"{legacy_ms / total_ms:.1f}x"
+        ))
+
+    print(f"\nMetrics benchmark, {group_size} results per group")
+    print_table(("groups", "legacy ms", "per-group ms", "pack+batch ms", "batch ms", "speedup"), rows)
+
+def legacy_result(doc, similarity_score, cosine_sim):
+    """Per-hit dict with copied metadata, as built before ExpertHit (reference only)"""
+    return {
+        'expert': f"{doc.metadata['first_name']} {doc.metadata['last_name']}",
+        'expertise': doc.metadata['expertise'],
+        'years_of_experience': doc.metadata['years_of_experience'],
+        'years_min': doc.metadata['years_min'],
+        'years_max': doc.metadata['years_max'],
+        'organization': doc.metadata['organization_detail'],
+        'field_of_interest': doc.metadata['field_of_interest'],
+        'requirements': doc.metadata['requirements'],
+        'similarity_score': similarity_score,
+        'cosine_similarity': cosine_sim
+    }
+
+def benchmark_hits(vector_store=None, hit_count=10000):
+    """Memory and build time of per-hit dicts versus ExpertHit for a large result set"""
+    docs = [
+        Document(page_content="", metadata={
+            'user_id': i, 'first_name': f"First{i}", 'last_name': f"Last{i}",
+            'expertise': f"Expertise {i % 300}", 'years_of_experience': f"{i % 20}+ yr",
+            'years_min': i % 20, 'years_max': None, 'organization_detail': f"Organization {i % 500}",
+            'field_of_interest': f"Field {i % 200}", 'requirements': f"Requirement {i % 100}"
+        })
+        for i in range(hit_count)
+    ]
+    cosine_sims = np.random.default_rng(0).random(hit_count).tolist()
+
+    rows = []
+    for name, build in (("dict", legacy_result), ("ExpertHit", ExpertHit)):
+        tracemalloc.start()
+        hits = [build(doc, 0.8, cosine_sim) for doc, cosine_sim in zip(docs, cosine_sims)]
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        build_ms, _ = time_call(lambda: [build(doc, 0.8, c) for doc, c in zip(docs, cosine_sims)], 5)
+        read_ms, _ = time_call(lambda: [(hit['expert'], hit['organization']) for hit in hits], 5)
+        rows.append((name, f"{allocated / 1024 / 1024:.2f}", f"{allocated / hit_count:.0f}", f"{build_ms:.2f}", f"{read_ms:.2f}"))
+        del hits
+
+    print(f"\nResult object benchmark, {hit_count} hits")
+    print_table(("representation", "MiB", "bytes/hit", "build ms", "read 2 fields ms"), rows)
+
+def benchmark_shards(vector_store=None, vector_count=200000, dim=384, shard_counts=(1, 2, 4, 8), k=10, batch=16, repeats=10):
+    """Flat index versus hash-sharded parallel search over synthetic vectors"""
+    rng = np.random.default_rng(0)
+    vectors = rng.random((vector_count, dim), dtype=np.float32)
+    queries = rng.random((batch, dim), dtype=np.float32)
+    flat = faiss.IndexFlatL2(dim)
+    flat.add(vectors)
+    expected_d, expected_i = flat.search(queries, k)
+
+    flat_ms, flat_p95 = time_call(lambda: flat.search(queries[:1], k), repeats)
+    rows = [("flat", f"{flat_ms:.2f}", f"{flat_p95:.2f}", f"{time_call(lambda: flat.search(queries, k), repeats)[0]:.2f}")]
+    for n_shards in shard_counts:
+        sharded = ShardedIndex(flat, [shard_for(user_id, n_shards) for user_id in range(vector_count)], n_shards)
+        distances, labels = sharded.search(queries, k)
+        # Sharding must not change the answer
+        assert np.allclose(distances, expected_d, rtol=1e-5), n_shards
+        assert (labels == expected_i).mean() > 0.99, n_shards  # Ties may order differently
+        single_ms, single_p95 = time_call(lambda: sharded.search(queries[:1], k), repeats)
+        batch_ms, _ = time_call(lambda: sharded.search(queries, k), repeats)
+        rows.append((f"{n_shards} shards", f"{single_ms:.2f}", f"{single_p95:.2f}", f"{batch_ms:.2f}"))
+        sharded.executor.shutdown()
+
+    print(f"\nShard benchmark, {vector_count} x {dim} vectors, k={k}")
+    print_table(("index", "1 query ms", "1 query p95", f"{batch} queries ms"), rows)
+
+def benchmark_encoders(vector_store, backends=EMBEDDINGS_BACKENDS, sample_size=1000,
+                       batch_sizes=(1, 4, 16, 64, 256), k=10, repeats=5):
+    """Agreement with the fp32 PyTorch encoder on our profiles, then latency and throughput per backend"""
+    texts = [doc.page_content for doc in vector_store.docstore._dict.values()][:sample_size]
+    encoders = {}
+    for backend in backends:
+        try:
+            encoders[backend] = load_embeddings(backend)
+        except Exception as e:
+            print(f"Skipping {backend} backend: {e}")
+    if "torch" not in encoders:
+        print("The torch backend is needed as the accuracy reference")
+        return
+
+    reference_docs = unit_rows(encoders["torch"].embed_documents(texts))
+    reference_queries = unit_rows([encoders["torch"].embed_query(q) for q in BENCHMARK_QUERIES])
+    reference_top = np.argsort(-reference_queries @ reference_docs.T, axis=1)[:, :k]
+
+    accuracy_rows = []
+    for backend, encoder in encoders.items():
+        docs = unit_rows(encoder.embed_documents(texts))
+        queries = unit_rows([encoder.embed_query(q) for q in BENCHMARK_QUERIES])
+        agreement = (docs * reference_docs).sum(axis=1)
+        top = np.argsort(-queries @ docs.T, axis=1)[:, :k]
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(top, reference_top)])
+        accuracy_rows.append((backend, f"{agreement.mean():.4f}", f"{agreement.min():.4f}", f"{overlap:.2f}"))
+
+    print(f"\nEncoder agreement with fp32 torch over {len(texts)} profiles")
+    print_table(("backend", "mean cosine", "min cosine", f"top-{k} overlap"), accuracy_rows)
+
+    speed_rows = []
+    for batch_size in batch_sizes:
+        batch = (texts * (batch_size // max(len(texts), 1) + 1))[:batch_size]
+        for backend, encoder in encoders.items():
+            # Encode through the model itself so the batch is not re-split into the wrapper's default size
+            model = getattr(encoder, 'client', None)
+            encode = (lambda: model.encode(batch, batch_size=batch_size)) if model else (lambda: encoder.embed_documents(batch))
+            median_ms, p95_ms = time_call(encode, repeats)
+            speed_rows.append((batch_size, backend, f"{median_ms:.1f}", f"{p95_ms:.1f}", f"{batch_size / median_ms * 1000:.0f}"))
+
+    print("\nEncoder latency and throughput")
+    print_table(("batch", "backend", "median ms", "p95 ms", "texts/s"), speed_rows)
+
+def stored_vectors(vector_store):
+    return vector_store.index.reconstruct_batch(np.arange(vector_store.index.ntotal, dtype=np.int64))
+
+def recall_queries(vector_store, vectors, query_sample=200):
+    """Benchmark query embeddings plus a sample of profile vectors, with the position each must not match"""
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(vectors), size=min(query_sample, len(vectors)), replace=False)
+    queries = np.vstack([embed_query_for_index(vector_store, q) for q in BENCHMARK_QUERIES] + [vectors[sample]])
+    own = np.concatenate([np.full(len(BENCHMARK_QUERIES), -1), sample])
+    return queries, own
+
+def top_k_excluding(labels, own, k):
+    """Top-k labels per query with a profile's own position (its trivial match) removed"""
+    return [[label for label in row if label != skip][:k] for row, skip in zip(labels, own)]
+
+def mean_recall(found, reference, k):
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(found, reference)]))
+
+def benchmark_projection(vector_store, dims=(256, 128, 64, 32), k=10, query_sample=200, repeats=10):
+    """Recall, latency and memory of PCA-reduced indexes against the index's stored vectors"""
+    vectors = stored_vectors(vector_store)
+    queries, own = recall_queries(vector_store, vectors, query_sample)
+
+    def top_k(index, query_vectors):
+        return top_k_excluding(index.search(query_vectors, k + 1)[1], own, k)
+
+    full = faiss.IndexFlatL2(vectors.shape[1])
+    full.add(vectors)
+    reference = top_k(full, queries)
+    full_ms, _ = time_call(lambda: full.search(queries, k), repeats)
+    rows = [(vectors.shape[1], "100.0%", "1.000", f"{full_ms:.2f}", f"{vectors.nbytes / 1024 / 1024:.2f}")]
+
+    for target in dims:
+        if target >= vectors.shape[1]:
+            continue
+        projection = PCAProjection.fit(vectors, target)
+        reduced = faiss.IndexFlatL2(projection.dims)
+        reduced.add(projection.transform(vectors))
+        projected_queries = projection.transform(queries)
+        recall = mean_recall(top_k(reduced, projected_queries), reference, k)
+        search_ms, _ = time_call(lambda: reduced.search(projected_queries, k), repeats)
+        rows.append((
+            projection.dims, f"{projection.explained_variance_ratio.sum():.1%}", f"{recall:.3f}",
+            f"{search_ms:.2f}", f"{len(vectors) * projection.dims * 4 / 1024 / 1024:.2f}"
+        ))
+
+    print(f"\nPCA projection report, {len(vectors)} vectors, {len(queries)} queries, recall@{k} vs full dims")
+    print_table(("dims", "variance kept", f"recall@{k}", "search ms", "vectors MiB"), rows)
+
+def benchmark_binary(vector_store, rescore_ks=(50, 100, 200, 500), k=10, query_sample=200, repeats=10):
+    """Recall, latency and memory of Hamming first pass + float re-scoring versus exact float search"""
+    vectors = stored_vectors(vector_store)
+    queries, own = recall_queries(vector_store, vectors, query_sample)
+    reference = top_k_excluding(vector_store.index.search(queries, k + 1)[1], own, k)
+    codes = get_binary_codes(vector_store)
+
+    def two_stage(rescore_k):
+        return [binary_search_positions(vector_store, query[None, :], k + 1, rescore_k) for query in queries]
+
+    float_ms, float_p95 = time_call(lambda: [vector_store.index.search(query[None, :], k) for query in queries], repeats)
+    per_query = 1 / len(queries)
+    rows = [("float only", "1.000", f"{float_ms * per_query:.3f}", f"{float_p95 * per_query:.3f}")]
+    for rescore_k in rescore_ks:
+        recall = mean_recall(top_k_excluding(two_stage(rescore_k), own, k), reference, k)
+        median_ms, p95_ms = time_call(lambda: two_stage(rescore_k), repeats)
+        rows.append((f"binary, rescore {rescore_k}", f"{recall:.3f}", f"{median_ms * per_query:.3f}", f"{p95_ms * per_query:.3f}"))
+
+    print(f"\nBinary first-pass benchmark, {len(vectors)} vectors, {len(queries)} queries, recall@{k} vs float search")
+    print(f"Float vectors: {vectors.nbytes / 1024 / 1024:.2f} MiB ({vectors.shape[1] * 4} B each), "
+          f"binary codes: {codes.nbytes / 1024 / 1024:.2f} MiB ({codes.codes.shape[1]} B each)")
+    print_table(("search", f"recall@{k}", "ms/query", "p95 ms/query"), rows)
+
+BENCHMARKS = {
+    "diversity": benchmark_diversity,
+    "metrics": benchmark_metrics,
+    "hits": benchmark_hits,
+    "shards": benchmark_shards,
+    "encoders": benchmark_encoders,
+    "projection": benchmark_projection,
+    "binary": benchmark_binary
+}
+# Benchmarks that run against the FAISS index
+INDEX_BENCHMARKS = {"diversity", "encoders", "projection", "binary"}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    vector_store = None
+    if INDEX_BENCHMARKS & set(names):
+        vector_store = create_or_load_vector_store()
+        if vector_store is None:
+            print("No vector store available to benchmark")
+            sys.exit(1)
+    for name in names:
+        BENCHMARKS[name](vector_store)
@@ -0,0 +1,42 @@
+import faiss
+import numpy as np
+
+# Set bits in every byte value, for Hamming distances over subsets in NumPy
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+class BinaryCodes:
+    """One bit per dimension per vector, searched by Hamming distance.
+
+    Each dimension is thresholded at its mean over the indexed vectors rather than at
+    zero, which keeps the bits balanced and is worth a few points of recall over plain
+    sign codes. A 384-dim float32 vector (1.5 KB) becomes a 48-byte code.
+    """
+
+    def __init__(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.thresholds = vectors.mean(axis=0) if len(vectors) else np.zeros(vectors.shape[1], dtype=np.float32)
+        self.bits = ((vectors.shape[1] + 7) // 8) * 8
+        self.codes = self.encode(vectors)
+        self.index = faiss.IndexBinaryFlat(self.bits)
+        self.index.add(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def encode(self, vectors):
+        """Packed codes for a (n, d) float array; padding bits are zero"""
+        return np.packbits(np.asarray(vectors) > self.thresholds, axis=1)
+
+    def search(self, query_vector, k, positions=None):
+        """Positions of the k codes nearest to a (1, d) query by Hamming distance"""
+        code = self.encode(query_vector)
+        if positions is None:
+            _, labels = self.index.search(code, min(k, self.index.ntotal))
+            return labels[0][labels[0] != -1]
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) <= k:
+            return positions
+        distances = POPCOUNT[np.bitwise_xor(self.codes[positions], code)].sum(axis=1, dtype=np.int32)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return positions[nearest[np.argsort(distances[nearest], kind='stable')]]
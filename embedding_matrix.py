@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+# Row i of the matrix is the vector at FAISS position i; the row map gives its user_id
+EMBEDDINGS_FILE = "embeddings.npy"
+ROW_MAP_FILE = "embeddings_user_ids.npy"
+
+def write_embedding_matrix(index, path, batch_size=8192):
+    """Copy an index's vectors into a float32 .npy file, batch by batch.
+
+    The .npy header pads the data to a 64-byte offset, so the file can be memory-mapped
+    as an aligned (ntotal, d) array without parsing or copying.
+    """
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(index.ntotal, index.d))
+    for start in range(0, index.ntotal, batch_size):
+        keys = np.arange(start, min(start + batch_size, index.ntotal), dtype=np.int64)
+        matrix[start:start + len(keys)] = index.reconstruct_batch(keys)
+    matrix.flush()
+    del matrix
+
+def write_row_map(user_ids, path):
+    np.save(path, np.asarray(user_ids, dtype=np.int64))
+
+def open_embedding_matrix(directory):
+    """(matrix, user_ids) of a snapshot; the matrix is a read-only np.memmap over the file"""
+    matrix = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode='r')
+    user_ids = np.load(os.path.join(directory, ROW_MAP_FILE))
+    if len(user_ids) != len(matrix):
+        raise ValueError(f"Row map has {len(user_ids)} rows, embedding matrix has {len(matrix)}")
+    return matrix, user_ids
@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Faiss
+from benchmarks import print_table
+from query_expansion import MAX_TERM_WORDS, TOKEN_PATTERN, distinct_terms, normalize_term
+
+# Offline relevance evaluation of query_retriever against a labeled query set.
+#
+# Labeled JSONL, one query per line:
+#   {"query": "Find experts in Cloud Computing", "relevant": [12, 57, 301]}
+#
+# Each --grid NAME=v1,v2 adds a sweep dimension; every combination is one config:
+#   python evaluation.py labeled.jsonl --grid k=5,20,50 --grid RECOMMENDED_MATCH_THRESHOLD=0.34,0.5
+#
+# Config keys: "k" (candidates per query), "mode" (retrieval mode), "version" (index
+# snapshot, for comparing index builds) or one of the Faiss.py settings in SWEEPABLE_SETTINGS.
+
+CONFIG_KEYS = ("k", "mode", "version")
+# Settings Faiss.py reads per query or in setup_retriever, so overriding them in a worker takes effect
+SWEEPABLE_SETTINGS = (
+    "EXACT_MATCH_THRESHOLD", "RECOMMENDED_MATCH_THRESHOLD", "SQL_FIRST_MAX_SELECTIVITY",
+    "RERANK_ENABLED", "RERANK_TOP_N", "RERANK_BUDGET_MS", "RERANK_BATCH_SIZE",
+    "QUERY_EXPANSION_ENABLED", "EXPANSION_WEIGHT", "EXPANSION_MATCH_SIMILARITY",
+    "CLUSTERS_ENABLED", "CLUSTER_FACETS", "RETRIEVAL_MODE",
+    "DIVERSITY_FETCH_K", "DIVERSITY_LAMBDA", "MAX_PER_ORGANIZATION", "BINARY_RESCORE_K"
+)
+
+def load_labeled_queries(path):
+    """[(query, relevant user_ids)] from a labeled JSONL file"""
+    labeled = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            relevant = entry.get('relevant', entry.get('relevant_user_ids'))
+            if not entry.get('query') or relevant is None:
+                raise ValueError(f"{path}:{line_number}: expected 'query' and 'relevant'")
+            labeled.append((entry['query'], [int(user_id) for user_id in relevant]))
+    return labeled
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_grid(specs):
+    """Configs for the cartesian product of NAME=v1,v2 specs; one empty config without specs"""
+    dimensions = []
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise ValueError(f"Grid spec {spec!r} should look like NAME=value1,value2")
+        check_setting(name)
+        dimensions.append([(name, parse_value(value)) for value in values.split(',')])
+    return [dict(combination) for combination in itertools.product(*dimensions)]
+
+def check_setting(name):
+    if name not in CONFIG_KEYS and name not in SWEEPABLE_SETTINGS:
+        raise ValueError(f"Unknown setting {name!r}: use one of {', '.join(CONFIG_KEYS + SWEEPABLE_SETTINGS)}")
+
+def config_label(config):
+    return " ".join(f"{name}={value}" for name, value in config.items()) or "baseline"
+
+def ranked_user_ids(response):
+    """Distinct user_ids in the order the UI shows them: exact matches, then recommended ones"""
+    ranked = []
+    for group in ('exact_matches', 'recommended_matches'):
+        for hit in response[group]['results']:
+            if hit['user_id'] not in ranked:
+                ranked.append(hit['user_id'])
+    return ranked
+
+def precision_recall_ndcg(ranked, relevant, k):
+    """Binary-relevance precision@k, recall@k and nDCG@k"""
+    relevant = set(relevant)
+    top = ranked[:k]
+    found = [user_id in relevant for user_id in top]
+    precision = sum(found) / k
+    recall = sum(found) / len(relevant) if relevant else 0.0
+    dcg = sum(1 / math.log2(rank + 2) for rank, hit in enumerate(found) if hit)
+    ideal = sum(1 / math.log2(rank + 2) for rank in range(min(len(relevant), k)))
+    return precision, recall, (dcg / ideal if ideal else 0.0)
+
+def mentioned_terms(query, vocabulary):
+    """Terms of a vocabulary (normalized) that a query names verbatim, longest phrases first"""
+    tokens = TOKEN_PATTERN.findall(query.lower())
+    found = []
+    for length in range(MAX_TERM_WORDS, 0, -1):
+        for start in range(len(tokens) - length + 1):
+            phrase = " ".join(tokens[start:start + length])
+            if phrase in vocabulary and phrase not in found:
+                found.append(phrase)
+    return found
+
+def stub_criteria_extractor(vector_store):
+    """Stand-in for the LLM: rule-based years plus the expertise and fields of interest a
+    query names verbatim, matched against the values present in the index"""
+    metadatas = [doc.metadata for doc in vector_store.docstore._dict.values()]
+    expertise = {normalize_term(term) for term in distinct_terms(metadatas, fields=('expertise',))}
+    fields = {normalize_term(term) for term in distinct_terms(metadatas, fields=('field_of_interest',))}
+
+    def extract(query):
+        criteria = Faiss.rule_based_criteria(query)
+        criteria.expertise = mentioned_terms(query, expertise)
+        criteria.field_of_interest = mentioned_terms(query, fields)
+        return criteria
+    return extract
+
+# Per-process state: each worker loads the index once for its config
+_worker = {}
+# Run once in every worker before timing, so models and caches built on first use stay out of
+# the latencies; not a labeled query, so its cached scores cannot speed up a measured one
+WARMUP_QUERY = "Find experts in software development with more than 3 years of experience"
+
+def init_worker(config, llm, version):
+    """Apply a config inside a worker process and load its retriever"""
+    for name, value in config.items():
+        if name not in CONFIG_KEYS:
+            setattr(Faiss, name, value)
+    # Evaluation is read-only: workers must not each apply a pending changeset and publish a snapshot
+    Faiss.refresh_from_changeset = lambda vector_store, *args, **kwargs: vector_store
+    _worker['devnull'] = open(os.devnull, 'w')
+    with contextlib.redirect_stdout(_worker['devnull']):
+        _worker['retriever'] = Faiss.setup_retriever(mode=config.get('mode'), version=config.get('version', version))
+    if llm == "stub":
+        # Criteria from the query text instead of a model call: deterministic, free and fast
+        Faiss.extract_search_criteria = stub_criteria_extractor(_worker['retriever'].vectorstore)
+    _worker['k'] = config.get('k')
+    evaluate_query(WARMUP_QUERY)
+
+def evaluate_query(query):
+    """(ranked user_ids, latency ms, error) of one query in this worker"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(_worker['devnull']):
+        response = Faiss.query_retriever(_worker['retriever'], query, k=_worker['k'])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if isinstance(response, str):
+        return [], elapsed_ms, response
+    return ranked_user_ids(response), elapsed_ms, None
+
+def evaluate_config(config, labeled, version, at_k=Faiss.PAGE_SIZE, workers=None, llm="stub"):
+    """Run every labeled query under one config and aggregate quality and latency"""
+    queries = [query for query, _ in labeled]
+    workers = workers or os.cpu_count() or 1
+    # Each worker warms up in init_worker, before it takes any timed query
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config, llm, version)) as pool:
+        outcomes = list(pool.map(evaluate_query, queries))
+
+    per_query = []
+    for (query, relevant), (ranked, elapsed_ms, error) in zip(labeled, outcomes):
+        precision, recall, ndcg = precision_recall_ndcg(ranked, relevant, at_k)
+        per_query.append({
+            'query': query, 'ranked': ranked[:at_k], 'relevant': relevant, 'precision': precision,
+            'recall': recall, 'ndcg': ndcg, 'latency_ms': elapsed_ms, 'error': error
+        })
+    latencies = [entry['latency_ms'] for entry in per_query]
+    return {
+        'config': config,
+        'precision': float(np.mean([entry['precision'] for entry in per_query])),
+        'recall': float(np.mean([entry['recall'] for entry in per_query])),
+        'ndcg': float(np.mean([entry['ndcg'] for entry in per_query])),
+        'p50_ms': float(np.median(latencies)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'errors': sum(1 for entry in per_query if entry['error']),
+        'queries': per_query
+    }
+
+def snapshot_version():
+    """Version of the current index snapshot, publishing one first for an index saved before
+    snapshots existed (faiss_index/faiss_index), so every config loads the same version"""
+    version = Faiss.current_version(Faiss.FAISS_INDEX_DIR)
+    if version:
+        return version
+    vector_store = Faiss.create_or_load_vector_store()
+    if vector_store is None:
+        return None
+    return Faiss.current_version(Faiss.FAISS_INDEX_DIR) or Faiss.save_index_snapshot(vector_store)
+
+def print_comparison(summaries, at_k):
+    headers = ["config", f"P@{at_k}", f"R@{at_k}", f"nDCG@{at_k}", "p50 ms", "p95 ms", "errors"]
+    rows = [
+        [config_label(s['config']), f"{s['precision']:.3f}", f"{s['recall']:.3f}", f"{s['ndcg']:.3f}",
+         f"{s['p50_ms']:.1f}", f"{s['p95_ms']:.1f}", s['errors']]
+        for s in sorted(summaries, key=lambda s: -s['ndcg'])
+    ]
+    print_table(headers, rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate search quality and latency on a labeled query set")
+    parser.add_argument("labeled", help="JSONL with 'query' and 'relevant' (user_ids) per line")
+    parser.add_argument("--grid", action="append", default=[], help="Sweep a setting: NAME=value1,value2")
+    parser.add_argument("--at-k", type=int, default=Faiss.PAGE_SIZE, help="Cutoff for P/R/nDCG")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--llm", choices=("stub", "live"), default="stub",
+                        help="stub: rule-based criteria; live: the configured LLM_API_BASE (e.g. fake_llm_server.py)")
+    parser.add_argument("--output", help="Write per-config and per-query results as JSON")
+    args = parser.parse_args()
+
+    try:
+        labeled = load_labeled_queries(args.labeled)
+        configs = parse_grid(args.grid)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    # Every config runs against the same snapshot, even if a new one is published meanwhile
+    version = snapshot_version()
+    if not version:
+        print(f"No index in {Faiss.FAISS_INDEX_DIR} and none could be built")
+        sys.exit(1)
+
+    summaries = []
+    for config in configs:
+        print(f"Evaluating {config_label(config)} on {len(labeled)} queries...")
+        summaries.append(evaluate_config(
+            config, labeled, version, at_k=args.at_k, workers=args.workers, llm=args.llm
+        ))
+    print()
+    print_comparison(summaries, args.at_k)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
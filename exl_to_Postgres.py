@@ -1,12 +1,18 @@
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+import hashlib
+import json
+import os
+from datetime import datetime
+from experience_parser import parse_years_of_experience
 
 # Database connection parameters
 db_params = {
     'dbname': 'profiles_db',
     'user': 'postgres',
-    'password': '#####',  
+    'password': '#####',
     'host': 'localhost',
     'port': '5432'  # Default PostgreSQL port
 }
@@ -14,116 +20,247 @@ db_params = {
 # Path to your Excel file
 excel_path = r"C:\Users\NANDHINI\Desktop\ProductX\AI_Chatbot_Part\synthetic_profiles_with_varied_orgs.xlsx"
 
+# Differential import settings
+DELETE_MISSING = False  # Remove profiles that are no longer present in the Excel file
+CHANGESET_PATH = "profiles_changeset.json"  # Consumed by the FAISS index build in Faiss.py
+
+# Columns written to the profiles table, in insert order
+PROFILE_COLUMNS = [
+    'full_name', 'years_exp', 'years_exp_min', 'years_exp_max',
+    'current_org', 'past_org', 'skill_set', 'linkedin_profile'
+]
+
 def clean_data(value):
     """Clean data and handle None/NaN values"""
     if pd.isna(value) or value == '' or str(value).lower() == 'nan':
         return None
     return str(value).strip()
 
-# Read Excel file
-try:
-    df = pd.read_excel(excel_path)
-    print(f"Successfully read Excel file with {len(df)} rows")
-    print("Column names:", df.columns.tolist())
-    
-    # Display first few rows to verify data
-    print("\nFirst 3 rows of data:")
-    print(df.head(3))
-    
-except Exception as e:
-    print(f"Error reading Excel file: {e}")
-    exit()
-
-# Connect to PostgreSQL
-try:
-    conn = psycopg2.connect(**db_params)
-    cursor = conn.cursor()
-    print("Successfully connected to PostgreSQL")
+def profile_key(full_name, linkedin_profile):
+    """Natural key of a profile (full_name + linkedin_profile)"""
+    return (full_name or '', linkedin_profile or '')
 
-    # Clear existing data (optional - remove this if you want to keep existing data)
-    cursor.execute("DELETE FROM profiles;")
-    print("Cleared existing data from profiles table")
+def row_hash(profile):
+    """Stable hash of a profile's column values, used for change detection"""
+    payload = json.dumps([profile.get(column) for column in PROFILE_COLUMNS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
-    # Insert data into the profiles table
-    successful_inserts = 0
-    failed_inserts = 0
-    
+def prepare_profiles(df):
+    """Clean the Excel rows and return profiles keyed by their natural key"""
+    profiles = {}
     for index, row in df.iterrows():
-        try:
-            insert_query = sql.SQL("""
-                INSERT INTO profiles (full_name, years_exp, current_org, past_org, skill_set, linkedin_profile)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """)
-            
-            # Clean and prepare data
-            full_name = clean_data(row['Full Name'])
-            years_exp = clean_data(row['Year of Exp'])  # Keep as text (6+ yr, 7+ yr, etc.)
-            current_org = clean_data(row['Current Organisation'])
-            past_org = clean_data(row['Past Organisation'])
-            skill_set = clean_data(row['Skill Set'])
-            linkedin_profile = clean_data(row['LinkedIn Profile'])
-            
-            cursor.execute(insert_query, (
-                full_name,
-                years_exp,
-                current_org,
-                past_org,
-                skill_set,
-                linkedin_profile
-            ))
-            successful_inserts += 1
-            
-            # Print progress every 10 records
-            if (index + 1) % 10 == 0:
-                print(f"Processed {index + 1} records...")
-                
-        except Exception as row_error:
-            failed_inserts += 1
-            print(f"Error inserting row {index + 1}: {row_error}")
-            print(f"Row data: {row.to_dict()}")
-
-    # Commit the transaction
-    conn.commit()
-    print(f"\n=== IMPORT SUMMARY ===")
-    print(f"Successfully inserted: {successful_inserts} records")
-    print(f"Failed insertions: {failed_inserts} records")
-    print(f"Total records processed: {len(df)}")
-
-except psycopg2.Error as db_error:
-    print(f"Database Error: {db_error}")
-except Exception as e:
-    print(f"General Error: {e}")
-finally:
-    if 'cursor' in locals():
-        cursor.close()
-    if 'conn' in locals():
-        conn.close()
-    print("Database connection closed")
+        profile = {
+            'full_name': clean_data(row['Full Name']),
+            'years_exp': clean_data(row['Year of Exp']),  # Keep as text (6+ yr, 7+ yr, etc.)
+            'current_org': clean_data(row['Current Organisation']),
+            'past_org': clean_data(row['Past Organisation']),
+            'skill_set': clean_data(row['Skill Set']),
+            'linkedin_profile': clean_data(row['LinkedIn Profile'])
+        }
+        # Numeric bounds parsed from the free text, so experience filters become range predicates
+        profile['years_exp_min'], profile['years_exp_max'] = parse_years_of_experience(profile['years_exp'])
+        if not profile['full_name']:
+            print(f"Skipping row {index + 1}: missing Full Name")
+            continue
+        profile['row_hash'] = row_hash(profile)
+        # Later rows with the same natural key win, as they would with a plain reinsert
+        profiles[profile_key(profile['full_name'], profile['linkedin_profile'])] = profile
+    return profiles
+
+def ensure_schema(cursor):
+    """Add the change-detection and numeric experience columns plus the indexes they rely on"""
+    cursor.execute("ALTER TABLE profiles ADD COLUMN IF NOT EXISTS row_hash TEXT;")
+    cursor.execute("ALTER TABLE profiles ADD COLUMN IF NOT EXISTS years_exp_min INTEGER;")
+    cursor.execute("ALTER TABLE profiles ADD COLUMN IF NOT EXISTS years_exp_max INTEGER;")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS profiles_years_exp
+        ON profiles (years_exp_min, years_exp_max);
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS profiles_natural_key
+        ON profiles (full_name, (COALESCE(linkedin_profile, '')));
+    """)
+
+def fetch_existing_hashes(cursor):
+    """Return {natural key: row_hash} for every profile currently in the table"""
+    cursor.execute("SELECT full_name, linkedin_profile, row_hash FROM profiles;")
+    return {profile_key(full_name, linkedin): stored_hash for full_name, linkedin, stored_hash in cursor.fetchall()}
+
+def upsert_profiles(cursor, profiles):
+    """Insert new profiles and update changed ones in a single statement"""
+    if not profiles:
+        return
+    columns = PROFILE_COLUMNS + ['row_hash']
+    upsert_query = sql.SQL("""
+        INSERT INTO profiles ({columns})
+        VALUES %s
+        ON CONFLICT (full_name, (COALESCE(linkedin_profile, '')))
+        DO UPDATE SET {updates}
+        WHERE profiles.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+    """).format(
+        columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+        updates=sql.SQL(', ').join(
+            sql.SQL("{column} = EXCLUDED.{column}").format(column=sql.Identifier(column))
+            for column in columns if column not in ('full_name', 'linkedin_profile')
+        )
+    )
+    rows = [tuple(profile[column] for column in columns) for profile in profiles]
+    execute_values(cursor, upsert_query.as_string(cursor), rows, page_size=500)
+
+def delete_profiles(cursor, keys):
+    """Delete profiles by natural key"""
+    if not keys:
+        return
+    execute_values(cursor, """
+        DELETE FROM profiles AS p
+        USING (VALUES %s) AS gone (full_name, linkedin_profile)
+        WHERE p.full_name = gone.full_name
+          AND COALESCE(p.linkedin_profile, '') = gone.linkedin_profile
+    """, list(keys), page_size=500)
 
-print("Excel to PostgreSQL import complete!")
+def merge_changesets(previous, current):
+    """Fold a changeset that has not been consumed yet into the current one"""
+    def keys(changeset, section):
+        return {profile_key(e['full_name'], e['linkedin_profile']): e for e in changeset.get(section, [])}
 
-# Verify the import
-try:
-    conn = psycopg2.connect(**db_params)
+    inserted = {**keys(previous, 'inserted'), **keys(current, 'inserted')}
+    updated = {**keys(previous, 'updated'), **keys(current, 'updated')}
+    deleted = {**keys(previous, 'deleted'), **keys(current, 'deleted')}
+    # The most recent run decides whether a profile exists
+    for key in keys(current, 'inserted').keys() | keys(current, 'updated').keys():
+        deleted.pop(key, None)
+    for key in keys(current, 'deleted'):
+        inserted.pop(key, None)
+        updated.pop(key, None)
+    for key in inserted:
+        updated.pop(key, None)
+
+    merged = dict(current)
+    merged['inserted'] = list(inserted.values())
+    merged['updated'] = list(updated.values())
+    merged['deleted'] = list(deleted.values())
+    return merged
+
+def write_changeset(changeset, path=CHANGESET_PATH):
+    """Write the changeset atomically so a reader never sees a partial file"""
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            changeset = merge_changesets(json.load(f), changeset)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(changeset, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def differential_import(conn, df, delete_missing=DELETE_MISSING, changeset_path=CHANGESET_PATH):
+    """Upsert only new or changed profiles, optionally delete missing ones, and emit a changeset"""
     cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM profiles;")
-    count = cursor.fetchone()[0]
-    print(f"\nVerification: Total records in database: {count}")
-    
-    # Show first 3 records
-    cursor.execute("SELECT full_name, years_exp, current_org, linkedin_profile FROM profiles LIMIT 3;")
-    sample_records = cursor.fetchall()
-    
-    print("\nSample records in database:")
-    for i, record in enumerate(sample_records, 1):
-        print(f"{i}. Name: {record[0]}, Experience: {record[1]}, Company: {record[2]}")
-        print(f"   LinkedIn: {record[3]}")
-    
-except Exception as e:
-    print(f"Error during verification: {e}")
-finally:
-    if 'cursor' in locals():
+    try:
+        ensure_schema(cursor)
+        profiles = prepare_profiles(df)
+        existing = fetch_existing_hashes(cursor)
+
+        inserted = [key for key in profiles if key not in existing]
+        updated = [key for key in profiles if key in existing and existing[key] != profiles[key]['row_hash']]
+        deleted = [key for key in existing if key not in profiles] if delete_missing else []
+
+        upsert_profiles(cursor, [profiles[key] for key in inserted + updated])
+        delete_profiles(cursor, deleted)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         cursor.close()
-    if 'conn' in locals():
-        conn.close()
\ No newline at end of file
+
+    def describe(keys):
+        return [{'full_name': full_name, 'linkedin_profile': linkedin or None} for full_name, linkedin in keys]
+
+    changeset = {
+        'generated_at': datetime.now().isoformat(),
+        'source': excel_path,
+        'inserted': describe(inserted),
+        'updated': describe(updated),
+        'deleted': describe(deleted),
+        'unchanged': len(profiles) - len(inserted) - len(updated)
+    }
+    if changeset_path and (inserted or updated or deleted):
+        write_changeset(changeset, changeset_path)
+        print(f"Wrote changeset to {changeset_path}")
+    return changeset
+
+def main():
+    # Read Excel file
+    try:
+        df = pd.read_excel(excel_path)
+        print(f"Successfully read Excel file with {len(df)} rows")
+        print("Column names:", df.columns.tolist())
+
+        # Display first few rows to verify data
+        print("\nFirst 3 rows of data:")
+        print(df.head(3))
+
+    except Exception as e:
+        print(f"Error reading Excel file: {e}")
+        exit()
+
+    # Connect to PostgreSQL
+    try:
+        conn = psycopg2.connect(**db_params)
+        print("Successfully connected to PostgreSQL")
+
+        changeset = differential_import(conn, df)
+
+        print(f"\n=== IMPORT SUMMARY ===")
+        print(f"Inserted: {len(changeset['inserted'])} records")
+        print(f"Updated: {len(changeset['updated'])} records")
+        print(f"Deleted: {len(changeset['deleted'])} records")
+        print(f"Unchanged: {changeset['unchanged']} records")
+        print(f"Total records processed: {len(df)}")
+
+    except psycopg2.Error as db_error:
+        print(f"Database Error: {db_error}")
+    except Exception as e:
+        print(f"General Error: {e}")
+    finally:
+        if 'conn' in locals():
+            conn.close()
+        print("Database connection closed")
+
+    print("Excel to PostgreSQL import complete!")
+
+    # Verify the import
+    try:
+        conn = psycopg2.connect(**db_params)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT COUNT(*) FROM profiles;")
+        count = cursor.fetchone()[0]
+        print(f"\nVerification: Total records in database: {count}")
+
+        cursor.execute("SELECT COUNT(*) FROM profiles WHERE years_exp IS NOT NULL AND years_exp_min IS NULL;")
+        unparsed = cursor.fetchone()[0]
+        if unparsed:
+            print(f"Warning: {unparsed} records have an experience value that could not be parsed")
+
+        # Show first 3 records
+        cursor.execute("""
+            SELECT full_name, years_exp, years_exp_min, years_exp_max, current_org, linkedin_profile
+            FROM profiles LIMIT 3;
+        """)
+        sample_records = cursor.fetchall()
+
+        print("\nSample records in database:")
+        for i, record in enumerate(sample_records, 1):
+            print(f"{i}. Name: {record[0]}, Experience: {record[1]} ({record[2]}-{record[3] or 'open'} yrs), Company: {record[4]}")
+            print(f"   LinkedIn: {record[5]}")
+
+    except Exception as e:
+        print(f"Error during verification: {e}")
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+        if 'conn' in locals():
+            conn.close()
+
+if __name__ == "__main__":
+    main()
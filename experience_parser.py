@@ -0,0 +1,50 @@
+import math
+import re
+
+import numpy as np
+
+# Matches the numbers in free-text experience values such as "6+ yr", "5-8 years" or "10"
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+# Qualifiers are matched as whole words, so "overall 5 years" is not read as "over 5 years"
+OPEN_ENDED_PATTERN = re.compile(r"\+|\b(?:more than|over|above|at least|min(?:imum)?)\b", re.IGNORECASE)
+UPPER_BOUND_PATTERN = re.compile(r"<|\b(?:less than|under|below|up to|max(?:imum)?)\b", re.IGNORECASE)
+
+def parse_years_of_experience(value):
+    """Parse a free-text experience value into integer (min_years, max_years).
+
+    "6+ yr" -> (6, None), "5-8 years" -> (5, 8), "10" -> (10, 10), "over 3 years" -> (3, None),
+    "overall 5 years" -> (5, 5), "less than 2 years" -> (0, 2). Unparsable values give (None, None).
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if isinstance(value, float) and math.isnan(value):
+            return None, None
+        return math.floor(value), math.ceil(value)
+
+    text = str(value).strip()
+    numbers = [float(n) for n in NUMBER_PATTERN.findall(text)]
+    if not numbers:
+        return None, None
+
+    if len(numbers) >= 2:
+        low, high = min(numbers[:2]), max(numbers[:2])
+        return math.floor(low), math.ceil(high)
+
+    years = numbers[0]
+    if UPPER_BOUND_PATTERN.search(text):
+        return 0, math.ceil(years)
+    if OPEN_ENDED_PATTERN.search(text):
+        return math.floor(years), None
+    return math.floor(years), math.ceil(years)
+
+def experience_mask(years_min, min_years=None):
+    """Vectorized minimum-experience predicate over parsed lower bounds (NaN = unknown).
+
+    A profile satisfies the minimum when its lower bound reaches it; unknown values never match.
+    """
+    years_min = np.asarray(years_min, dtype=np.float32)
+    mask = ~np.isnan(years_min)
+    if min_years is not None:
+        mask &= years_min >= min_years
+    return mask
@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
-from Faiss import setup_retriever, query_retriever, print_retrieval_results
+from Faiss import query_retriever_paginated, get_index_version, list_clusters, print_retrieval_results, PAGE_SIZE
+from search_ui import (
+    EXAMPLE_QUERIES, page_style, compact_html, render_similar_experts, display_expert_grid, select_cluster,
+    display_cluster_facets, display_cluster_browser, display_correction, display_term_suggestions,
+    profile_requested, load_next_page,
+    get_index_handle, precompute_example_results, show_search_response
+)
 from datetime import datetime
 
 # Set page configuration
@@ -12,7 +18,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
     <style>
     .main {
         padding: 2rem;
@@ -121,6 +127,11 @@ st.markdown("""
         color: #666;
         margin-bottom: 15px;
     }
+    .profile-similar {
+        font-size: 0.8em;
+        color: #777;
+        margin-bottom: 10px;
+    }
     .connect-button {
         background-color: #4CAF50; /* Green button */
         color: white;
@@ -203,18 +214,12 @@ st.markdown("""
         padding: 10px 20px;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
 
-# Example queries
-EXAMPLE_QUERIES = [
-    "Find experts in Cloud Computing with more than 5 years of experience",
-    "Show me people who worked at Google and have AI expertise",
-    "Find experts in Machine Learning with experience in healthcare",
-    "Show me experts who worked at Microsoft and have cloud expertise",
-    "Find people with more than 10 years of experience in software development"
-]
-def display_expert_tile(expert, is_exact_match=True):
-    """Display an expert profile tile with a circular image and descriptive text, matching the new design."""
+st.markdown(page_style(CUSTOM_CSS), unsafe_allow_html=True)
+
+def render_expert_tile(expert, is_exact_match=True, similar=None):
+    """Render an expert profile tile with a circular image and descriptive text, matching the new design."""
     match_class = "exact-match" if is_exact_match else "recommended-match"
     
     # Assume these fields exist in the expert dictionary for the new design
@@ -244,7 +249,7 @@ def display_expert_tile(expert, is_exact_match=True):
         </div>
     """ if is_premium else ""
 
-    st.markdown(f"""
+    return compact_html(f"""
         <div class="profile-tile {match_class}">
             {premium_badge}
             <div class="profile-avatar-container">
@@ -253,12 +258,14 @@ def display_expert_tile(expert, is_exact_match=True):
             <div class="profile-text-content">
                 <div class="profile-name">{expert_id}</div>
                 <div class="profile-details">{details_string}</div>
+                {render_similar_experts(similar)}
                 <button class="connect-button">
                     <span class="checkmark-icon"></span> Connect Now
                 </button>
             </div>
         </div>
-    """, unsafe_allow_html=True)
+    """)
+
 def display_metrics_section(exact_metrics, recommended_metrics):
     """Display metrics as values in a collapsible section"""
     with st.expander("📊 View Search Metrics", expanded=False):
@@ -318,38 +325,85 @@ def display_chat_message(message, is_user=True):
         </div>
     """, unsafe_allow_html=True)
 
+def run_search(query_text, correct=None):
+    """Run a search and keep its first page; later pages come from the server-side cursor"""
+    st.session_state.last_query = query_text
+    st.session_state.last_response = None # Clear previous response
+    st.session_state.loaded_results = []
+    st.session_state.next_cursor = None
+    response = query_retriever_paginated(
+        st.session_state.retriever, query_text, profile=profile_requested(), correct=correct
+    )
+    if not isinstance(response, str):
+        st.session_state.last_response = response
+        st.session_state.loaded_results = list(response['results'])
+        st.session_state.next_cursor = response['next_cursor']
+    else:
+        st.error(response)
+
 def main():
     st.title("🔍 Expert Search System")
     
-    # Initialize session state
-    if 'retriever' not in st.session_state:
-        with st.spinner("Initializing search system..."):
-            st.session_state.retriever = setup_retriever()
+    # Pick up the latest index snapshot on every run; searches already running keep theirs
+    with st.spinner("Initializing search system..."):
+        st.session_state.retriever = get_index_handle().get()
     
     # Store the last query and its response
     if 'last_query' not in st.session_state:
         st.session_state.last_query = ""
     if 'last_response' not in st.session_state:
         st.session_state.last_response = None
+    if 'loaded_results' not in st.session_state:
+        st.session_state.loaded_results = []
+    if 'next_cursor' not in st.session_state:
+        st.session_state.next_cursor = None
+    if 'browse_cluster' not in st.session_state:
+        st.session_state.browse_cluster = None
+        st.session_state.browse_limit = PAGE_SIZE
+
+    # Example queries are answered ahead of time and refreshed when the index changes
+    with st.spinner("Preparing example queries..."):
+        example_results = precompute_example_results(
+            get_index_version(st.session_state.retriever), st.session_state.retriever
+        )
 
     # Sidebar with example queries
     with st.sidebar:
         st.markdown("### Example Queries")
         for query_text in EXAMPLE_QUERIES:
             if st.button(query_text, key=f"example_{query_text}"):
-                st.session_state.last_query = query_text
-                st.session_state.last_response = None # Clear previous response
-                with st.spinner(f"Searching for experts for: {query_text}"):
-                    response = query_retriever(st.session_state.retriever, query_text)
-                    if not isinstance(response, str):
-                        st.session_state.last_response = response
-                    else:
-                        st.error(response)
+                if query_text in example_results:
+                    show_search_response(query_text, example_results[query_text])
+                else:
+                    with st.spinner(f"Searching for experts for: {query_text}"):
+                        run_search(query_text)
                 st.rerun() # Rerun to display the new response
 
+        st.markdown("### Search by Term")
+        term_query = display_term_suggestions()
+        if term_query:
+            with st.spinner(f"Searching for experts for: {term_query}"):
+                run_search(term_query)
+            st.rerun()
+
+        # Profile clusters, browsable without a search
+        clusters = list_clusters(st.session_state.retriever)
+        if clusters:
+            st.markdown("### Browse Experts")
+            labels = {summary['cluster']: f"{summary['label']} ({summary['size']})" for summary in clusters}
+            st.selectbox(
+                "Expert clusters", [None] + list(labels), key="browse_select",
+                format_func=lambda cluster: "Choose an area..." if cluster is None else labels[cluster],
+                on_change=lambda: select_cluster(st.session_state.browse_select)
+            )
+
     # Main content area - display current query and response
     st.markdown("---") # Separator for visual clarity
 
+    if st.session_state.browse_cluster is not None:
+        display_cluster_browser(render_expert_tile)
+        st.markdown("---")
+
     if st.session_state.last_query:
         display_chat_message(st.session_state.last_query, is_user=True)
         if st.session_state.last_response:
@@ -357,6 +411,9 @@ def main():
 
             response_content = st.session_state.last_response
 
+            # Typos were fixed before searching; offer the query as typed instead
+            display_correction(response_content, run_search)
+
             # Display search criteria
             criteria = response_content['search_criteria']
             criteria_text = []
@@ -372,26 +429,36 @@ def main():
                 criteria_text.append(f"Requirements: {', '.join(criteria.requirements)}")
 
             st.markdown("**Search Criteria:** " + " | ".join(criteria_text))
+            display_cluster_facets(response_content.get('facets'))
+
+            # Results loaded so far, split back into their match groups
+            loaded_results = st.session_state.loaded_results
+            exact_loaded = [expert for expert in loaded_results if expert['match_type'] == 'exact']
+            recommended_loaded = [expert for expert in loaded_results if expert['match_type'] == 'recommended']
 
             # Display exact matches in grid
             st.markdown("### Exact Matches")
-            if response_content['exact_matches']['metrics']['total_results'] > 0:
-                st.markdown('<div class="profile-grid">', unsafe_allow_html=True)
-                for expert in response_content['exact_matches']['results']:
-                    display_expert_tile(expert, is_exact_match=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+            exact_total = response_content['exact_matches']['metrics']['total_results']
+            if exact_total > 0:
+                display_expert_grid(exact_loaded, render_expert_tile, is_exact_match=True)
+                st.caption(f"Showing {len(exact_loaded)} of {exact_total}")
             else:
                 st.info("No exact matches found.")
 
             # Display recommended matches in grid
             st.markdown("### Recommended Matches")
-            if response_content['recommended_matches']['metrics']['total_results'] > 0:
-                st.markdown('<div class="profile-grid">', unsafe_allow_html=True)
-                for expert in response_content['recommended_matches']['results']:
-                    display_expert_tile(expert, is_exact_match=False)
-                st.markdown('</div>', unsafe_allow_html=True)
+            recommended_total = response_content['recommended_matches']['metrics']['total_results']
+            if recommended_total > 0:
+                display_expert_grid(recommended_loaded, render_expert_tile, is_exact_match=False)
+                st.caption(f"Showing {len(recommended_loaded)} of {recommended_total}")
             else:
                 st.info("No recommended matches found.")
+
+            # Next page comes from the cached ranking: no LLM, embedding or FAISS call
+            if st.session_state.next_cursor:
+                if st.button("Load more experts", key="load_more"):
+                    load_next_page()
+                    st.rerun()
             
             # Display metrics in collapsible section
             display_metrics_section(
@@ -409,14 +476,8 @@ def main():
         submit_button = st.form_submit_button("Search")
 
         if submit_button and query_input:
-            st.session_state.last_query = query_input
-            st.session_state.last_response = None # Clear previous response
             with st.spinner("Searching for experts..."):
-                response = query_retriever(st.session_state.retriever, query_input)
-                if not isinstance(response, str):
-                    st.session_state.last_response = response
-                else:
-                    st.error(response)
+                run_search(query_input)
             st.rerun()
 
 if __name__ == "__main__":
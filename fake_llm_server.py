@@ -0,0 +1,97 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for an OpenAI-compatible chat completions endpoint, for exercising the
+# LLM stage without a remote provider:
+#   python fake_llm_server.py --port 8001 --latency 0.3 --error-rate 0.2
+#   LLM_API_BASE=http://127.0.0.1:8001/v1 LLM_API_KEY=fake streamlit run app.py
+
+YEARS_PATTERN = re.compile(r"(\d+)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+
+def criteria_for(query):
+    """SearchCriteria JSON the fake model 'extracts' from a query"""
+    years = YEARS_PATTERN.search(query)
+    organizations = re.findall(r"\b(?:at|in the|for)\s+([A-Z][\w.&-]*(?:\s+[A-Z][\w.&-]*)*)", query)
+    return {
+        'expertise': [],
+        'years_of_experience': int(years.group(1)) if years else None,
+        'organization': organizations,
+        'field_of_interest': [],
+        'requirements': []
+    }
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    settings = {'latency': 0.2, 'error_rate': 0.0, 'error_status': 429}
+    counts = {'requests': 0, 'errors': 0, 'max_in_flight': 0}
+    in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        with self.lock:
+            FakeLLMHandler.in_flight += 1
+            self.counts['requests'] += 1
+            self.counts['max_in_flight'] = max(self.counts['max_in_flight'], FakeLLMHandler.in_flight)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            time.sleep(self.settings['latency'])
+            if not self.path.endswith("/chat/completions"):
+                return self.reply(404, {'error': {'message': f"unknown path {self.path}"}})
+            if random.random() < self.settings['error_rate']:
+                with self.lock:
+                    self.counts['errors'] += 1
+                return self.reply(self.settings['error_status'], {'error': {'message': "fake upstream error"}})
+
+            query = next((m['content'] for m in reversed(body.get('messages', [])) if m.get('role') == 'user'), '')
+            self.reply(200, {
+                'id': f"chatcmpl-fake-{self.counts['requests']}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'fake'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': json.dumps(criteria_for(query))},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+        finally:
+            with self.lock:
+                FakeLLMHandler.in_flight -= 1
+
+    def do_GET(self):
+        # Request counters, handy for checking coalescing and concurrency limits
+        self.reply(200, self.counts)
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port=8001, latency=0.2, error_rate=0.0, error_status=429):
+    """Start the fake server in a daemon thread and return it"""
+    FakeLLMHandler.settings.update(latency=latency, error_rate=error_rate, error_status=error_status)
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status of failed requests")
+    args = parser.parse_args()
+    FakeLLMHandler.settings.update(latency=args.latency, error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Fake LLM server on http://127.0.0.1:{args.port}/v1")
+    ThreadingHTTPServer(("127.0.0.1", args.port), FakeLLMHandler).serve_forever()
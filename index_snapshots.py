@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+
+# Layout under the index directory:
+#   snapshots/<version>/index.faiss, index.pkl, manifest.json
+#   CURRENT  (name of the active snapshot, replaced atomically)
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+TMP_PREFIX = ".tmp-"
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_checksums(path):
+    """Checksums of every data file in a snapshot directory"""
+    return {
+        name: file_sha256(os.path.join(path, name))
+        for name in sorted(os.listdir(path))
+        if name != MANIFEST_FILE and os.path.isfile(os.path.join(path, name))
+    }
+
+def combined_checksum(files):
+    """Single checksum over the per-file checksums"""
+    return hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()
+
+def fsync_dir(path):
+    """Flush a directory entry so a rename survives a crash (no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def write_atomic(path, content):
+    """Replace a small text file atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path) or '.')
+
+def snapshot_path(base_dir, version):
+    return os.path.join(base_dir, SNAPSHOTS_DIR, version)
+
+def write_snapshot(vector_store, base_dir, model_name, extra_manifest=None, extra_files=None, keep=3):
+    """Save a vector store as a new snapshot and make it current.
+
+    The index is written to a temporary directory, described by a manifest and only then
+    renamed into place, so readers never see a half-written snapshot. extra_files maps
+    file names to callables that write sidecar data next to the index; they are
+    checksummed like the index files.
+    """
+    snapshots_dir = os.path.join(base_dir, SNAPSHOTS_DIR)
+    os.makedirs(snapshots_dir, exist_ok=True)
+
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    tmp_path = os.path.join(snapshots_dir, f"{TMP_PREFIX}{version}")
+    vector_store.save_local(tmp_path)
+    for name, write in (extra_files or {}).items():
+        write(os.path.join(tmp_path, name))
+    for name in os.listdir(tmp_path):
+        # Windows only fsyncs handles opened for writing
+        with open(os.path.join(tmp_path, name), 'r+b') as f:
+            os.fsync(f.fileno())
+
+    files = snapshot_checksums(tmp_path)
+    manifest = {
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        'model': model_name,
+        'dimension': vector_store.index.d,
+        'doc_count': vector_store.index.ntotal,
+        'files': files,
+        'checksum': combined_checksum(files),
+        **(extra_manifest or {})
+    }
+    write_atomic(os.path.join(tmp_path, MANIFEST_FILE), json.dumps(manifest, indent=2))
+
+    os.rename(tmp_path, snapshot_path(base_dir, version))
+    fsync_dir(snapshots_dir)
+    set_current(base_dir, version)
+    prune_snapshots(base_dir, keep=keep)
+    return version
+
+def set_current(base_dir, version):
+    """Point CURRENT at an existing snapshot"""
+    if not os.path.exists(os.path.join(snapshot_path(base_dir, version), MANIFEST_FILE)):
+        raise FileNotFoundError(f"No snapshot {version} in {base_dir}")
+    write_atomic(os.path.join(base_dir, CURRENT_FILE), version)
+
+def current_version(base_dir):
+    """Name of the active snapshot, or None when there is none"""
+    try:
+        with open(os.path.join(base_dir, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def read_manifest(base_dir, version):
+    with open(os.path.join(snapshot_path(base_dir, version), MANIFEST_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+def verify_snapshot(base_dir, version):
+    """Check a snapshot's files against its manifest; returns (ok, reason)"""
+    path = snapshot_path(base_dir, version)
+    try:
+        manifest = read_manifest(base_dir, version)
+    except (OSError, ValueError) as e:
+        return False, f"unreadable manifest: {e}"
+    files = snapshot_checksums(path)
+    if files != manifest.get('files') or combined_checksum(files) != manifest.get('checksum'):
+        return False, "checksum mismatch"
+    return True, ""
+
+def list_snapshots(base_dir):
+    """Completed snapshots, oldest first"""
+    snapshots_dir = os.path.join(base_dir, SNAPSHOTS_DIR)
+    if not os.path.isdir(snapshots_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(snapshots_dir)
+        if not name.startswith(TMP_PREFIX) and os.path.exists(os.path.join(snapshots_dir, name, MANIFEST_FILE))
+    )
+
+def prune_snapshots(base_dir, keep=3):
+    """Remove old snapshots and abandoned temporary directories, never the current one"""
+    snapshots_dir = os.path.join(base_dir, SNAPSHOTS_DIR)
+    current = current_version(base_dir)
+    for name in os.listdir(snapshots_dir):
+        if name.startswith(TMP_PREFIX) and name != f"{TMP_PREFIX}{current}":
+            shutil.rmtree(os.path.join(snapshots_dir, name), ignore_errors=True)
+    snapshots = list_snapshots(base_dir)
+    for name in snapshots[:max(0, len(snapshots) - keep)]:
+        if name != current:
+            shutil.rmtree(os.path.join(snapshots_dir, name), ignore_errors=True)
+
+class IndexHandle:
+    """Holds the object built from the current snapshot and hot-swaps it when CURRENT changes.
+
+    get() always returns a fully loaded object; a swap only replaces the reference, so
+    queries already running keep using the object they started with.
+    """
+
+    def __init__(self, base_dir, loader, poll_interval=5.0, version_of=None):
+        self.base_dir = base_dir
+        self.loader = loader  # version (or None for "whatever is current") -> loaded object
+        self.version_of = version_of  # loaded object -> version it actually serves
+        self.poll_interval = poll_interval
+        self.version = None
+        self.value = None
+        self._seen_current = None  # CURRENT as of the last load
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def get(self):
+        if self.value is None:
+            self.reload()
+        return self.value
+
+    def changed(self):
+        return current_version(self.base_dir) != self._seen_current
+
+    def reload(self, force=False):
+        """Load the snapshot named by CURRENT if it changed since the last load"""
+        with self._lock:
+            requested = current_version(self.base_dir)
+            if not force and self.value is not None and requested == self._seen_current:
+                return False
+            value = self.loader(requested)
+            if value is None:
+                # Not retried until CURRENT changes again (or a forced reload)
+                self._seen_current = requested
+                print(f"Keeping index snapshot {self.version}: failed to load {requested}")
+                return False
+            served = self.version_of(value) if self.version_of else requested
+            # Loading may itself publish a newer snapshot (e.g. after applying a changeset)
+            latest = current_version(self.base_dir)
+            self._seen_current = latest if served == latest else requested
+            self.value, self.version = value, served
+            print(f"Serving index snapshot {served}")
+            return True
+
+    def start_watching(self):
+        """Poll CURRENT in a daemon thread and reload when it changes"""
+        if self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop.wait(self.poll_interval):
+                try:
+                    if self.changed():
+                        self.reload()
+                except Exception as e:
+                    print(f"Error reloading index snapshot: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="index-snapshot-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+if __name__ == "__main__":
+    # Admin commands: list snapshots, verify one, or switch CURRENT (running apps pick it up)
+    base_dir = os.getenv("FAISS_INDEX_DIR", "faiss_index")
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        current = current_version(base_dir)
+        for name in list_snapshots(base_dir):
+            manifest = read_manifest(base_dir, name)
+            marker = "*" if name == current else " "
+            print(f"{marker} {name}  docs={manifest['doc_count']}  dim={manifest['dimension']}  model={manifest['model']}")
+    elif command == "verify" and len(sys.argv) > 2:
+        ok, reason = verify_snapshot(base_dir, sys.argv[2])
+        print("OK" if ok else f"FAILED: {reason}")
+    elif command == "activate" and len(sys.argv) > 2:
+        set_current(base_dir, sys.argv[2])
+        print(f"CURRENT -> {sys.argv[2]}")
+    else:
+        print("Usage: python index_snapshots.py [list | verify <version> | activate <version>]")
@@ -0,0 +1,217 @@
+import random
+import threading
+import time
+
+class LLMUnavailable(Exception):
+    """The LLM stage was skipped (circuit open, rate limited or saturated); callers fall back"""
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by all threads"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token if one is available; otherwise return seconds until the next one"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a cool-down, then lets one trial call through"""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """(allowed, trial): trial is True only for the call admitted as the half-open trial"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True, False
+            if state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True, True
+            return False, False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """End a half-open trial that never reached the dependency"""
+        with self._lock:
+            self.trial_in_flight = False
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its outcome"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0  # Calls answered by another caller's in-flight result
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+            else:
+                self.shared += 1
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = func()
+            except BaseException as e:
+                call['error'] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+class LLMClient:
+    """Shared gate in front of the LLM: concurrency cap, rate limit, retries, breaker, coalescing.
+
+    call(key, func) runs func() at most once for concurrent identical keys. It raises
+    LLMUnavailable without waiting out a remote timeout when the breaker is open or the
+    local limits cannot admit the call within queue_timeout.
+
+    With a deadline, queueing, attempts and backoff together stay within deadline seconds:
+    a retry is only made if another attempt_timeout still fits.
+    """
+
+    def __init__(self, max_concurrency=4, rate_per_sec=2.0, burst=4, queue_timeout=2.0,
+                 max_retries=2, backoff_base=0.25, backoff_max=2.0,
+                 failure_threshold=5, reset_timeout=30.0, retryable=(Exception,), no_retry=(),
+                 deadline=None, attempt_timeout=0.0):
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.single_flight = SingleFlight()
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retryable = retryable  # Exception types that count as LLM failures and are retried
+        self.no_retry = no_retry  # Failures not worth retrying (e.g. timeouts); checked before retryable
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.stats = {'calls': 0, 'rejected': 0, 'retries': 0, 'failures': 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def call(self, key, func):
+        self.count('calls')
+        return self.single_flight.do(key, lambda: self._call(func))
+
+    def snapshot_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {**stats, 'coalesced': self.single_flight.shared, 'circuit': self.breaker.state}
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _call(self, func):
+        allowed, trial = self.breaker.allow()
+        if not allowed:
+            self.count('rejected')
+            raise LLMUnavailable("circuit open")
+        if not trial:
+            return self._call_admitted(func)
+        try:
+            return self._call_admitted(func)
+        finally:
+            # A half-open trial rejected locally must not keep the breaker waiting
+            self.breaker.release_trial()
+
+    def _call_admitted(self, func):
+        deadline = None if self.deadline is None else time.monotonic() + self.deadline
+
+        def queue_timeout():
+            if deadline is None:
+                return self.queue_timeout
+            return max(0.0, min(self.queue_timeout, deadline - time.monotonic()))
+
+        if not self.semaphore.acquire(timeout=queue_timeout()):
+            self.count('rejected')
+            raise LLMUnavailable("too many concurrent LLM calls")
+        try:
+            for attempt in range(self.max_retries + 1):
+                if not self.bucket.acquire(queue_timeout()):
+                    self.count('rejected')
+                    raise LLMUnavailable("rate limited")
+                try:
+                    result = func()
+                except self.no_retry:
+                    self.count('failures')
+                    self.breaker.record_failure()
+                    raise
+                except self.retryable:
+                    pause = self.backoff(attempt)
+                    out_of_time = deadline is not None and time.monotonic() + pause + self.attempt_timeout > deadline
+                    if attempt == self.max_retries or out_of_time:
+                        self.count('failures')
+                        self.breaker.record_failure()
+                        raise
+                    self.count('retries')
+                    time.sleep(pause)
+                    continue
+                except Exception:
+                    # The LLM answered but the answer was unusable (e.g. unparsable output)
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_success()
+                return result
+        finally:
+            self.semaphore.release()
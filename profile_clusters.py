@@ -0,0 +1,107 @@
+import json
+from collections import Counter
+
+import faiss
+import numpy as np
+
+from query_expansion import TERM_SEPARATORS, normalize_term, unit_rows
+
+CLUSTERS_FILE = "clusters.npz"
+SUMMARY_TOP_N = 5  # Organizations / expertise terms kept per cluster summary
+
+def cluster_count(n_profiles):
+    """Rule-of-thumb number of clusters for a corpus: sqrt(n / 2), capped at 50"""
+    return int(np.clip(round(np.sqrt(n_profiles / 2)), 1, 50))
+
+def top_values(values, n=SUMMARY_TOP_N):
+    """[(value, count)] of the most frequent values, counted case- and punctuation-insensitively"""
+    counts = Counter()
+    forms = {}
+    for value in values:
+        key = normalize_term(value)
+        if key:
+            counts[key] += 1
+            forms.setdefault(key, value.strip())
+    return [(forms[key], count) for key, count in counts.most_common(n)]
+
+def summarize(cluster, metadatas):
+    """Size, top organizations and top expertise terms of one cluster's profiles"""
+    expertise = top_values(
+        item for metadata in metadatas for item in TERM_SEPARATORS.split(str(metadata.get('expertise') or ''))
+    )
+    return {
+        'cluster': cluster,
+        'size': len(metadatas),
+        'organizations': top_values(str(metadata.get('organization_detail') or '') for metadata in metadatas),
+        'expertise': expertise,
+        'label': ", ".join(term for term, _ in expertise[:3]) or f"Cluster {cluster + 1}"
+    }
+
+class ProfileClusters:
+    """Spherical k-means clusters of profile vectors, each with a precomputed summary.
+
+    Members are stored grouped by cluster and ordered by similarity to the centroid, so
+    browsing a cluster or routing a query to clusters never touches the main index.
+    """
+
+    def __init__(self, centroids, user_ids, labels, scores, summaries):
+        self.centroids = unit_rows(centroids) if len(centroids) else np.zeros((0, 0), dtype=np.float32)
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float16)
+        self.summaries = summaries
+        # Member rows grouped by cluster, best first within each group
+        self.order = np.lexsort((-self.scores.astype(np.float32), self.labels))
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.labels, minlength=len(self.centroids)))])
+        self.rows = {int(user_id): row for row, user_id in enumerate(self.user_ids)}
+
+    @classmethod
+    def build(cls, user_ids, vectors, metadatas, n_clusters=None, niter=20, seed=1234):
+        """Cluster profile vectors and summarize each cluster from its profiles' metadata"""
+        vectors = unit_rows(vectors)
+        if not len(vectors):
+            return cls([], [], [], [], [])
+        n_clusters = min(n_clusters or cluster_count(len(vectors)), len(vectors))
+        kmeans = faiss.Kmeans(vectors.shape[1], n_clusters, niter=niter, spherical=True, seed=seed)
+        kmeans.train(vectors)
+        scores, labels = kmeans.index.search(vectors, 1)
+        labels = labels[:, 0]
+        summaries = [
+            summarize(cluster, [metadatas[row] for row in np.flatnonzero(labels == cluster)])
+            for cluster in range(n_clusters)
+        ]
+        return cls(kmeans.centroids, user_ids, labels, scores[:, 0], summaries)
+
+    def route(self, query_vector, n=3):
+        """[(cluster, score)] of the clusters whose centroids are closest to a (1, d) query"""
+        if not len(self.centroids) or self.centroids.shape[1] != query_vector.shape[1]:
+            return []
+        sims = (self.centroids @ unit_rows(query_vector)[0])
+        best = np.argsort(-sims)[:n]
+        return [(int(cluster), float(sims[cluster])) for cluster in best if self.summaries[cluster]['size']]
+
+    def members(self, cluster, limit=None, offset=0):
+        """[(user_id, score)] of a cluster's profiles, closest to the centroid first"""
+        start, end = self.indptr[cluster] + offset, self.indptr[cluster + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        rows = self.order[start:end]
+        return [(int(self.user_ids[row]), float(self.scores[row])) for row in rows]
+
+    def cluster_of(self, user_id):
+        row = self.rows.get(int(user_id))
+        return None if row is None else int(self.labels[row])
+
+    def save(self, path):
+        np.savez(
+            path, centroids=self.centroids, user_ids=self.user_ids, labels=self.labels,
+            scores=self.scores, summaries=np.array(json.dumps(self.summaries))
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data['centroids'], data['user_ids'], data['labels'], data['scores'],
+                json.loads(str(data['summaries']))
+            )
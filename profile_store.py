@@ -0,0 +1,57 @@
+from sqlalchemy import bindparam, text as sql_text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Async drivers (aiomysql, aiosqlite) used in place of the sync ones in DB_URI
+ASYNC_DRIVERS = {
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite'
+}
+PROFILE_COLUMNS = (
+    'user_id', 'first_name', 'last_name', 'expertise', 'years_of_experience',
+    'organization_detail', 'field_of_interest', 'requirements'
+)
+MAX_IDS_PER_QUERY = 500  # Larger batches are split to stay under driver parameter limits
+
+def async_db_uri(uri):
+    """The same database as a sync SQLAlchemy URI, addressed through its async driver"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}, expected one of {tuple(ASYNC_DRIVERS)}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+class ProfileStore:
+    """Non-blocking access to grandu_user over a pooled async engine.
+
+    Lookups are batched: get_profiles() fetches every requested profile with one
+    IN (...) query, so a page of tiles costs one round trip instead of one per tile.
+    Works against MySQL and against a SQLite stand-in (sqlite:///grandu_test.db).
+    """
+
+    def __init__(self, uri, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True):
+        url = async_db_uri(uri)
+        pool_kwargs = {'pool_pre_ping': pool_pre_ping, 'pool_recycle': pool_recycle}
+        # SQLite stand-ins use SQLAlchemy's default SQLite pool, which takes no size limits
+        if url.get_backend_name() != 'sqlite':
+            pool_kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+        self.engine = create_async_engine(url, **pool_kwargs)
+
+    async def get_profiles(self, user_ids):
+        """{user_id: profile dict} for the given ids; ids without a profile are left out"""
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+        if not user_ids:
+            return {}
+        statement = sql_text(
+            f"SELECT {', '.join(PROFILE_COLUMNS)} FROM grandu_user WHERE user_id IN :user_ids"
+        ).bindparams(bindparam('user_ids', expanding=True))
+        profiles = {}
+        async with self.engine.connect() as conn:
+            for start in range(0, len(user_ids), MAX_IDS_PER_QUERY):
+                result = await conn.execute(statement, {'user_ids': user_ids[start:start + MAX_IDS_PER_QUERY]})
+                for row in result.mappings():
+                    profiles[row['user_id']] = dict(row)
+        return profiles
+
+    async def close(self):
+        await self.engine.dispose()
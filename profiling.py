@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+
+# Output per profiled request, in a rotating directory:
+#   <timestamp>-<name>.folded  collapsed stacks ("a;b;c <samples>"), for flamegraph.pl / speedscope
+#   <timestamp>-<name>.json    stage durations and per-function self/total time
+
+_local = threading.local()
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Profile:
+    """Sampling profiler for one request, used as a context manager around the request.
+
+    A background thread samples the requesting thread's stack every interval_ms and
+    keeps only the part below the frame that opened the profile, so time spent outside
+    the request (e.g. the UI between the steps of a generator) is not attributed to it.
+    """
+
+    def __init__(self, name, directory, interval_ms=5.0, keep=50):
+        self.name = name
+        self.directory = directory
+        self.interval = interval_ms / 1000
+        self.keep = keep
+        self.stacks = Counter()
+        self.stages = []
+        self.samples = 0
+        self.ticks = 0  # Sampler wake-ups, including those that found the request suspended
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.root = sys._getframe(1)
+        self.thread_id = threading.get_ident()
+        self.previous = getattr(_local, 'profile', None)
+        _local.profile = self
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.name}", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        self._stop.set()
+        self._sampler.join()
+        _local.profile = self.previous
+        try:
+            self.write()
+        except OSError as e:
+            print(f"Error writing profile for {self.name}: {e}")
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if frame is self.root:
+                stack.append(frame_label(frame))
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            del frame
+
+    def record_stage(self, name, elapsed):
+        self.stages.append({'stage': name, 'ms': elapsed * 1000})
+
+    def function_timings(self):
+        """{function: {'self_ms', 'total_ms'}} estimated from the samples, slowest first"""
+        self_samples = Counter()
+        total_samples = Counter()
+        for stack, count in self.stacks.items():
+            functions = stack.split(";")
+            self_samples[functions[-1]] += count
+            for function in set(functions):
+                total_samples[function] += count
+        # Wake-ups run late under load, so each one stands for the measured time per tick
+        ms_per_sample = self.elapsed * 1000 / self.ticks if self.ticks else self.interval * 1000
+        return {
+            function: {'self_ms': self_samples[function] * ms_per_sample, 'total_ms': count * ms_per_sample}
+            for function, count in total_samples.most_common()
+        }
+
+    def write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{self.name}")
+        with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self.stacks.items())
+        with open(f"{base}.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'name': self.name,
+                'elapsed_ms': self.elapsed * 1000,
+                'interval_ms': self.interval * 1000,
+                'samples': self.samples,
+                'stages': self.stages,
+                'functions': self.function_timings()
+            }, f, indent=2)
+        rotate(self.directory, self.keep)
+
+def rotate(directory, keep):
+    """Delete all but the newest keep profiles"""
+    names = sorted({os.path.splitext(name)[0] for name in os.listdir(directory) if name.endswith(('.folded', '.json'))})
+    for name in names[:max(len(names) - keep, 0)]:
+        for extension in ('.folded', '.json'):
+            path = os.path.join(directory, name + extension)
+            if os.path.exists(path):
+                os.remove(path)
+
+class Stage:
+    """Times one step of a profiled request"""
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.record_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+def stage(name):
+    """Context manager timing a step of the request being profiled; a no-op otherwise"""
+    profile = getattr(_local, 'profile', None)
+    return nullcontext() if profile is None else Stage(profile, name)
@@ -0,0 +1,57 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+PROJECTION_FILE = "projection.npz"
+
+class PCAProjection:
+    """Linear projection of embeddings onto their leading principal axes.
+
+    The axes are fitted on mean-centred vectors, but the mean is not subtracted when
+    projecting: L2 distances are the same either way, and vectors keep their direction
+    so cosine scores stay comparable to the full-dimensional ones.
+    """
+
+    def __init__(self, components, explained_variance_ratio):
+        self.components = np.asarray(components, dtype=np.float32)  # (dims, input_dims)
+        self.explained_variance_ratio = np.asarray(explained_variance_ratio, dtype=np.float32)
+
+    @property
+    def dims(self):
+        return self.components.shape[0]
+
+    @property
+    def input_dims(self):
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, vectors, dims):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dims = min(dims, *vectors.shape)
+        centred = vectors - vectors.mean(axis=0)
+        _, singular_values, axes = np.linalg.svd(centred, full_matrices=False)
+        variance = singular_values ** 2
+        return cls(axes[:dims], variance[:dims] / max(variance.sum(), 1e-12))
+
+    def transform(self, vectors):
+        return np.asarray(vectors, dtype=np.float32) @ self.components.T
+
+    def save(self, path):
+        np.savez(path, components=self.components, explained_variance_ratio=self.explained_variance_ratio)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['components'], data['explained_variance_ratio'])
+
+class ProjectedEmbeddings(Embeddings):
+    """Embeddings wrapper that projects every document and query vector"""
+
+    def __init__(self, base, projection):
+        self.base = base
+        self.projection = projection
+
+    def embed_documents(self, texts):
+        return self.projection.transform(self.base.embed_documents(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.projection.transform([self.base.embed_query(text)])[0].tolist()
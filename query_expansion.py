@@ -0,0 +1,131 @@
+import re
+from collections import Counter
+
+import faiss
+import numpy as np
+
+EXPANSION_FILE = "expansion.npz"
+
+# Metadata fields whose values become expansion terms
+EXPANSION_FIELDS = ('expertise', 'field_of_interest')
+TERM_SEPARATORS = re.compile(r"\s*[,;/|]\s*")
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.&-]*")
+MAX_TERM_WORDS = 4  # Longest phrase matched against the query
+
+def normalize_term(term):
+    return " ".join(TOKEN_PATTERN.findall(term.lower()))
+
+def distinct_terms(metadatas, fields=EXPANSION_FIELDS):
+    """Distinct expertise/field values (list-valued strings split into items), most frequent first"""
+    counts = Counter()
+    forms = {}
+    for metadata in metadatas:
+        for field in fields:
+            for item in TERM_SEPARATORS.split(str(metadata.get(field) or '')):
+                key = normalize_term(item)
+                if key and len(key.split()) <= MAX_TERM_WORDS:
+                    counts[key] += 1
+                    forms.setdefault(key, item.strip())
+    return [forms[key] for key, _ in counts.most_common()]
+
+def unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+class ExpansionTable:
+    """Each metadata term mapped to its nearest neighbour terms in embedding space.
+
+    Built offline from the profile corpus; at query time the terms a query mentions and
+    their neighbours are folded into the query vector, so one search covers synonyms
+    ("cloud" -> "AWS", "Azure") without extra model calls.
+    """
+
+    def __init__(self, terms, vectors, neighbor_ids, neighbor_sims):
+        self.terms = list(terms)
+        self.vectors = unit_rows(vectors) if len(self.terms) else np.zeros((0, 0), dtype=np.float32)
+        self.neighbor_ids = np.asarray(neighbor_ids, dtype=np.int32)
+        self.neighbor_sims = np.asarray(neighbor_sims, dtype=np.float32)
+        self.lookup = {normalize_term(term): i for i, term in enumerate(self.terms)}
+        self.index = faiss.IndexFlatIP(self.vectors.shape[1]) if len(self.terms) else None
+        if self.index is not None:
+            self.index.add(self.vectors)
+
+    @classmethod
+    def build(cls, terms, embed_documents, neighbors=5, min_similarity=0.6, batch_size=256):
+        """Embed every term once and find its neighbours with one batched self-search"""
+        terms = list(terms)
+        if not terms:
+            return cls([], np.zeros((0, 0)), np.zeros((0, neighbors)), np.zeros((0, neighbors)))
+        vectors = unit_rows(np.vstack([
+            embed_documents(terms[start:start + batch_size]) for start in range(0, len(terms), batch_size)
+        ]))
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        sims, ids = index.search(vectors, min(neighbors + 1, len(terms)))
+
+        neighbor_ids = np.full((len(terms), neighbors), -1, dtype=np.int32)
+        neighbor_sims = np.zeros((len(terms), neighbors), dtype=np.float32)
+        for row in range(len(terms)):
+            keep = [(i, s) for i, s in zip(ids[row], sims[row]) if i != row and i != -1 and s >= min_similarity]
+            for col, (i, s) in enumerate(keep[:neighbors]):
+                neighbor_ids[row, col] = i
+                neighbor_sims[row, col] = s
+        return cls(terms, vectors, neighbor_ids, neighbor_sims)
+
+    def save(self, path):
+        np.savez(
+            path, terms=np.array(self.terms, dtype=str), vectors=self.vectors,
+            neighbor_ids=self.neighbor_ids, neighbor_sims=self.neighbor_sims
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['terms'].tolist(), data['vectors'], data['neighbor_ids'], data['neighbor_sims'])
+
+    def neighbors(self, term):
+        """Neighbour terms of a term with their similarities"""
+        i = self.lookup.get(normalize_term(term))
+        if i is None:
+            return []
+        return [(self.terms[j], float(s)) for j, s in zip(self.neighbor_ids[i], self.neighbor_sims[i]) if j != -1]
+
+    def match_terms(self, query, query_vector=None, min_similarity=0.5):
+        """Term ids a query mentions by phrase, or else its single nearest term if close enough"""
+        tokens = TOKEN_PATTERN.findall(query.lower())
+        matched = []
+        for length in range(MAX_TERM_WORDS, 0, -1):
+            for start in range(len(tokens) - length + 1):
+                i = self.lookup.get(" ".join(tokens[start:start + length]))
+                if i is not None and i not in matched:
+                    matched.append(i)
+        if matched or query_vector is None or self.index is None:
+            return matched
+        sims, ids = self.index.search(unit_rows(query_vector), 1)
+        return [int(ids[0][0])] if ids[0][0] != -1 and sims[0][0] >= min_similarity else []
+
+    def expand(self, query, query_vector, weight=0.5, min_similarity=0.5):
+        """Centroid of the query vector and its matched + neighbour term vectors.
+
+        Term vectors are averaged with similarity weights and added with the given total
+        weight; the result keeps the query vector's norm. Returns (vector, expanded terms).
+        """
+        if self.index is None or self.vectors.shape[1] != query_vector.shape[1]:
+            return query_vector, []
+        matched = self.match_terms(query, query_vector, min_similarity)
+        weights = {}
+        for i in matched:
+            weights[i] = max(weights.get(i, 0.0), 1.0)
+            for j, s in zip(self.neighbor_ids[i], self.neighbor_sims[i]):
+                if j != -1:
+                    weights[int(j)] = max(weights.get(int(j), 0.0), float(s))
+        if not weights:
+            return query_vector, []
+
+        ids = np.array(list(weights), dtype=np.int64)
+        term_weights = np.array([weights[i] for i in ids], dtype=np.float32)
+        terms_centroid = (self.vectors[ids] * term_weights[:, None]).sum(axis=0) / term_weights.sum()
+        norm = np.linalg.norm(query_vector[0])
+        combined = unit_rows(query_vector)[0] + weight * terms_centroid
+        combined = combined / max(np.linalg.norm(combined), 1e-12) * norm
+        return combined[None, :].astype(np.float32), [self.terms[i] for i in ids]
@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+
+# Metadata fields whose values feed the suggestion index
+SUGGESTION_FIELDS = ('organization_detail', 'expertise', 'field_of_interest')
+
+# Words that show up in queries but not in profile metadata
+QUERY_VOCABULARY = [
+    "find", "show", "me", "people", "person", "experts", "expert", "expertise", "experience",
+    "experienced", "years", "year", "worked", "working", "work", "works", "with", "more", "than",
+    "less", "least", "over", "under", "who", "have", "has", "and", "the", "in", "at", "for",
+    "of", "want", "need", "looking", "someone", "specialist", "specialists", "senior", "junior",
+    "background", "knowledge", "skills", "field", "interest", "organization", "company"
+]
+
+MAX_DICTIONARY_EDITS = 2  # Deletes generated per side; covers edit distances up to 2 * this
+PREFIX_CACHE_LENGTH = 3  # Short prefixes have their top suggestions precomputed
+MIN_CORRECTION_LENGTH = 5  # Shorter words are too ambiguous to correct safely
+
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z'&.-]*[A-Za-z]|[A-Za-z]")
+
+def max_edit_distance(word):
+    """Typos tolerated for a word of this length"""
+    if len(word) <= 4:
+        return 1
+    if len(word) <= 7:
+        return 2
+    return 3
+
+def max_correction_distance(word):
+    """Edits a query word may be rewritten by without asking.
+
+    Short unknown words are more often valid names (Spotify, Stripe, nginx) than typos,
+    so they only get one edit; long words rarely land near another real word by accident.
+    """
+    if len(word) < 8:
+        return 1
+    if len(word) < 10:
+        return 2
+    return 3
+
+def deletes(word, max_edits):
+    """All strings reachable from word by removing up to max_edits characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (Damerau-Levenshtein with adjacent swaps), capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class SuggestionIndex:
+    """Prefix suggestions and typo correction over the values stored in the docstore.
+
+    Phrases (whole metadata values) back prefix completion through a sorted list;
+    single words back SymSpell-style correction through a dictionary of deletes.
+    """
+
+    def __init__(self, phrase_counts, word_counts):
+        # Lowercase key -> (display form, frequency)
+        self.phrases = dict(phrase_counts)
+        self.words = dict(word_counts)
+        self.sorted_phrases = sorted(self.phrases)
+
+        self.prefix_cache = {}
+        for key in self.sorted_phrases:
+            for length in range(1, min(PREFIX_CACHE_LENGTH, len(key)) + 1):
+                self.prefix_cache.setdefault(key[:length], []).append(key)
+        for prefix, keys in self.prefix_cache.items():
+            self.prefix_cache[prefix] = nlargest(20, keys, key=lambda k: self.phrases[k][1])
+
+        self.delete_map = {}
+        for word in self.words:
+            for variant in deletes(word, MAX_DICTIONARY_EDITS):
+                self.delete_map.setdefault(variant, []).append(word)
+
+    @classmethod
+    def from_metadata(cls, metadatas, fields=SUGGESTION_FIELDS, extra_words=QUERY_VOCABULARY):
+        """Build the index from docstore metadata dicts"""
+        phrase_forms = {}
+        phrase_counts = Counter()
+        word_forms = {}
+        word_counts = Counter()
+
+        for metadata in metadatas:
+            for field in fields:
+                value = metadata.get(field)
+                if not value:
+                    continue
+                value = str(value).strip()
+                key = value.lower()
+                phrase_counts[key] += 1
+                phrase_forms.setdefault(key, value)
+                for word in WORD_PATTERN.findall(value):
+                    word_counts[word.lower()] += 1
+                    word_forms.setdefault(word.lower(), word)
+        for word in extra_words:
+            word_counts[word] += 1
+            word_forms.setdefault(word, word)
+
+        return cls(
+            {key: (phrase_forms[key], count) for key, count in phrase_counts.items()},
+            {key: (word_forms[key], count) for key, count in word_counts.items()}
+        )
+
+    def suggest(self, prefix, limit=10):
+        """Most frequent metadata values starting with prefix"""
+        key = prefix.strip().lower()
+        if not key:
+            return []
+        if key in self.prefix_cache:
+            return [self.phrases[k][0] for k in self.prefix_cache[key][:limit]]
+
+        start = bisect_left(self.sorted_phrases, key)
+        matches = []
+        for phrase in self.sorted_phrases[start:]:
+            if not phrase.startswith(key):
+                break
+            matches.append(phrase)
+        return [self.phrases[k][0] for k in nlargest(limit, matches, key=lambda k: self.phrases[k][1])]
+
+    def correct_word(self, word, max_distance=None):
+        """Closest known word within the tolerated edit distance (at most max_distance), or None"""
+        key = word.lower()
+        if key in self.words:
+            return self.words[key][0]
+
+        limit = max_edit_distance(key)
+        if max_distance is not None:
+            limit = min(limit, max_distance)
+        best = None
+        seen = set()
+        for variant in deletes(key, MAX_DICTIONARY_EDITS):
+            for candidate in self.delete_map.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(key, candidate, limit)
+                if distance > limit:
+                    continue
+                # Ties go to the more frequent word, then to the one closest in length
+                rank = (distance, -self.words[candidate][1], abs(len(candidate) - len(key)), candidate)
+                if best is None or rank < best[0]:
+                    best = (rank, candidate)
+        return self.words[best[1]][0] if best else None
+
+    def correct_query(self, query, max_distance=None):
+        """Spell-correct a query word by word; returns (corrected query, [(original, correction)]).
+
+        Only words unknown to the index are touched, and only when a known word lies within
+        max_correction_distance edits (capped at max_distance); anything further off is kept as typed.
+        """
+        corrections = []
+
+        def replace(match):
+            word = match.group(0)
+            if len(word) < MIN_CORRECTION_LENGTH or word.lower() in self.words:
+                return word
+            limit = max_correction_distance(word)
+            if max_distance is not None:
+                limit = min(limit, max_distance)
+            correction = self.correct_word(word, limit)
+            if correction is None or correction.lower() == word.lower():
+                return word
+            if word.islower() and correction.istitle():
+                correction = correction.lower()
+            corrections.append((word, correction))
+            return correction
+
+        return WORD_PATTERN.sub(replace, query), corrections
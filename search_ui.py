@@ -0,0 +1,160 @@
+import re
+
+import streamlit as st
+from Faiss import (
+    open_index_handle, query_retriever, paginate_response, fetch_page, similar_experts, list_clusters,
+    cluster_members, suggest, PAGE_SIZE, PAGINATION_CANDIDATES
+)
+
+# Streamlit helpers shared by app.py and expert_search_enhanced.py; each app keeps its own
+# tile design and passes its render_expert_tile to the grid helpers.
+
+EXAMPLE_QUERIES = [
+    "Find experts in Cloud Computing with more than 5 years of experience",
+    "Show me people who worked at Google and have AI expertise",
+    "Find experts in Machine Learning with experience in healthcare",
+    "Show me experts who worked at Microsoft and have cloud expertise",
+    "Find people with more than 10 years of experience in software development"
+]
+
+@st.cache_resource
+def page_style(css):
+    """Page CSS with comments and indentation stripped, minified once per server process.
+
+    Streamlit has no persistent stylesheet, so the (smaller) block is still sent with
+    every rerun; only the minification itself is cached.
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    return re.sub(r"\s*\n\s*", "", css)
+
+def compact_html(html):
+    """Collapse an HTML snippet onto one line so markdown never turns it into a code block"""
+    return "".join(line.strip() for line in html.splitlines())
+
+def render_similar_experts(similar):
+    """One line naming the experts most similar to a tile's expert"""
+    if not similar:
+        return ""
+    names = ", ".join(expert['expert'] for expert in similar)
+    return f'<div class="profile-similar">Similar experts: {names}</div>'
+
+def display_expert_grid(experts, render_tile, is_exact_match=True):
+    """Display all expert tiles of a group in a single HTML block"""
+    # Neighbours come from the precomputed similarity graph, so tiles cost no extra search
+    retriever = st.session_state.get('retriever')
+    tiles = "".join(
+        render_tile(expert, is_exact_match, similar_experts(retriever, expert.get('user_id')))
+        for expert in experts
+    )
+    st.markdown(f'<div class="profile-grid">{tiles}</div>', unsafe_allow_html=True)
+
+def select_cluster(cluster):
+    """Start browsing a profile cluster from its first page"""
+    st.session_state.browse_cluster = cluster
+    st.session_state.browse_limit = PAGE_SIZE
+
+def display_cluster_facets(facets):
+    """Buttons for the clusters a broad query falls into"""
+    if not facets:
+        return
+    st.markdown("**Explore related areas:**")
+    for column, facet in zip(st.columns(len(facets)), facets):
+        column.button(
+            f"{facet['label']} ({facet['size']})", key=f"facet_{facet['cluster']}",
+            on_click=select_cluster, args=(facet['cluster'],)
+        )
+
+def display_cluster_browser(render_tile):
+    """Show the profiles of the cluster being browsed; members are precomputed, so no search runs"""
+    cluster = st.session_state.browse_cluster
+    summary = next((s for s in list_clusters(st.session_state.retriever) if s['cluster'] == cluster), None)
+    if summary is None:
+        st.session_state.browse_cluster = None
+        return
+    st.markdown(f"### {summary['label']}")
+    organizations = ", ".join(name for name, _ in summary['organizations'])
+    st.caption(f"{summary['size']} experts" + (f" · top organizations: {organizations}" if organizations else ""))
+    members = cluster_members(st.session_state.retriever, cluster, limit=st.session_state.browse_limit)
+    display_expert_grid(members, render_tile, is_exact_match=False)
+    more_column, close_column = st.columns(2)
+    if len(members) < summary['size'] and more_column.button("Show more", key="browse_more"):
+        st.session_state.browse_limit += PAGE_SIZE
+        st.rerun()
+    if close_column.button("Close", key="browse_close"):
+        st.session_state.browse_cluster = None
+        st.rerun()
+
+def format_criteria(criteria):
+    """One-line summary of the extracted search criteria"""
+    criteria_text = []
+    if criteria.expertise:
+        criteria_text.append(f"Expertise: {', '.join(criteria.expertise)}")
+    if criteria.years_of_experience:
+        criteria_text.append(f"Experience: {criteria.years_of_experience}+ years")
+    if criteria.organization:
+        criteria_text.append(f"Organizations: {', '.join(criteria.organization)}")
+    if criteria.field_of_interest:
+        criteria_text.append(f"Fields: {', '.join(criteria.field_of_interest)}")
+    if criteria.requirements:
+        criteria_text.append(f"Requirements: {', '.join(criteria.requirements)}")
+    return " | ".join(criteria_text)
+
+def display_correction(response, run_search):
+    """Say which corrected query was searched, with a button to search the query as typed"""
+    if not response.get('original_query'):
+        return
+    st.caption(f"Showing results for: {response['query']}")
+    if st.button(f"Search instead for: {response['original_query']}", key="search_uncorrected"):
+        run_search(response['original_query'], correct=False)
+        st.rerun()
+
+def display_term_suggestions():
+    """Sidebar autocomplete over profile metadata; returns a query for the clicked term, if any"""
+    prefix = st.text_input("Find an expertise or organization", key="term_prefix")
+    for term in suggest(st.session_state.get('retriever'), prefix, limit=5):
+        if st.button(term, key=f"term_{term}"):
+            return f"Find experts in {term}"
+    return None
+
+def profile_requested():
+    """Profile this session's searches when opened with ?profile=1 or sent an X-Profile: 1 header"""
+    if 'profile' not in st.session_state:
+        headers = getattr(getattr(st, 'context', None), 'headers', None) or {}
+        st.session_state.profile = (
+            st.query_params.get("profile") == "1" or headers.get("X-Profile") == "1"
+        )
+    # None leaves the decision to PROFILE_SAMPLE_RATE
+    return True if st.session_state.profile else None
+
+def load_next_page():
+    """Append the next page of the current search without searching again"""
+    page = fetch_page(st.session_state.next_cursor)
+    if not isinstance(page, str):
+        st.session_state.loaded_results.extend(page['results'])
+        st.session_state.next_cursor = page['next_cursor']
+    else:
+        st.error(page)
+        st.session_state.next_cursor = None
+
+@st.cache_resource(show_spinner=False)
+def get_index_handle():
+    """Load the index and models once per server process; new snapshots are swapped in live"""
+    return open_index_handle()
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def precompute_example_results(index_version, _retriever):
+    """Run the example queries once per index version so sidebar clicks cost no search"""
+    example_results = {}
+    for query_text in EXAMPLE_QUERIES:
+        response = query_retriever(_retriever, query_text, k=PAGINATION_CANDIDATES)
+        if not isinstance(response, str):
+            example_results[query_text] = response
+    return example_results
+
+def show_search_response(query_text, response):
+    """Show a finished search response and keep its first page"""
+    st.session_state.last_query = query_text
+    page = paginate_response(query_text, response)
+    st.session_state.last_response = page
+    st.session_state.loaded_results = list(page['results'])
+    st.session_state.next_cursor = page['next_cursor']
@@ -0,0 +1,82 @@
+import heapq
+import zlib
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+def shard_for(key, n_shards):
+    """Stable shard number for a partition key (Python's hash() is salted per process)"""
+    return zlib.crc32(str(key).encode('utf-8')) % n_shards
+
+class ShardedIndex:
+    """A flat FAISS index split into shards that are searched in parallel.
+
+    Each shard is an IndexIDMap2 keyed by the vector's position in the original index, so
+    search results, selectors and reconstruct() use the same ids as the unsharded index
+    and the vector store's index_to_docstore_id mapping stays valid. FAISS releases the
+    GIL while searching, so a thread pool gives real parallelism. The layout is built at
+    load time and is read-only: it has no add() or remove_ids(), and apply_changeset()
+    rejects sharded stores. Indexes are persisted and updated unsharded.
+    """
+
+    def __init__(self, index, assignments, n_shards, max_workers=None):
+        self.d = index.d
+        self.metric_type = index.metric_type
+        self.is_trained = True
+        self.ntotal = index.ntotal
+        # Inner-product scores rank descending, distances ascending
+        self.higher_is_better = index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+        vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), dtype=np.float32)
+        assignments = np.asarray(assignments, dtype=np.int64)
+        self.shard_of = assignments
+        self.shards = []
+        for shard in range(n_shards):
+            ids = np.flatnonzero(assignments == shard).astype(np.int64)
+            shard_index = faiss.IndexIDMap2(faiss.IndexFlat(index.d, index.metric_type))
+            if len(ids):
+                shard_index.add_with_ids(vectors[ids], ids)
+            self.shards.append(shard_index)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or n_shards, thread_name_prefix="faiss-shard")
+
+    def shard_sizes(self):
+        return [shard.ntotal for shard in self.shards]
+
+    def search(self, x, k, params=None):
+        """Search every shard in parallel and merge each query's top-k with a heap"""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        shards = [shard for shard in self.shards if shard.ntotal]
+        if params is None:
+            futures = [self.executor.submit(shard.search, x, k) for shard in shards]
+        else:
+            futures = [self.executor.submit(shard.search, x, k, params=params) for shard in shards]
+        results = [future.result() for future in futures]
+
+        empty = -np.inf if self.higher_is_better else np.inf
+        distances = np.full((len(x), k), empty, dtype=np.float32)
+        labels = np.full((len(x), k), -1, dtype=np.int64)
+        sign = -1 if self.higher_is_better else 1
+        for row in range(len(x)):
+            # Each shard's list is already sorted, so a k-way heap merge is enough
+            merged = heapq.merge(*(
+                ((sign * float(d), int(i)) for d, i in zip(shard_d[row], shard_i[row]) if i != -1)
+                for shard_d, shard_i in results
+            ))
+            for col, (score, label) in enumerate(islice(merged, k)):
+                distances[row, col] = sign * score
+                labels[row, col] = label
+        return distances, labels
+
+    def reconstruct(self, key):
+        return self.shards[self.shard_of[key]].reconstruct(int(key))
+
+    def reconstruct_batch(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        vectors = np.zeros((len(keys), self.d), dtype=np.float32)
+        shard_of = self.shard_of[keys]
+        for shard in np.unique(shard_of):
+            rows = np.flatnonzero(shard_of == shard)
+            vectors[rows] = self.shards[shard].reconstruct_batch(keys[rows])
+        return vectors
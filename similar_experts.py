@@ -0,0 +1,130 @@
+import faiss
+import numpy as np
+
+from query_expansion import unit_rows
+
+SIMILARITY_GRAPH_FILE = "similar_experts.npz"
+SCORE_TOLERANCE = 1e-3  # Above float16 rounding error for scores in [-1, 1]
+
+def top_neighbors(vectors, rows, k, batch_size=1024):
+    """Top-k cosine neighbours (ids, scores) of the given rows, excluding each row itself"""
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    ids = np.full((len(rows), k), -1, dtype=np.int64)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    search_k = min(k + 1, len(vectors))
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        found_scores, found_ids = index.search(vectors[batch], search_k)
+        for offset, row in enumerate(batch):
+            keep = [(i, s) for i, s in zip(found_ids[offset], found_scores[offset]) if i != row and i != -1][:k]
+            for col, (i, s) in enumerate(keep):
+                ids[start + offset, col] = i
+                scores[start + offset, col] = s
+    return ids, scores
+
+class SimilarityGraph:
+    """Each profile's top-k most similar profiles as a CSR adjacency (indptr / neighbors / scores).
+
+    Rows follow self.user_ids; neighbours are row numbers, so a lookup is one dict access
+    plus an array slice.
+    """
+
+    def __init__(self, user_ids, indptr, neighbors, scores, k):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float16)
+        self.k = k
+        self.rows = {int(user_id): row for row, user_id in enumerate(self.user_ids)}
+
+    @staticmethod
+    def to_csr(ids, scores):
+        valid = ids != -1
+        indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+        return indptr, ids[valid].astype(np.int32), scores[valid]
+
+    @classmethod
+    def build(cls, user_ids, vectors, k=10):
+        """Neighbours of every profile from one batched self-search"""
+        vectors = unit_rows(vectors)
+        if not len(vectors):
+            return cls([], [0], [], [], k)
+        ids, scores = top_neighbors(vectors, np.arange(len(vectors)), k)
+        return cls(user_ids, *cls.to_csr(ids, scores), k)
+
+    def row_lists(self):
+        return [
+            (self.neighbors[self.indptr[row]:self.indptr[row + 1]], self.scores[self.indptr[row]:self.indptr[row + 1]])
+            for row in range(len(self.user_ids))
+        ]
+
+    def update(self, user_ids, vectors, changed):
+        """Graph for the current profiles and their vectors, recomputing only rows a change can affect.
+
+        A row is recomputed when it is new or changed, when its list points at a changed
+        or removed profile, or when a changed profile now scores above its k-th
+        neighbour. All other rows are carried over unchanged.
+        """
+        vectors = unit_rows(vectors)
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        changed = {int(user_id) for user_id in changed}
+        new_rows = {int(user_id): row for row, user_id in enumerate(user_ids)}
+        old_lists = self.row_lists()
+
+        # Old rows that survive unchanged, mapped to their new row numbers
+        carried = {
+            old_row: new_rows[int(user_id)] for old_row, user_id in enumerate(self.user_ids)
+            if int(user_id) in new_rows and int(user_id) not in changed
+        }
+        dirty = set(range(len(user_ids))) - set(carried.values())
+        changed_rows = np.array(sorted(new_rows[u] for u in changed if u in new_rows), dtype=np.int64)
+
+        kth_scores = np.full(len(user_ids), -np.inf, dtype=np.float32)
+        for old_row, new_row in carried.items():
+            neighbors, scores = old_lists[old_row]
+            if any(int(n) not in carried for n in neighbors):
+                dirty.add(new_row)
+            elif len(scores) >= self.k:
+                kth_scores[new_row] = float(scores[-1])
+        if len(changed_rows):
+            # Similarity of every profile to each changed profile, against its k-th neighbour
+            # score; stored scores are float16, so near-ties count as beating it
+            best_changed = (vectors @ vectors[changed_rows].T).max(axis=1)
+            dirty |= set(np.flatnonzero(best_changed >= kth_scores - SCORE_TOLERANCE).tolist())
+
+        ids = np.full((len(user_ids), self.k), -1, dtype=np.int64)
+        scores = np.zeros((len(user_ids), self.k), dtype=np.float32)
+        for old_row, new_row in carried.items():
+            if new_row in dirty:
+                continue
+            neighbors, row_scores = old_lists[old_row]
+            ids[new_row, :len(neighbors)] = [carried[int(n)] for n in neighbors]
+            scores[new_row, :len(neighbors)] = row_scores
+        dirty_rows = np.array(sorted(dirty), dtype=np.int64)
+        if len(dirty_rows):
+            ids[dirty_rows], scores[dirty_rows] = top_neighbors(vectors, dirty_rows, self.k)
+        graph = SimilarityGraph(user_ids, *self.to_csr(ids, scores), self.k)
+        graph.recomputed = len(dirty_rows)
+        return graph
+
+    def similar(self, user_id, limit=None):
+        """[(user_id, score)] of a profile's most similar profiles, best first"""
+        row = self.rows.get(int(user_id)) if user_id is not None else None
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return [(int(self.user_ids[n]), float(s)) for n, s in zip(self.neighbors[start:end], self.scores[start:end])]
+
+    def save(self, path):
+        np.savez(
+            path, user_ids=self.user_ids, indptr=self.indptr,
+            neighbors=self.neighbors, scores=self.scores, k=np.array(self.k)
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['user_ids'], data['indptr'], data['neighbors'], data['scores'], int(data['k']))
@@ -0,0 +1,72 @@
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import json
+
+import pytest
+
+import Faiss
+
+def make_doc(user_id, first_name, text="", **extra):
+    return Document(page_content=f"profile {user_id} {text}", metadata={
+        'user_id': user_id, 'first_name': first_name, 'last_name': "Doe", 'organization_detail': 'Acme', **extra
+    })
+
+def indexed_user_ids(vector_store):
+    return sorted({doc.metadata['user_id'] for doc in vector_store.docstore._dict.values()})
+
+def test_deleted_namesake_is_kept(monkeypatch):
+    vector_store = FAISS.from_documents(
+        [make_doc(1, "Jane"), make_doc(2, "Jane"), make_doc(3, "John")], DeterministicFakeEmbedding(size=16)
+    )
+    # Only user 1 left grandu_user; user 2 shares the name
+    monkeypatch.setattr(Faiss, 'load_profile_documents', lambda: [make_doc(2, "Jane"), make_doc(3, "John")])
+    monkeypatch.setattr(Faiss, '_profile_count', 3)
+    Faiss.apply_changeset(vector_store, {'deleted': [{'full_name': "Jane Doe", 'linkedin_profile': None}]})
+    assert indexed_user_ids(vector_store) == [2, 3]
+    assert Faiss._profile_count is None
+
+def test_match_on_user_id_and_linkedin(monkeypatch):
+    vector_store = FAISS.from_documents(
+        [make_doc(1, "Jane", linkedin_profile="in/jane-1"), make_doc(2, "Jane", linkedin_profile="in/jane-2"),
+         make_doc(3, "John", linkedin_profile=None)],
+        DeterministicFakeEmbedding(size=16)
+    )
+    current = [make_doc(1, "Jane", linkedin_profile="in/jane-1"), make_doc(2, "Jane", "new", linkedin_profile="in/jane-2"),
+               make_doc(3, "John", "new", linkedin_profile=None)]
+    monkeypatch.setattr(Faiss, 'load_profile_documents', lambda: current)
+    Faiss.apply_changeset(vector_store, {'updated': [
+        {'full_name': "Jane Doe", 'linkedin_profile': "in/jane-2"}, {'full_name': "Someone Else", 'user_id': 3}
+    ]})
+    assert vector_store._changed_user_ids == {2, 3}
+    assert indexed_user_ids(vector_store) == [1, 2, 3]
+
+def test_failed_fetch_leaves_index_and_changeset(monkeypatch, tmp_path):
+    vector_store = FAISS.from_documents(
+        [make_doc(1, "Jane"), make_doc(2, "John")], DeterministicFakeEmbedding(size=16)
+    )
+    def unreachable():
+        raise ConnectionError("database unreachable")
+    published = []
+    monkeypatch.setattr(Faiss, 'load_profile_documents', unreachable)
+    monkeypatch.setattr(Faiss, 'save_index_snapshot', published.append)
+    changeset_path = tmp_path / "changeset.json"
+    changeset_path.write_text(json.dumps({'updated': [{'full_name': "Jane Doe"}]}))
+
+    Faiss.refresh_from_changeset(vector_store, str(changeset_path))
+    assert indexed_user_ids(vector_store) == [1, 2]
+    assert published == []
+    assert changeset_path.exists()
+    with pytest.raises(ConnectionError):
+        Faiss.apply_changeset(vector_store, {'updated': [{'full_name': "Jane Doe"}]})
+
+def test_same_size_changeset_refreshes_positions(monkeypatch):
+    docs = [make_doc(user_id, f"U{user_id}") for user_id in range(1, 9)]
+    vector_store = FAISS.from_documents(docs, DeterministicFakeEmbedding(size=16))
+    assert Faiss.user_positions(vector_store)[5] == [4]
+    monkeypatch.setattr(Faiss, 'load_profile_documents', lambda: [make_doc(5, "U5", "new")] + docs[5:])
+    Faiss.apply_changeset(vector_store, {'updated': [{'full_name': "U5 Doe"}]})
+    assert vector_store.index.ntotal == 8
+    [doc] = Faiss.search_by_user_ids(vector_store, "profile", [5], k=1)
+    assert doc.metadata['user_id'] == 5
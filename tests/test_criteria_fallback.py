@@ -0,0 +1,60 @@
+import httpx
+import openai
+from langchain_core.documents import Document
+
+import Faiss
+from llm_client import LLMClient
+
+def make_hits(count):
+    hits = []
+    for user_id in range(1, count + 1):
+        doc = Document(page_content=f"profile {user_id}", metadata={
+            'user_id': user_id, 'first_name': f"F{user_id}", 'last_name': f"L{user_id}",
+            'expertise': 'Machine Learning', 'years_of_experience': '3 yr', 'years_min': 3, 'years_max': 3,
+            'organization_detail': 'Acme', 'field_of_interest': 'Healthcare', 'requirements': ''
+        })
+        hits.append(Faiss.ExpertHit(doc, 0.8, 1.0 - user_id / 100))
+    return hits
+
+class FailingChain:
+    def invoke(self, inputs):
+        raise openai.APIConnectionError(request=httpx.Request("POST", "http://llm.invalid/v1/chat/completions"))
+
+def test_fallback_criteria_keep_dense_hits(monkeypatch):
+    monkeypatch.setattr(Faiss, 'LLM_API_KEY', 'test')
+    monkeypatch.setattr(Faiss, 'get_criteria_chain', lambda: FailingChain())
+    monkeypatch.setattr(Faiss, '_llm_client', LLMClient(max_retries=0, retryable=(openai.APIConnectionError,)))
+    criteria = Faiss.extract_search_criteria("machine learning experts in healthcare")
+    assert criteria == Faiss.rule_based_criteria("machine learning experts in healthcare")
+
+    hits = make_hits(5)
+    exact, recommended = Faiss.filter_results_by_criteria(hits, criteria)
+    assert exact == []
+    assert [hit['user_id'] for hit in recommended] == [1, 2, 3, 4, 5]
+
+def test_fallback_years_still_filters():
+    exact, recommended = Faiss.filter_results_by_criteria(make_hits(3), Faiss.rule_based_criteria("ML with 5 years"))
+    assert exact == [] and recommended == []
+
+class TimingOutChain:
+    calls = 0
+
+    def invoke(self, inputs):
+        TimingOutChain.calls += 1
+        raise openai.APITimeoutError(request=httpx.Request("POST", "http://llm.invalid/v1/chat/completions"))
+
+def test_timeouts_are_not_retried(monkeypatch):
+    monkeypatch.setattr(Faiss, 'LLM_API_KEY', 'test')
+    monkeypatch.setattr(Faiss, 'get_criteria_chain', lambda: TimingOutChain())
+    monkeypatch.setattr(Faiss, '_llm_client', None)
+    criteria = Faiss.extract_search_criteria("cloud experts with 4 years")
+    assert criteria.years_of_experience == 4
+    assert TimingOutChain.calls == 1
+    assert Faiss.get_llm_client().stats['failures'] == 1
+
+def test_missing_api_key_skips_llm(monkeypatch):
+    monkeypatch.setattr(Faiss, 'LLM_API_KEY', None)
+    monkeypatch.setattr(Faiss, 'get_criteria_chain', lambda: TimingOutChain())
+    calls = TimingOutChain.calls
+    assert Faiss.extract_search_criteria("ML with 2 years").years_of_experience == 2
+    assert TimingOutChain.calls == calls
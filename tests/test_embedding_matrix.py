@@ -0,0 +1,25 @@
+import faiss
+import numpy as np
+import pytest
+
+from embedding_matrix import EMBEDDINGS_FILE, ROW_MAP_FILE, open_embedding_matrix, write_embedding_matrix, write_row_map
+
+def test_matrix_round_trips_as_read_only_memmap(tmp_path):
+    vectors = np.random.default_rng(0).standard_normal((25, 8)).astype(np.float32)
+    index = faiss.IndexFlatL2(8)
+    index.add(vectors)
+    write_embedding_matrix(index, str(tmp_path / EMBEDDINGS_FILE), batch_size=10)
+    write_row_map(range(100, 125), str(tmp_path / ROW_MAP_FILE))
+
+    matrix, user_ids = open_embedding_matrix(str(tmp_path))
+    assert isinstance(matrix, np.memmap) and not matrix.flags.writeable
+    np.testing.assert_array_equal(matrix, vectors)
+    assert user_ids.tolist() == list(range(100, 125))
+
+def test_mismatched_row_map_is_rejected(tmp_path):
+    index = faiss.IndexFlatL2(4)
+    index.add(np.zeros((3, 4), dtype=np.float32))
+    write_embedding_matrix(index, str(tmp_path / EMBEDDINGS_FILE))
+    write_row_map([1, 2], str(tmp_path / ROW_MAP_FILE))
+    with pytest.raises(ValueError):
+        open_embedding_matrix(str(tmp_path))
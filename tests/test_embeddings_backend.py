@@ -0,0 +1,24 @@
+import pytest
+
+import Faiss
+
+def test_backend_model_kwargs():
+    assert Faiss.embedding_model_kwargs("torch") == {'device': 'cpu'}
+    assert Faiss.embedding_model_kwargs("onnx")['backend'] == 'onnx'
+    int8 = Faiss.embedding_model_kwargs("onnx-int8")
+    assert int8['model_kwargs'] == {'file_name': Faiss.EMBEDDINGS_ONNX_INT8_FILE}
+    with pytest.raises(ValueError):
+        Faiss.embedding_model_kwargs("tensorrt")
+
+def test_failed_onnx_backend_falls_back_to_torch(monkeypatch):
+    def load(backend):
+        if backend != "torch":
+            raise ImportError("onnxruntime is not installed")
+        return "torch encoder"
+
+    monkeypatch.setattr(Faiss, 'EMBEDDINGS_BACKEND', "onnx-int8")
+    monkeypatch.setattr(Faiss, 'load_embeddings', load)
+    monkeypatch.setattr(Faiss, '_embeddings', None)
+    monkeypatch.setattr(Faiss, '_embeddings_backend', None)
+    assert Faiss.get_embeddings() == "torch encoder"
+    assert Faiss._embeddings_backend == "torch"
@@ -0,0 +1,14 @@
+import numpy as np
+
+from experience_parser import experience_mask, parse_years_of_experience
+
+def test_qualifiers_match_whole_words():
+    assert parse_years_of_experience("over 3 years") == (3, None)
+    assert parse_years_of_experience("overall 5 years") == (5, 5)
+    assert parse_years_of_experience("understands 4 years") == (4, 4)
+    assert parse_years_of_experience("6+ yr") == (6, None)
+    assert parse_years_of_experience("less than 2 years") == (0, 2)
+
+def test_experience_mask_skips_unknown_values():
+    mask = experience_mask(np.array([1, 5, np.nan], dtype=np.float32), min_years=3)
+    assert mask.tolist() == [False, True, False]
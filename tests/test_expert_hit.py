@@ -0,0 +1,43 @@
+import pytest
+from langchain_core.documents import Document
+
+import Faiss
+
+def make_hit(**metadata):
+    doc = Document(page_content="profile", metadata={
+        'user_id': 7, 'first_name': "Ada", 'last_name': "Lovelace", 'expertise': 'Machine Learning',
+        'years_of_experience': '6+ yr', 'organization_detail': 'Acme', 'field_of_interest': 'Healthcare',
+        'requirements': '', **metadata
+    })
+    return Faiss.ExpertHit(doc, 0.8, 0.42)
+
+def test_hit_reads_like_the_old_result_dict():
+    hit = make_hit(years_min=6, years_max=6)
+    assert hit['expert'] == "Ada Lovelace"
+    assert hit['organization'] == 'Acme'
+    assert (hit['years_min'], hit['years_max']) == (6, 6)
+    assert hit.get('match_type') is None
+    assert list(hit) == list(Faiss.ExpertHit.KEYS)
+    assert hit.to_dict()['cosine_similarity'] == 0.42
+
+def test_years_are_parsed_for_indexes_without_normalized_years():
+    assert make_hit()['years_min'] == 6
+
+def test_optional_and_extra_keys():
+    hit = make_hit()
+    hit['match_type'] = 'exact'
+    hit['note'] = 'pinned'
+    assert hit['match_type'] == 'exact' and hit['note'] == 'pinned'
+    assert len(hit) == len(Faiss.ExpertHit.KEYS) + 2
+    del hit['match_type']
+    del hit['note']
+    assert 'match_type' not in hit and 'note' not in hit
+    with pytest.raises(KeyError):
+        del hit['note']
+
+def test_docstore_fields_cannot_be_assigned():
+    hit = make_hit()
+    with pytest.raises(TypeError):
+        hit['expertise'] = 'Cooking'
+    hit['cosine_similarity'] = 0.9
+    assert hit['cosine_similarity'] == 0.9
@@ -0,0 +1,61 @@
+import os
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import index_snapshots as snapshots
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=8)
+
+def make_store(count):
+    docs = [Document(page_content=f"profile {i}", metadata={'user_id': i}) for i in range(count)]
+    return FAISS.from_documents(docs, EMBEDDINGS)
+
+def write_sidecar(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("sidecar")
+
+def test_publish_and_load(tmp_path):
+    base_dir = str(tmp_path)
+    version = snapshots.write_snapshot(make_store(3), base_dir, "fake", extra_files={'sidecar.txt': write_sidecar})
+    assert snapshots.current_version(base_dir) == version
+    assert snapshots.verify_snapshot(base_dir, version) == (True, "")
+    manifest = snapshots.read_manifest(base_dir, version)
+    assert manifest['doc_count'] == 3 and 'sidecar.txt' in manifest['files']
+
+    loaded = FAISS.load_local(
+        snapshots.snapshot_path(base_dir, version), EMBEDDINGS, allow_dangerous_deserialization=True
+    )
+    assert loaded.index.ntotal == 3
+
+def test_tampered_snapshot_fails_verification(tmp_path):
+    base_dir = str(tmp_path)
+    version = snapshots.write_snapshot(make_store(2), base_dir, "fake")
+    with open(os.path.join(snapshots.snapshot_path(base_dir, version), "index.pkl"), 'ab') as f:
+        f.write(b"garbage")
+    assert snapshots.verify_snapshot(base_dir, version) == (False, "checksum mismatch")
+
+def test_prune_keeps_recent_and_current(tmp_path):
+    base_dir = str(tmp_path)
+    versions = [snapshots.write_snapshot(make_store(n), base_dir, "fake", keep=10) for n in range(1, 5)]
+    # Roll back to the oldest, then publish with a small keep: the rollback target survives
+    snapshots.set_current(base_dir, versions[0])
+    abandoned = os.path.join(base_dir, snapshots.SNAPSHOTS_DIR, f"{snapshots.TMP_PREFIX}crashed")
+    os.makedirs(abandoned)
+    snapshots.prune_snapshots(base_dir, keep=2)
+    assert snapshots.list_snapshots(base_dir) == [versions[0], *versions[2:]]
+    assert not os.path.exists(abandoned)
+
+def test_handle_swaps_when_current_changes(tmp_path):
+    base_dir = str(tmp_path)
+    first = snapshots.write_snapshot(make_store(1), base_dir, "fake")
+    handle = snapshots.IndexHandle(base_dir, loader=lambda version: {'version': version})
+    assert handle.get() == {'version': first}
+    assert not handle.reload()
+
+    second = snapshots.write_snapshot(make_store(2), base_dir, "fake")
+    in_flight = handle.get()
+    assert handle.changed() and handle.reload()
+    assert handle.get() == {'version': second}
+    assert in_flight == {'version': first}
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from llm_client import CircuitBreaker, LLMClient, LLMUnavailable, SingleFlight
+
+def test_breaker_opens_and_admits_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    assert breaker.allow() == (True, False)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow() == (True, True)
+    assert breaker.allow() == (False, False)
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_only_the_trial_call_releases_the_trial():
+    client = LLMClient(max_retries=0, failure_threshold=1, reset_timeout=0.0)
+    client.breaker.record_failure()
+    assert client.breaker.allow() == (True, True)
+    # A call admitted before the circuit opened, then turned away locally, leaves the trial in flight
+    client.breaker.opened_at = None
+    client.bucket.acquire = lambda timeout: False
+    with pytest.raises(LLMUnavailable):
+        client.call("other", lambda: "never called")
+    assert client.breaker.trial_in_flight
+
+def test_failures_open_the_circuit():
+    client = LLMClient(max_retries=1, backoff_base=0.0, failure_threshold=1, reset_timeout=60.0)
+
+    def fail():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        client.call("q", fail)
+    with pytest.raises(LLMUnavailable):
+        client.call("q", lambda: "ok")
+    assert client.snapshot_stats() == {
+        'calls': 2, 'rejected': 1, 'retries': 1, 'failures': 1, 'coalesced': 0, 'circuit': 'open'
+    }
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("q", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("q", slow))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.shared < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
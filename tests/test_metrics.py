@@ -0,0 +1,27 @@
+import math
+
+import numpy as np
+
+import Faiss
+from benchmarks import legacy_metrics
+
+METRIC_KEYS = ('average_score', 'max_score', 'min_score', 'score_std', 'perplexity', 'average_cosine_similarity')
+
+def test_batched_metrics_match_per_group_metrics():
+    rng = np.random.default_rng(0)
+    groups = [
+        [{'similarity_score': s, 'cosine_similarity': c} for s, c in rng.random((size, 2))]
+        for size in (1, 7, 50, 3)
+    ]
+    for expected, actual in zip(map(legacy_metrics, groups), Faiss.calculate_metrics_for_groups(groups)):
+        assert actual['total_results'] == expected['total_results']
+        for key in METRIC_KEYS:
+            assert math.isclose(expected[key], actual[key], rel_tol=1e-6, abs_tol=1e-9), key
+        assert actual['score_distribution'] == expected['score_distribution']
+
+def test_empty_group_reports_zeros():
+    exact, recommended = Faiss.calculate_metrics_for_groups([[], [{'similarity_score': 0.9, 'cosine_similarity': 0.5}]])
+    assert exact['total_results'] == 0
+    assert all(exact[key] == 0.0 for key in METRIC_KEYS)
+    assert exact['score_distribution'] == {'high': 0, 'medium': 0, 'low': 0}
+    assert recommended['score_distribution'] == {'high': 1, 'medium': 0, 'low': 0}
@@ -0,0 +1,40 @@
+import json
+
+import numpy as np
+
+from profile_clusters import ProfileClusters, cluster_count
+
+AREAS = ["Cloud Computing", "Machine Learning", "Supply Chain"]
+
+def make_clusters():
+    rng = np.random.default_rng(0)
+    centers = np.eye(3, 16, dtype=np.float32) * 10
+    vectors = np.vstack([center + rng.standard_normal((40, 16)).astype(np.float32) for center in centers])
+    metadatas = [{'expertise': area, 'organization_detail': f"Org {i % 2}"} for area in AREAS for i in range(40)]
+    return ProfileClusters.build(list(range(120)), vectors, metadatas, n_clusters=3), centers
+
+def test_clusters_follow_the_profile_groups():
+    clusters, centers = make_clusters()
+    assert sorted(summary['label'] for summary in clusters.summaries) == sorted(AREAS)
+    for center, area in zip(centers, AREAS):
+        cluster, _ = clusters.route(center[None, :], n=1)[0]
+        assert clusters.summaries[cluster]['label'] == area
+        members = clusters.members(cluster)
+        assert len(members) == clusters.summaries[cluster]['size'] == 40
+        scores = [score for _, score in members]
+        assert scores == sorted(scores, reverse=True)
+        assert clusters.cluster_of(members[0][0]) == cluster
+
+def test_clusters_round_trip_through_disk(tmp_path):
+    clusters, _ = make_clusters()
+    path = str(tmp_path / "clusters.npz")
+    clusters.save(path)
+    loaded = ProfileClusters.load(path)
+    # Summaries go through JSON, so (value, count) pairs come back as lists
+    assert loaded.summaries == json.loads(json.dumps(clusters.summaries))
+    assert loaded.members(0, limit=5) == clusters.members(0, limit=5)
+
+def test_cluster_count_is_capped():
+    assert cluster_count(1) == 1
+    assert cluster_count(200) == 10
+    assert cluster_count(10 ** 6) == 50
@@ -0,0 +1,31 @@
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from projection import PCAProjection, ProjectedEmbeddings
+
+def low_rank_vectors():
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal((300, 4)) @ rng.standard_normal((4, 32))).astype(np.float32)
+
+def test_projection_keeps_distances_of_low_rank_data():
+    vectors = low_rank_vectors()
+    projection = PCAProjection.fit(vectors, 4)
+    assert (projection.dims, projection.input_dims) == (4, 32)
+    assert projection.explained_variance_ratio.sum() > 0.999
+
+    projected = projection.transform(vectors)
+    full = np.linalg.norm(vectors[:20, None] - vectors[None, :20], axis=2)
+    reduced = np.linalg.norm(projected[:20, None] - projected[None, :20], axis=2)
+    np.testing.assert_allclose(reduced, full, rtol=1e-3, atol=1e-3)
+
+def test_projection_round_trips_through_disk(tmp_path):
+    projection = PCAProjection.fit(low_rank_vectors(), 3)
+    path = str(tmp_path / "projection.npz")
+    projection.save(path)
+    loaded = PCAProjection.load(path)
+    np.testing.assert_array_equal(loaded.components, projection.components)
+
+def test_projected_embeddings_reduce_query_and_documents():
+    embeddings = ProjectedEmbeddings(DeterministicFakeEmbedding(size=32), PCAProjection.fit(low_rank_vectors(), 4))
+    assert len(embeddings.embed_query("cloud")) == 4
+    assert [len(vector) for vector in embeddings.embed_documents(["a", "b"])] == [4, 4]
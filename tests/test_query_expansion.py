@@ -0,0 +1,26 @@
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import Faiss
+
+class ShiftingTable:
+    def expand(self, query, query_vector, weight=0.5, min_similarity=0.5):
+        return query_vector + 1.0, ["Cloud Computing"]
+
+def test_cosine_is_reported_against_the_unexpanded_query(monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    docs = [Document(page_content=f"profile {i}", metadata={'user_id': i}) for i in range(4)]
+    vector_store = FAISS.from_documents(docs, embeddings)
+    vector_store._expansion_table = ShiftingTable()
+    monkeypatch.setattr(Faiss, 'QUERY_EXPANSION_ENABLED', True)
+
+    search_vector, query_vector = Faiss.embed_query_vectors(vector_store, "cloud experts")
+    raw = np.array([embeddings.embed_query("cloud experts")], dtype=np.float32)
+    np.testing.assert_allclose(query_vector, raw)
+    np.testing.assert_allclose(search_vector, raw + 1.0)
+
+    hits = Faiss.build_results(vector_store, "cloud experts", docs)
+    expected = Faiss.build_results(vector_store, "cloud experts", docs, query_vector=raw)
+    assert [hit['cosine_similarity'] for hit in hits] == [hit['cosine_similarity'] for hit in expected]
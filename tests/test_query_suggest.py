@@ -0,0 +1,22 @@
+from query_suggest import SuggestionIndex
+
+def make_index():
+    return SuggestionIndex.from_metadata([{
+        'expertise': 'Shopify, String theory, Smart grids, Engine design, Machine Learning',
+        'organization_detail': 'Acme', 'field_of_interest': 'Healthcare'
+    }])
+
+def test_unknown_names_are_kept():
+    index = make_index()
+    for query in ("Spotify engineers", "Stripe payments", "nginx experts"):
+        assert index.correct_query(query) == (query, [])
+
+def test_single_typos_are_corrected():
+    corrected, corrections = make_index().correct_query("machne learning in healthcre")
+    assert corrected == "machine learning in healthcare"
+    assert corrections == [("machne", "machine"), ("healthcre", "healthcare")]
+
+def test_long_words_tolerate_more_edits():
+    corrected, corrections = make_index().correct_query("experts with exxperinse and 5 yeasr")
+    assert corrected == "experts with experience and 5 years"
+    assert corrections == [("exxperinse", "experience"), ("yeasr", "years")]
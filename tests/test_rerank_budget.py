@@ -0,0 +1,35 @@
+import time
+
+from langchain_core.documents import Document
+
+import Faiss
+
+class SlowCrossEncoder:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.batches = 0
+
+    def predict(self, pairs, batch_size=None):
+        self.batches += 1
+        time.sleep(self.seconds)
+        return [float(len(text)) for _, text in pairs]
+
+def make_docs(count):
+    return [Document(page_content="x" * user_id, metadata={'user_id': user_id}) for user_id in range(1, count + 1)]
+
+def test_over_budget_falls_back_to_dense_order(monkeypatch):
+    model = SlowCrossEncoder(0.05)
+    monkeypatch.setattr(Faiss, '_cross_encoder', model)
+    monkeypatch.setattr(Faiss, 'RERANK_BATCH_SIZE', 4)
+    docs = make_docs(12)
+    ranked, info = Faiss.rerank_documents("slow query", docs, k=5, top_n=12, budget_ms=10)
+    assert not info['applied'] and 'budget' in info['reason']
+    assert model.batches == 1
+    assert ranked == docs[:5]
+
+def test_within_budget_reranks(monkeypatch):
+    monkeypatch.setattr(Faiss, '_cross_encoder', SlowCrossEncoder(0))
+    docs = make_docs(12)
+    ranked, info = Faiss.rerank_documents("fast query", docs, k=3, top_n=12, budget_ms=1000)
+    assert info['applied']
+    assert [doc.metadata['user_id'] for doc in ranked] == [12, 11, 10]
@@ -0,0 +1,31 @@
+import Faiss
+
+class UnreachableEngine:
+    def __init__(self):
+        self.connects = 0
+
+    def connect(self):
+        self.connects += 1
+        raise ConnectionError("database unreachable")
+
+def test_planner_backs_off_after_db_failure(monkeypatch):
+    engine = UnreachableEngine()
+    monkeypatch.setattr(Faiss, 'get_engine', lambda: engine)
+    monkeypatch.setattr(Faiss, '_profile_count', None)
+    Faiss.record_planner_result(True)
+    criteria = Faiss.SearchCriteria(years_of_experience=5)
+    try:
+        first = Faiss.plan_search(criteria)
+        second = Faiss.plan_search(criteria)
+        assert first['strategy'] == second['strategy'] == 'vector_first'
+        assert first['reason'].startswith('planner error')
+        assert second['reason'].startswith('database unavailable')
+        assert engine.connects == 1
+
+        # Once the backoff expires the database is tried again
+        monkeypatch.setattr(Faiss, '_planner_retry_at', 0.0)
+        Faiss.plan_search(criteria)
+        assert engine.connects == 2
+        assert Faiss._planner_failures == 2
+    finally:
+        Faiss.record_planner_result(True)
@@ -0,0 +1,31 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import Faiss
+from sharded_index import ShardedIndex, shard_for
+
+@pytest.mark.parametrize("metric", [faiss.METRIC_L2, faiss.METRIC_INNER_PRODUCT])
+def test_sharded_search_matches_flat_index(metric):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    queries = rng.standard_normal((5, 16)).astype(np.float32)
+    index = faiss.IndexFlat(16, metric)
+    index.add(vectors)
+    sharded = ShardedIndex(index, [shard_for(i, 3) for i in range(200)], 3)
+
+    expected_d, expected_i = index.search(queries, 10)
+    distances, labels = sharded.search(queries, 10)
+    np.testing.assert_array_equal(labels, expected_i)
+    np.testing.assert_allclose(distances, expected_d, rtol=1e-5)
+    np.testing.assert_array_equal(sharded.reconstruct_batch(expected_i[0]), vectors[expected_i[0]])
+
+def test_sharded_store_rejects_changesets():
+    docs = [Document(page_content=f"profile {i}", metadata={'user_id': i}) for i in range(6)]
+    vector_store = Faiss.shard_vector_store(FAISS.from_documents(docs, DeterministicFakeEmbedding(size=8)), n_shards=2)
+    assert sum(vector_store.index.shard_sizes()) == 6
+    with pytest.raises(TypeError):
+        Faiss.apply_changeset(vector_store, {'deleted': [{'user_id': 1}]})
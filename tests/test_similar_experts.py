@@ -0,0 +1,33 @@
+import numpy as np
+
+from similar_experts import SimilarityGraph
+
+def neighbor_ids(graph):
+    return {int(user_id): [other for other, _ in graph.similar(user_id)] for user_id in graph.user_ids}
+
+def test_update_matches_full_rebuild(tmp_path):
+    rng = np.random.default_rng(0)
+    user_ids = list(range(1, 201))
+    vectors = rng.standard_normal((200, 16)).astype(np.float32)
+    graph = SimilarityGraph.build(user_ids, vectors, k=5)
+
+    # Re-embed two profiles, drop one and add a new one
+    vectors[[10, 20]] = rng.standard_normal((2, 16))
+    keep = [row for row, user_id in enumerate(user_ids) if user_id != 150]
+    new_ids = [user_ids[row] for row in keep] + [201]
+    new_vectors = np.vstack([vectors[keep], rng.standard_normal((1, 16)).astype(np.float32)])
+
+    updated = graph.update(new_ids, new_vectors, changed={11, 21, 201})
+    rebuilt = SimilarityGraph.build(new_ids, new_vectors, k=5)
+    assert neighbor_ids(updated) == neighbor_ids(rebuilt)
+    assert 0 < updated.recomputed < len(new_ids)
+
+    path = str(tmp_path / "graph.npz")
+    updated.save(path)
+    assert neighbor_ids(SimilarityGraph.load(path)) == neighbor_ids(updated)
+
+def test_similar_for_unknown_profiles():
+    graph = SimilarityGraph.build([1, 2, 3], np.eye(3, dtype=np.float32), k=2)
+    assert graph.similar(99) == []
+    assert graph.similar(None) == []
+    assert len(graph.similar(1, limit=1)) == 1